@@ -0,0 +1,185 @@
+"""ローカルの ReplayServer に対して BatchRunner（取得・パース・マージ・書き出し）を回す負荷試験
+
+    python -m benchmarks.load_test --races 24 --concurrency 1 4 8 --latency 0.05 --jitter 0.1
+    python -m benchmarks.load_test --races 24 --concurrency 4 --error-rate 0.02 --throttle-rate 0.05 --json
+
+同時に処理するレース数ごとに races/min、レース単位の所要時間（p50/p99）、HTTP リクエストの
+所要時間（p50/p99、ヒストグラムのバケット上限で近似）、最大 RSS を表示する。
+ブラウザは使わない（HTTP で取れなかったページはそのレースの失敗として数える）。
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from benchmarks.replay_server import ReplayServer, synthetic_site
+from src.jobs.batch import BatchRunner
+from src.jobs.queue import DONE, FAILED, JobQueue
+from src.scrapers.parse_pool import ParsePool
+from src.utils.metrics import Histogram
+from src.utils.race_id import make_race_id
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _NullBrowserPool:
+    @asynccontextmanager
+    async def page(self, page_type=None):
+        yield None
+
+
+class _NoBrowserFetcher:
+    async def fetch(self, page, url, page_type=None):
+        raise RuntimeError(f"could not fetch {url} over HTTP (no browser in load test)")
+
+
+def load_race_ids(count: int) -> list:
+    """count 件のレース ID（1日12レースずつ日目を進める）"""
+    return [make_race_id(2025, 3, '06', 1 + i // 12, 1 + i % 12) for i in range(count)]
+
+
+def max_rss_mb() -> float:
+    if resource is None:
+        return float('nan')
+    # Linux は KB、macOS はバイト
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def load_settings_for(server: ReplayServer, race_ids, output_dir: str, concurrency: int,
+                      requests_per_second: float) -> dict:
+    return {
+        'race_id': race_ids[0],
+        'shutuba_url': server.shutuba_url(race_ids[0]),
+        'output_dir': output_dir,
+        'max_concurrency': concurrency * 4,
+        'rate_limit': {'requests_per_second': requests_per_second, 'burst': max(1, int(requests_per_second)),
+                       'min_interval': 0},
+        'cache': {'enabled': False},
+        'horse_store': {'enabled': False},
+        'incremental': {'enabled': False},
+        'output': {'write_race_json': False, 'flush_interval': 0.2},
+        'batch': {'max_attempts': 1},
+        'parse_pool': {'workers': 2},
+    }
+
+
+def _merged_histogram(metrics, stage: str) -> Histogram:
+    merged = Histogram(metrics.buckets)
+    for (name, labels), h in list(metrics.histograms.items()):
+        if dict(labels).get('stage') != stage:
+            continue
+        merged.counts = [a + b for a, b in zip(merged.counts, h.counts)]
+        merged.count += h.count
+        merged.sum += h.sum
+        merged.max = max(merged.max, h.max)
+    return merged
+
+
+async def run_load(server: ReplayServer, race_ids, concurrency: int, requests_per_second: float = 1e9,
+                   parse_pool=None) -> dict:
+    """race_ids を concurrency 件ずつ並行して処理し、結果の要約を返す"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        settings = load_settings_for(server, race_ids, output_dir, concurrency, requests_per_second)
+        queue = JobQueue(f"{output_dir}/jobs.sqlite3", max_attempts=1)
+        queue.enqueue(race_ids)
+        runner = BatchRunner(settings, queue, concurrency, browser_pool=_NullBrowserPool(), parse_pool=parse_pool)
+        runner.fetcher.browser_fetcher = _NoBrowserFetcher()
+        runner.metrics.export_dir = None
+
+        latencies = []
+        run_race = runner.run_race
+
+        async def timed_run_race(race_id):
+            started = time.perf_counter()
+            try:
+                return await run_race(race_id)
+            finally:
+                latencies.append(time.perf_counter() - started)
+        runner.run_race = timed_run_race
+
+        requests_before = server.stats['requests']
+        started = time.perf_counter()
+        counts = await runner.run()
+        elapsed = time.perf_counter() - started
+        queue.close()
+
+    network = _merged_histogram(runner.metrics, 'network')
+    latencies = np.array(latencies) if latencies else np.array([np.nan])
+    return {
+        'concurrency': concurrency,
+        'races': len(race_ids),
+        'done': counts.get(DONE, 0),
+        'failed': counts.get(FAILED, 0),
+        'seconds': round(elapsed, 3),
+        'races_per_min': round(counts.get(DONE, 0) / elapsed * 60, 1),
+        'race_p50': round(float(np.nanpercentile(latencies, 50)), 3),
+        'race_p99': round(float(np.nanpercentile(latencies, 99)), 3),
+        'request_p50': network.quantile(0.5),
+        'request_p99': network.quantile(0.99),
+        'requests': server.stats['requests'] - requests_before,
+        'max_rss_mb': round(max_rss_mb(), 1),
+        'slowest_stages': [{k: s[k] for k in ('stage', 'page_type', 'sum', 'p95') if k in s}
+                           for s in runner.metrics.summary()['stages'][:3]],
+    }
+
+
+def format_report(results) -> str:
+    lines = [f"{'conc':>4} {'done':>5} {'fail':>5} {'races/min':>10} {'race p50':>9} {'race p99':>9} "
+             f"{'req p50':>8} {'req p99':>8} {'requests':>9} {'max RSS MB':>11}"]
+    for r in results:
+        lines.append(f"{r['concurrency']:>4} {r['done']:>5} {r['failed']:>5} {r['races_per_min']:>10.1f} "
+                     f"{r['race_p50']:>9.3f} {r['race_p99']:>9.3f} {r['request_p50']:>8.3f} {r['request_p99']:>8.3f} "
+                     f"{r['requests']:>9} {r['max_rss_mb']:>11.1f}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ReplayServer を相手にスクレイプ全体の負荷試験を行う")
+    parser.add_argument('--races', type=int, default=12, help='処理するレース数')
+    parser.add_argument('--horses', type=int, default=18)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4], help='同時に処理するレース数（複数なら順に）')
+    parser.add_argument('--latency', type=float, default=0.02, help='サーバーの応答遅延（秒）')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--max-inflight', type=int, help='サーバーが同時に受け付ける上限（超えると 503）')
+    parser.add_argument('--requests-per-second', type=float, default=1e9, help='クライアント側のレート制御')
+    parser.add_argument('--parse-pool', action='store_true', help='プロセスプールでパースする')
+    parser.add_argument('--json', action='store_true', help='結果を JSON で出力する')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    race_ids = load_race_ids(args.races)
+    pages = synthetic_site(race_ids, args.horses)
+    results = []
+    with ReplayServer(pages, args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                      max_inflight=args.max_inflight) as server:
+        for concurrency in args.concurrency:
+            if args.parse_pool:
+                with ParsePool.from_settings(load_settings_for(server, race_ids, '.', concurrency, 1)) as parse_pool:
+                    results.append(asyncio.run(run_load(server, race_ids, concurrency,
+                                                        args.requests_per_second, parse_pool)))
+            else:
+                results.append(asyncio.run(run_load(server, race_ids, concurrency, args.requests_per_second)))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(results))
+        for r in results:
+            stages = ', '.join(f"{s['stage']}({s.get('page_type', '-')}) {s['sum']:.2f}s" for s in r['slowest_stages'])
+            print(f"concurrency {r['concurrency']}: {stages}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""パーサーと end-to-end マージのベンチマーク（オフライン）
+
+    python -m benchmarks.parse_bench                   # 計測して baseline.json と比較（退行があれば終了コード 1）
+    python -m benchmarks.parse_bench --update-baseline # 現在の結果を基準として保存
+
+スループットはマシン性能に依存するので、固定の Python 処理で測った calibration の比で
+基準値を補正してから比較する。メモリ（peak_kb）は補正しない。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+
+from benchmarks.synthetic import full_card
+from src.scrapers.keibabook import KeibaBookScraper
+from src.scrapers.parser_backend import available_backends
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+RACE_ID = '202503060201'
+
+# (ベンチマーク名, パーサー, full_card のページ種別)
+PARSE_CASES = (
+    ('race', '_parse_race_data', 'syutuba'),
+    ('training', '_parse_training_data', 'cyokyo'),
+    ('pedigree', '_parse_pedigree_data', 'kettou'),
+    ('stable_comment', '_parse_stable_comment_data', 'danwa'),
+    ('previous_race_comment', '_parse_previous_race_comment_data', 'syoin'),
+    ('horse_past_results', '_parse_horse_past_results_data', 'horse'),
+)
+
+
+def bench_settings(backend):
+    return {
+        'race_id': RACE_ID,
+        'shutuba_url': f'https://s.keibabook.co.jp/cyuou/syutuba/{RACE_ID}',
+        'parser_backend': backend,
+        'cache': {'enabled': False},
+        'http': {'enabled': False},
+        'rate_limit': {'requests_per_second': 1e9, 'burst': 1000},
+        'max_concurrency': 8,
+    }
+
+
+def calibrate(min_time=0.2):
+    """マシン速度の目安（固定の文字列・辞書処理の回数/秒）"""
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < min_time:
+        d = {}
+        for i in range(1000):
+            d[str(i)] = ('%d-%d' % (i, i * 2)).split('-')
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def measure(func, min_time):
+    """func を min_time 秒以上繰り返して回数/秒を測り、1回分のメモリを tracemalloc で測る"""
+    func()  # ウォームアップ
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        func()
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+    tracemalloc.start()
+    result = func()
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = [s for s in snapshot.statistics('filename') if s.traceback[0].filename != tracemalloc.__file__]
+    del result
+    return {
+        'per_sec': runs / elapsed,
+        'peak_kb': peak / 1024,
+        'retained_kb': sum(s.size for s in retained) / 1024,
+        'retained_blocks': sum(s.count for s in retained),
+    }
+
+
+class _NullBrowserPool:
+    @asynccontextmanager
+    async def page(self, page_type=None):
+        yield None
+
+
+def end_to_end_runner(backend, card):
+    scraper = KeibaBookScraper(bench_settings(backend), browser_pool=_NullBrowserPool())
+    pages = {scraper._page_url(t): card[t] for t in ('syutuba', 'cyokyo', 'kettou', 'danwa', 'syoin')}
+    pages.update({f'https://s.keibabook.co.jp{link}': html for link, html in card['horses'].items()})
+
+    async def fetch(page, url):
+        return pages[url]
+
+    scraper._fetch_page_content = fetch
+
+    def run():
+        race_data = asyncio.run(scraper.scrape())
+        assert len(race_data['horses']) == len(card['horses'])
+        return race_data
+    return run
+
+
+def run_benchmarks(backends, min_time):
+    card = full_card()
+    card['horse'] = next(iter(card['horses'].values()))
+    results = {'calibration': calibrate(), 'benchmarks': {}}
+    for backend in backends:
+        scraper = KeibaBookScraper(bench_settings(backend))
+        for name, method, page_type in PARSE_CASES:
+            parse = getattr(scraper, method)
+            html_content = card[page_type]
+            stats = measure(lambda: parse(html_content), min_time)
+            results['benchmarks'][f'{backend}/{name}'] = {
+                'pages_per_sec': stats.pop('per_sec'), 'page_kb': len(html_content.encode('utf-8')) / 1024, **stats,
+            }
+        stats = measure(end_to_end_runner(backend, card), min_time)
+        results['benchmarks'][f'{backend}/end_to_end'] = {'races_per_sec': stats.pop('per_sec'), **stats}
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    scale = results['calibration'] / baseline['calibration']
+    regressions = []
+    for name, current in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        for key in ('pages_per_sec', 'races_per_sec'):
+            if key in base and current[key] < base[key] * scale * (1 - tolerance):
+                regressions.append(f"{name}: {key} {current[key]:.1f} < baseline {base[key] * scale:.1f} (scaled)")
+        if current['peak_kb'] > base['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak_kb {current['peak_kb']:.0f} > baseline {base['peak_kb']:.0f}")
+    return regressions
+
+
+def print_results(results):
+    print(f"calibration: {results['calibration']:.0f} ops/sec")
+    print(f"{'benchmark':40} {'per sec':>10} {'peak KB':>10} {'kept KB':>10} {'blocks':>8}")
+    for name, r in results['benchmarks'].items():
+        per_sec = r.get('pages_per_sec', r.get('races_per_sec'))
+        print(f"{name:40} {per_sec:10.1f} {r['peak_kb']:10.0f} {r['retained_kb']:10.0f} {r['retained_blocks']:8d}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', help='計測するバックエンド（既定: インストール済みの全て）')
+    parser.add_argument('--min-time', type=float, default=0.5, help='ベンチマーク1件あたりの最短計測秒数')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='許容する退行の割合')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--json', help='結果を JSON で書き出すパス')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.backend or available_backends(), args.min_time)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("no baseline; run with --update-baseline first")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""全体パースと領域切り出しパースの時間・メモリ比較
+
+    python -m benchmarks.partial_parse [--backend selectolax] [--repeat 20]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import page_chrome, training_table
+from src.scrapers.keibabook import KeibaBookScraper
+
+SETTINGS = {'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/202503060201', 'cache': {'enabled': False}}
+
+
+def measure(scraper, html_content, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = scraper._parse_training_data(html_content)
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    scraper._parse_training_data(html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', default='html.parser')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    html_content = page_chrome(training_table())
+    full = KeibaBookScraper(dict(SETTINGS, parser_backend=args.backend, partial_parse=False))
+    partial = KeibaBookScraper(dict(SETTINGS, parser_backend=args.backend, partial_parse=True))
+
+    full_result, full_time, full_peak = measure(full, html_content, args.repeat)
+    partial_result, partial_time, partial_peak = measure(partial, html_content, args.repeat)
+    assert full_result == partial_result, "partial parse changed the output"
+
+    print(f"backend={args.backend} page={len(html_content) / 1024:.0f}KB")
+    print(f"{'':8} {'time(ms)':>10} {'peak(KB)':>10}")
+    print(f"{'full':8} {full_time * 1000:10.2f} {full_peak / 1024:10.0f}")
+    print(f"{'partial':8} {partial_time * 1000:10.2f} {partial_peak / 1024:10.0f}")
+    print(f"speedup x{full_time / partial_time:.2f}, peak memory x{full_peak / partial_peak:.2f} smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""競馬ブックの URL 構成でページを返すローカル HTTP サーバー（ネットワーク不要）
+
+    python -m benchmarks.replay_server --races 202503060201-202503060212 --latency 0.05 --jitter 0.05
+    python -m benchmarks.replay_server --cache-dir data/cache     # PageCache に記録したページを返す
+
+出馬表 /cyuou/syutuba/{race_id}、調教 /cyuou/cyokyo/0/{race_id}、血統 /cyuou/kettou/{race_id}、
+厩舎の話 /cyuou/danwa/0/{race_id}、前走コメント /cyuou/syoin/{race_id}、馬柱 /db/uma/{id} を返す。
+遅延・揺らぎ・エラー率・429（Retry-After 付き）・同時接続数超過の 503 を設定できる。
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from benchmarks.synthetic import full_card
+from src.storage.page_cache import PageCache
+from src.utils.race_id import parse_range
+
+CARD_PATHS = {
+    'syutuba': '/cyuou/syutuba/{race_id}',
+    'cyokyo': '/cyuou/cyokyo/0/{race_id}',
+    'kettou': '/cyuou/kettou/{race_id}',
+    'danwa': '/cyuou/danwa/0/{race_id}',
+    'syoin': '/cyuou/syoin/{race_id}',
+}
+
+
+def synthetic_site(race_ids, horses: int = 18, seed: int = 0) -> dict:
+    """race_id ごとに full_card を作り、パス → HTML にする（馬のページはレース間で共通）"""
+    pages = {}
+    for i, race_id in enumerate(race_ids):
+        card = full_card(horses, seed + i)
+        for page_type, path in CARD_PATHS.items():
+            pages[path.format(race_id=race_id)] = card[page_type]
+        for link, html in card['horses'].items():
+            pages.setdefault(link, html)
+    return pages
+
+
+def recorded_site(page_cache: PageCache) -> dict:
+    """PageCache に記録したページをパス → HTML にする（ホストは問わない）"""
+    return {urlparse(url).path: html for url, html in page_cache.iter_pages()}
+
+
+def race_id_spec(spec: str) -> list:
+    """"202503060201-202503060212" や "202503060201,202503060205" をレース ID のリストにする"""
+    return [str(n) for n in parse_range(spec)]
+
+
+class ReplayServer:
+    """pages（パス → HTML）を返す HTTP サーバー。別スレッドで動かし、with で起動・停止する
+
+    リクエストごとに latency + uniform(0, jitter) 秒待ってから、error_rate の確率で 500、
+    throttle_rate の確率で 429 を返す。max_inflight を超える同時リクエストには 503 を返す。
+    """
+
+    def __init__(self, pages: dict, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: int = 1, max_inflight: int = None,
+                 host: str = '127.0.0.1', port: int = 0, seed: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_inflight = max_inflight
+        self.stats = {'requests': 0, 'bytes': 0, 'status': {}, 'max_inflight': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def shutuba_url(self, race_id: str) -> str:
+        return self.base_url + CARD_PATHS['syutuba'].format(race_id=race_id)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # --- リクエスト処理（ハンドラのスレッドで呼ばれる） ---
+
+    def _enter(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            self._inflight += 1
+            self.stats['max_inflight'] = max(self.stats['max_inflight'], self._inflight)
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            roll = self._rng.random()
+            over_limit = self.max_inflight is not None and self._inflight > self.max_inflight
+        return delay, roll, over_limit
+
+    def _leave(self, status: int, size: int):
+        with self._lock:
+            self._inflight -= 1
+            self.stats['status'][status] = self.stats['status'].get(status, 0) + 1
+            self.stats['bytes'] += size
+
+    def respond(self, path: str):
+        """(ステータス, ヘッダー, 本文)"""
+        delay, roll, over_limit = self._enter()
+        status, headers, body = 200, {}, b''
+        try:
+            if over_limit:
+                status, headers = 503, {'Retry-After': str(self.retry_after)}
+                return status, headers, body
+            time.sleep(delay)
+            if roll < self.error_rate:
+                status = 500
+            elif roll < self.error_rate + self.throttle_rate:
+                status, headers = 429, {'Retry-After': str(self.retry_after)}
+            else:
+                html = self.pages.get(urlparse(path).path.rstrip('/') or '/')
+                if html is None:
+                    status = 404
+                else:
+                    body = html.encode('utf-8')
+                    headers = {'Content-Type': 'text/html; charset=utf-8'}
+            return status, headers, body
+        finally:
+            self._leave(status, len(body))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_GET(self):
+                status, headers, body = server.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="競馬ブックの URL 構成で合成ページか記録済みページを返すローカルサーバー")
+    parser.add_argument('--races', default='202503060201-202503060212', help='合成するレース ID（範囲指定可）')
+    parser.add_argument('--horses', type=int, default=18)
+    parser.add_argument('--cache-dir', help='この PageCache に記録したページを返す（--races より優先）')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='秒')
+    parser.add_argument('--jitter', type=float, default=0.0, help='秒（0〜この値を latency に足す）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 を返す割合')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='429 を返す割合')
+    parser.add_argument('--max-inflight', type=int, help='これを超える同時リクエストには 503')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.cache_dir:
+        cache = PageCache(args.cache_dir)
+        pages = recorded_site(cache)
+        cache.close()
+    else:
+        pages = synthetic_site(race_id_spec(args.races), args.horses)
+    server = ReplayServer(pages, args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                          max_inflight=args.max_inflight, port=args.port)
+    print(f"{len(pages)} ページを {server.base_url} で返します（Ctrl+C で終了）")
+    try:
+        with server:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    print(f"終了: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
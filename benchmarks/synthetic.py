@@ -0,0 +1,131 @@
+"""ベンチマーク用の合成ページ（ネットワーク不要）"""
+import random
+
+HORSE_NAMES = ['セイウンレガーメ', 'リナクィーンアスク', 'アサクサダイアナ', 'ドレフォンボーイ', 'キズナノヒカリ', 'ハルノヒメ']
+COMMENTS = [
+    'まだ素質だけで走っている感じ。使いつつ良くなってくれば。',
+    'スタートで後手を踏んだのが全て。力負けではない。',
+    '前走は不完全燃焼。今回は巻き返しを期待したい。',
+    '展開が向かなかった。次走に期待。',
+]
+
+
+def page_chrome(body, rng=None, noise_blocks=40):
+    """実ページと同じく、ヘッダー・ナビ・広告・フッターで本体を挟む"""
+    rng = rng or random.Random(0)
+    nav = ''.join(f'<li><a href="/cyuou/nittei/{i}">メニュー{i}</a></li>' for i in range(30))
+    ads = ''.join(
+        f'<div class="ad"><a href="https://ad.example.com/{rng.randint(0, 9999)}"><img src="/img/ad{i}.png"></a>'
+        f'<p>{"広告テキスト" * 10}</p></div>'
+        for i in range(noise_blocks)
+    )
+    return (
+        '<html><head><title>競馬ブック</title>'
+        + ''.join(f'<link rel="stylesheet" href="/css/{i}.css">' for i in range(10))
+        + '<script>var dataLayer = [];</script></head><body>'
+        + f'<header><ul class="nav">{nav}</ul></header>{ads}<main>{body}</main>{ads}'
+        + f'<footer><ul class="nav">{nav}</ul><p>Copyright</p></footer></body></html>'
+    )
+
+
+def training_table(horses=18, sessions=5, rng=None):
+    """sessions は int か (最小, 最大) のタプル"""
+    rng = rng or random.Random(0)
+    rows = []
+    for num in range(1, horses + 1):
+        rows.append(
+            f'<tr><td class="waku"><p class="waku{(num + 1) // 2}">{(num + 1) // 2}</p></td>'
+            f'<td class="umaban">{num}</td><td class="kbamei"><a href="/db/uma/{900000 + num}">'
+            f'{rng.choice(HORSE_NAMES)}{num}</a></td><td class="tanpyo">動き軽快</td>'
+            f'<td class="yajirusi"><span>→</span></td></tr>'
+        )
+        details = []
+        count = rng.randint(*sessions) if isinstance(sessions, tuple) else sessions
+        for s in range(count):
+            laps = [f'{rng.uniform(80, 86):.1f}', f'{rng.uniform(65, 69):.1f}', f'{rng.uniform(50, 54):.1f}',
+                    f'{rng.uniform(36, 40):.1f}', f'{rng.uniform(11, 13):.1f}']
+            if rng.random() < 0.5:
+                laps[0] = ''
+            awase = (f'<tr class="awase"><td class="left" colspan="6">{rng.choice(HORSE_NAMES)}（新馬）馬なりの内0.5秒追走同入</td></tr>'
+                     if rng.random() < 0.4 else '')
+            details.append(
+                f'<dl class="dl-table"><dt>助手</dt><dt class="left">11/{s + 1}&nbsp;美Ｗ&nbsp;良</dt>'
+                f'<dt class="right">馬なり余力</dt></dl><table class="default cyokyodata"><tbody>'
+                f'<tr class="time">' + ''.join(f'<td>{lap}</td>' for lap in laps)
+                + f'<td class="mawariiti">［{rng.randint(1, 9)}］</td></tr>{awase}</tbody></table>'
+            )
+        rows.append(f'<tr><td colspan="5">{"".join(details)}</td></tr>')
+    return f'<table class="default cyokyo"><tbody>{"".join(rows)}</tbody></table>'
+
+
+def long_comment(rng, sentences=4):
+    return ''.join(rng.choice(COMMENTS) for _ in range(sentences))
+
+
+def race_card(horses=18, rng=None):
+    rng = rng or random.Random(0)
+    rows = ''.join(
+        f'<tr><td class="waku"><p class="waku{(num + 1) // 2}">{(num + 1) // 2}</p></td>'
+        f'<td class="umaban">{num}</td><td class="kbamei"><a href="/db/uma/{900000 + num}">'
+        f'{rng.choice(HORSE_NAMES)}{num}</a></td>'
+        f'<td class="left"><p class="kisyu"><a href="/db/kisyu/{num}">騎手{num}</a></p>'
+        f'<p class="seirei">牡{rng.randint(2, 8)}</p><p class="futan">{rng.choice(["54", "55", "56", "57"])}</p></td></tr>'
+        for num in range(1, horses + 1)
+    )
+    return (
+        '<div class="racemei"><p>2025年11月9日 3回福島2日目</p><p>1R ２歳未勝利</p></div>'
+        '<div class="racetitle_sub"><p>[指定]</p><p>1150m (ダート・右) 曇・良</p></div>'
+        f'<table class="syutuba_sp"><tbody>{rows}</tbody></table>'
+    )
+
+
+def pedigree_table(horses=18, rng=None):
+    rng = rng or random.Random(0)
+    rows = ''.join(
+        f'<tr><td class="HorseNum">{num}</td><td class="Father">{rng.choice(HORSE_NAMES)}</td>'
+        f'<td class="Mother">{rng.choice(HORSE_NAMES)}</td><td class="MothersFather">{rng.choice(HORSE_NAMES)}</td></tr>'
+        for num in range(1, horses + 1)
+    )
+    return f'<table class="PedigreeTable"><tbody>{rows}</tbody></table>'
+
+
+def comment_block(table_class, horses=18, rng=None):
+    rng = rng or random.Random(0)
+    comments = ''.join(
+        f'<div class="HorseComment"><p class="HorseNum">{num}</p><p class="Comment">{long_comment(rng)}</p></div>'
+        for num in range(1, horses + 1)
+    )
+    return f'<div class="{table_class}">{comments}</div>'
+
+
+def past_results_table(results=20, rng=None):
+    rng = rng or random.Random(0)
+    header = ''.join(f'<th>{h}</th>' for h in ('日付', '開催', 'R', '着順', 'タイム', '騎手', '斤量'))
+    rows = ''.join(
+        f'<tr><td>20{rng.randint(22, 25)}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}</td>'
+        f'<td>{rng.choice(["東京", "中山", "福島", "京都"])}</td><td>{rng.randint(1, 12)}</td>'
+        f'<td>{rng.randint(1, 18)}着</td><td>1:{rng.randint(8, 59):02d}.{rng.randint(0, 9)}</td>'
+        f'<td>騎手{rng.randint(1, 40)}</td><td>{rng.choice(["54", "55", "56", "57"])}</td></tr>'
+        for _ in range(results)
+    )
+    return f'<div class="HorsePastResultsTable"><table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table></div>'
+
+
+def full_card(horses=18, seed=0):
+    """1レース分の全ページ（実ページ同様にヘッダー等で包んだもの）
+
+    戻り値は {'syutuba': html, 'cyokyo': html, 'kettou': html, 'danwa': html, 'syoin': html,
+    'horses': {horse_name_link: html}}
+    """
+    rng = random.Random(seed)
+    return {
+        'syutuba': page_chrome(race_card(horses, rng), rng),
+        'cyokyo': page_chrome(training_table(horses, (4, 6), rng), rng),
+        'kettou': page_chrome(pedigree_table(horses, rng), rng),
+        'danwa': page_chrome(comment_block('StableCommentTable', horses, rng), rng),
+        'syoin': page_chrome(comment_block('PreviousRaceCommentTable', horses, rng), rng),
+        'horses': {
+            f'/db/uma/{900000 + num}': page_chrome(past_results_table(20, rng), rng)
+            for num in range(1, horses + 1)
+        },
+    }
@@ -0,0 +1,49 @@
+"""調教タイムの行ごとの変換（convert.training_times）と一括デコード（decode_times）の比較
+
+    python -m benchmarks.training_decode [--sessions 100000]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.features.training import decode_times
+from src.utils import convert
+
+
+def synthetic_cells(count, seed=0):
+    rng = random.Random(seed)
+    cells = []
+    for _ in range(count):
+        furlongs = rng.choice((4, 5))
+        times = [f"{12.0 * f + rng.uniform(-2, 4):.1f}" for f in (6, 5, 4, 3)[-(furlongs - 1):]]
+        cells.append(times + [f"{rng.uniform(11, 13):.1f}", f"［{rng.randint(1, 9)}］"])
+    return cells
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=100000)
+    args = parser.parse_args()
+    cells = synthetic_cells(args.sessions)
+
+    started = time.perf_counter()
+    rows = [convert.training_times(c) for c in cells]
+    per_row = time.perf_counter() - started
+
+    started = time.perf_counter()
+    times, position = decode_times(cells)
+    vectorized = time.perf_counter() - started
+
+    expected = np.array([list(t.values()) for t, _ in rows], dtype=np.float32)
+    assert np.array_equal(times, expected, equal_nan=True), "decode_times changed the values"
+    assert np.array_equal(position, np.array([p for _, p in rows], dtype=np.float32))
+
+    print(f"sessions={args.sessions}")
+    print(f"per-row    {per_row * 1000:10.1f} ms")
+    print(f"vectorized {vectorized * 1000:10.1f} ms  (x{per_row / vectorized:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+from src.utils.config import load_settings
+from src.utils.logger import configure_logging
+from src.utils.race_id import expand_race_ids
+from src.jobs.queue import JobQueue
+from src.jobs.batch import BatchRunner
+from src.scrapers.browser_pool import BrowserPool
+from src.scrapers.parse_pool import ParsePool
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="開催単位でレースをまとめてスクレイピングする（中断しても続きから再開できる）")
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--kai', type=int, help='回 (例: 3)')
+    parser.add_argument('--venue', action='append', default=[], help='競馬場名かコード。複数指定可 (例: 福島)')
+    parser.add_argument('--days', default='1-8', help='日目 (例: 1-2)')
+    parser.add_argument('--races', default='1-12', help='R (例: 1-12)')
+    parser.add_argument('--race-id', action='append', default=[], help='レース ID を直接追加')
+    parser.add_argument('--concurrency', type=int, help='同時に処理するレース数')
+    parser.add_argument('--retry-failed', action='store_true', help='失敗したジョブをやり直す')
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    settings = load_settings()
+    configure_logging(settings)
+    queue = JobQueue.from_settings(settings)
+
+    race_ids = list(args.race_id)
+    if args.year and args.kai:
+        for venue in args.venue:
+            race_ids.extend(expand_race_ids(args.year, args.kai, venue, args.days, args.races,
+                                            settings.get('venue_codes')))
+    added = queue.enqueue(race_ids)
+    if args.retry_failed:
+        queue.retry_failed()
+    print(f"{added} 件追加: {queue.counts()}")
+
+    with ParsePool.from_settings(settings) as parse_pool:
+        async with BrowserPool.from_settings(settings) as browser_pool:
+            runner = BatchRunner(settings, queue, args.concurrency, browser_pool=browser_pool, parse_pool=parse_pool)
+            counts = await runner.run()
+    print(f"完了: {counts}")
+    queue.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
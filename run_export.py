@@ -0,0 +1,37 @@
+import argparse
+import glob
+import os
+from src.utils.config import load_settings
+from src.storage.exporter import export_from_jsonl, iter_jsonl_races
+from src.storage.database import RaceDatabase
+from src.features.engine import FeatureEngine
+
+def main():
+    parser = argparse.ArgumentParser(description="output_dir/jsonl のレースを正規化テーブル（Parquet/CSV）やデータベースに書き出す")
+    parser.add_argument('--out', help='出力先（既定: output_dir/tables）')
+    parser.add_argument('--format', action='append', choices=['parquet', 'csv'], help='既定は両方')
+    parser.add_argument('--database', action='store_true', help='settings の database にも保存する')
+    parser.add_argument('--database-only', action='store_true', help='データベースにだけ保存する')
+    parser.add_argument('--features', action='store_true', help='特徴量表（features.parquet）も書き出す')
+    args = parser.parse_args()
+
+    settings = load_settings()
+    if not args.database_only:
+        tables, written = export_from_jsonl(settings['output_dir'], args.out, tuple(args.format or ('parquet', 'csv')))
+        for name, df in tables.items():
+            print(f"{name}: {len(df)} 行")
+        print(f"{len(written)} 件書き出しました")
+        if args.features:
+            features = FeatureEngine.from_settings(settings).build_from_tables(tables)
+            path = os.path.join(args.out or os.path.join(settings['output_dir'], 'tables'), 'features.parquet')
+            features.to_parquet(path, engine='pyarrow', index=False)
+            print(f"特徴量 {len(features)} 行を {path} に書き出しました")
+    if args.database or args.database_only:
+        paths = sorted(glob.glob(os.path.join(settings['output_dir'], 'jsonl', '*.jsonl')))
+        database = RaceDatabase.from_settings(settings)
+        count = database.save_races(iter_jsonl_races(paths))
+        database.close()
+        print(f"{count} レースをデータベースに保存しました")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import datetime
+from src.utils.config import load_settings
+from src.utils.logger import configure_logging
+from src.jobs.race_day import RaceDayDaemon, day_card, load_card_csv
+from src.scrapers.browser_pool import BrowserPool
+from src.scrapers.parse_pool import ParsePool
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="開催日の各レースを発走時刻に合わせて取得し続ける（全レースの成績を取ったら終了）")
+    parser.add_argument('--year', type=int, required=True)
+    parser.add_argument('--kai', type=int, required=True, help='回 (例: 3)')
+    parser.add_argument('--venue', action='append', required=True, help='競馬場名かコード。複数指定可 (例: 福島)')
+    parser.add_argument('--day', type=int, required=True, help='日目 (例: 2)')
+    parser.add_argument('--races', default='1-12', help='R (例: 1-12)')
+    parser.add_argument('--date', type=datetime.date.fromisoformat, help='開催日 (既定: 今日)')
+    parser.add_argument('--card', help='race_id,post_time（HH:MM）の CSV で発走時刻を指定する')
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    settings = load_settings()
+    configure_logging(settings)
+    overrides = load_card_csv(args.card) if args.card else None
+    card = {}
+    for venue in args.venue:
+        card.update(day_card(settings, args.year, args.kai, venue, args.day, args.races, args.date, overrides))
+    print(f"{len(card)} レースを監視します")
+
+    with ParsePool.from_settings(settings) as parse_pool:
+        async with BrowserPool.from_settings(settings) as browser_pool:
+            daemon = RaceDayDaemon(settings, card, browser_pool=browser_pool, parse_pool=parse_pool)
+            stats = await daemon.run()
+    print(f"終了: {stats}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
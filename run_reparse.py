@@ -0,0 +1,30 @@
+import argparse
+import json
+from src.utils.config import load_settings
+from src.utils.logger import configure_logging
+from src.jobs.reparse import REPARSE_PAGE_TYPES, Reparser, format_summary
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="アーカイブのページを全コアでパースし直し、前回の出力との差分を項目ごとにまとめる")
+    parser.add_argument('--page-type', action='append', choices=REPARSE_PAGE_TYPES,
+                        help='パースし直すページ種別。複数指定可（既定: 全種別。出馬表を含めばレースも組み立て直す）')
+    parser.add_argument('--race-id', action='append', help='このレースのページだけ（複数指定可）')
+    parser.add_argument('--baseline', help='比較する以前の実行のディレクトリ（既定: 直前の実行、無ければ通常のスクレイプの結果）')
+    parser.add_argument('--workers', type=int, help='プロセス数（既定: CPU 数）')
+    parser.add_argument('--json', action='store_true', help='要約を JSON で出力する')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    settings = load_settings()
+    configure_logging(settings)
+    reparser = Reparser.from_settings(settings, workers=args.workers)
+    try:
+        summary = reparser.run(args.page_type, args.race_id, baseline=args.baseline)
+    finally:
+        reparser.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2) if args.json else format_summary(summary))
+    print(f"出力: {summary['run']}")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,48 @@
 import asyncio
 from src.utils.config import load_settings
+from src.utils.logger import configure_logging
+from src.utils.metrics import Metrics
 from src.scrapers.keibabook import KeibaBookScraper
+from src.scrapers.browser_pool import BrowserPool
+from src.scrapers.parse_pool import ParsePool
+from src.storage.horse_store import HorseStore
+from src.storage.output_sink import JsonlSink
+from src.storage.change_tracker import ChangeTracker, summarize_changes
+from src.storage.page_archive import PageArchive
 
 async def main():
     settings = load_settings()
-    scraper = KeibaBookScraper(settings)
-    scraped_data = await scraper.scrape()
-    print(scraped_data) # スクレイピング結果を表示
+    configure_logging(settings)
+    metrics = Metrics.from_settings(settings)
+    horse_store = HorseStore.from_settings(settings)
+    change_tracker = ChangeTracker.from_settings(settings)
+    archive = PageArchive.from_settings(settings)
+    with ParsePool.from_settings(settings) as parse_pool:
+        async with BrowserPool.from_settings(settings) as browser_pool, \
+                JsonlSink.from_settings(settings, metrics) as sink:
+            scraper = KeibaBookScraper(settings, browser_pool=browser_pool, parse_pool=parse_pool,
+                                       horse_store=horse_store, change_tracker=change_tracker, metrics=metrics,
+                                       archive=archive)
+            race = await scraper.scrape_race(str(settings['race_id']))
+            if scraper.changes != []:
+                await (await sink.write(race))
+                if scraper.changes:
+                    change_tracker.record(race, scraper.changes)
+    if horse_store is not None:
+        horse_store.close()
+    if change_tracker is not None:
+        change_tracker.close()
+    if archive is not None:
+        archive.close()
+    paths = metrics.export('scraper')
+    if paths is not None:
+        print(f"計測値: {paths[1]}")
+    if scraper.changes == []:
+        print(f"{race.race_name or ''} は前回から変化がないため書き出しを省きました")
+        return
+    if scraper.changes:
+        print(f"変更: {summarize_changes(scraper.changes)}")
+    print(f"{race.race_name or ''} ({len(race.runners)}頭) を {settings['output_dir']} に保存しました")
 
 if __name__ == '__main__':
     asyncio.run(main())
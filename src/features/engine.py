@@ -0,0 +1,248 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.features.training import normalize_by_course
+from src.storage.exporter import build_tables
+from src.utils.convert import TRAINING_FURLONGS
+
+# 凡走に明確な理由があることを示す言葉（過去走コメント・厩舎コメント）
+EXCUSE_KEYWORDS = (
+    '不利', '出遅れ', '後手', '躓', 'つまず', '挟まれ', '詰ま', '展開', '馬場', '外を回', '掛か', '落鉄', 'ゲート',
+)
+# 軽い調教とみなす追い切り方
+LIGHT_METHODS = ('馬なり', 'ゆったり')
+
+TIME_COLUMNS = [f'time_{furlong}' for furlong in TRAINING_FURLONGS]
+
+FEATURE_COLUMNS = [
+    'race_id', 'horse_num', 'horse_id', 'race_date', 'surface', 'distance_m',
+    'n_runs', 'days_since_last', 'last_finish', 'finish_mean', 'finish_std', 'adjusted_finish_mean',
+    'excused_runs', 'tataki_runs', 'inconsistent',
+    'last_weight_ratio', 'weight_ratio_mean',
+    'n_sessions', 'train_z_3f', 'train_z_1f', 'train_best_z_1f', 'train_position', 'light_training',
+    'prev_run_excused',
+]
+FLOAT_FEATURES = [
+    'days_since_last', 'last_finish', 'finish_mean', 'finish_std', 'adjusted_finish_mean', 'excused_runs',
+    'tataki_runs', 'last_weight_ratio', 'weight_ratio_mean', 'train_z_3f', 'train_z_1f', 'train_best_z_1f',
+    'train_position',
+]
+
+
+class HorseWindows:
+    """馬ごとに日付順に並んだ過去走の、直近 size 走（自身を含む）の窓
+
+    groupby().rolling() は馬ごとに Python で窓を作るので遅い。累積和の差で全行をまとめて計算する。
+    NaN は数えない（pandas の rolling(min_periods=1) と同じ）。
+    """
+
+    def __init__(self, keys: np.ndarray, size: int):
+        n = len(keys)
+        index = np.arange(n)
+        first = np.ones(n, dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        self.first = first
+        group_start = np.maximum.accumulate(np.where(first, index, 0)) if n else index
+        self.position = index - group_start
+        self._start = np.maximum(index - size + 1, group_start)
+        self._end = index + 1
+
+    def _window(self, values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+        return cumulative[self._end] - cumulative[self._start]
+
+    def sum(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        return self._window(np.nan_to_num(values))
+
+    def count(self, values) -> np.ndarray:
+        return self._window(~np.isnan(np.asarray(values, dtype=np.float64)))
+
+    def mean(self, values) -> np.ndarray:
+        count = self.count(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, self.sum(values) / count, np.nan)
+
+    def std(self, values) -> np.ndarray:
+        """標本標準偏差（ddof=1）"""
+        values = np.asarray(values, dtype=np.float64)
+        count = self.count(values)
+        total = self.sum(values)
+        squares = self._window(np.nan_to_num(values) ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (squares - total * total / count) / (count - 1)
+        return np.where(count > 1, np.sqrt(np.clip(variance, 0, None)), np.nan)
+
+    def diff(self, values) -> np.ndarray:
+        """同じ馬の1つ前の行との差（最初の行は NaN）"""
+        values = np.asarray(values, dtype=np.float64)
+        result = np.full(len(values), np.nan)
+        result[1:] = values[1:] - values[:-1]
+        result[self.first] = np.nan
+        return result
+
+
+class FeatureEngine:
+    """PROJECT_LOG 5.2 の評価基準をデータセット全体に対してまとめて計算し、出走馬ごとの特徴量表を作る
+
+    ① 過去走・厩舎コメントに明確な理由がある凡走は excused とし、重みを excused_weight に下げる
+    ② 休み明け・連闘での凡走で調教が軽ければ叩きとみなし、評価から外す
+    ③ 直近 window 走（inconsistent_min_runs 走以上）で好走と凡走が混在し着順のばらつきが大きい馬は inconsistent（要注意の穴馬）
+    ④ 年齢による一律の割引はしない（年齢は特徴量に入れない）
+    ⑤ 斤量は馬体重に対する比で見る
+
+    過去走は出走日より前のものだけを使う（同日・未来の結果は混ぜない）。
+    """
+
+    def __init__(self, window: int = 5, poor_finish: int = 6, good_finish: int = 3, layoff_days: int = 70,
+                 rento_days: int = 7, excused_weight: float = 0.0, inconsistent_std: float = 3.0,
+                 inconsistent_min_runs: int = 3, light_z: float = 0.5, excuse_keywords=EXCUSE_KEYWORDS, light_methods=LIGHT_METHODS):
+        self.window = window
+        self.poor_finish = poor_finish
+        self.good_finish = good_finish
+        self.layoff_days = layoff_days
+        self.rento_days = rento_days
+        self.excused_weight = excused_weight
+        self.inconsistent_std = inconsistent_std
+        self.inconsistent_min_runs = inconsistent_min_runs
+        self.light_z = light_z
+        self._excuse_pattern = '|'.join(map(re.escape, excuse_keywords))
+        self._light_pattern = '|'.join(map(re.escape, light_methods))
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "FeatureEngine":
+        cfg = settings.get('features') or {}
+        return cls(
+            window=cfg.get('window', 5),
+            poor_finish=cfg.get('poor_finish', 6),
+            good_finish=cfg.get('good_finish', 3),
+            layoff_days=cfg.get('layoff_days', 70),
+            rento_days=cfg.get('rento_days', 7),
+            excused_weight=cfg.get('excused_weight', 0.0),
+            inconsistent_std=cfg.get('inconsistent_std', 3.0),
+            inconsistent_min_runs=cfg.get('inconsistent_min_runs', 3),
+            light_z=cfg.get('light_z', 0.5),
+            excuse_keywords=cfg.get('excuse_keywords') or EXCUSE_KEYWORDS,
+            light_methods=cfg.get('light_methods') or LIGHT_METHODS,
+        )
+
+    def build(self, races) -> pd.DataFrame:
+        """レース（Race か辞書）の列から特徴量表を作る"""
+        return self.build_from_tables(build_tables(races))
+
+    def build_from_tables(self, tables: dict) -> pd.DataFrame:
+        """exporter.build_tables / load_table の表から特徴量表を作る"""
+        runners = self._runners(tables)
+        history = self._history(tables['past_results'], runners)
+        features = self._as_of(runners, history)
+        return features[FEATURE_COLUMNS].sort_values(['race_id', 'horse_num'], ignore_index=True)
+
+    # --- 出走馬（今回のレース） ---
+
+    def _training(self, trainings: pd.DataFrame) -> pd.DataFrame:
+        t = trainings.sort_values(['race_id', 'horse_num', 'session_no'])
+        codes, _ = pd.factorize(t['course'])
+        z = normalize_by_course(t[TIME_COLUMNS].to_numpy(dtype=np.float32), codes)
+        t = t.assign(z_3f=z[:, TRAINING_FURLONGS.index('3f')], z_1f=z[:, TRAINING_FURLONGS.index('1f')])
+        keys = ['race_id', 'horse_num']
+        grouped = t.groupby(keys, observed=True)
+        last = t.drop_duplicates(keys, keep='last').set_index(keys)
+        light = (last['method'].astype(object).str.contains(self._light_pattern, na=False)
+                 | (last['z_3f'] > self.light_z))
+        return pd.DataFrame({
+            'n_sessions': grouped.size(),
+            'train_z_3f': last['z_3f'],
+            'train_z_1f': last['z_1f'],
+            'train_best_z_1f': grouped['z_1f'].min(),
+            'train_position': last['position'].astype('float32'),
+            'light_training': light,
+        }).reset_index()
+
+    def _runners(self, tables: dict) -> pd.DataFrame:
+        races = tables['races'][['race_id', 'race_date', 'surface', 'distance_m']]
+        runners = tables['runners'][['race_id', 'horse_num', 'horse_id']].merge(races, on='race_id', how='left')
+
+        comments = pd.concat([tables['stable_comments'], tables['previous_race_comments']])
+        excused = comments.loc[comments['comment'].str.contains(self._excuse_pattern, na=False),
+                               ['race_id', 'horse_num']].drop_duplicates()
+        runners = runners.merge(excused.assign(prev_run_excused=True), on=['race_id', 'horse_num'], how='left')
+        runners['prev_run_excused'] = runners['prev_run_excused'].fillna(False).astype(bool)
+        return runners.merge(self._training(tables['trainings']), on=['race_id', 'horse_num'], how='left')
+
+    # --- 過去走 ---
+
+    def _history(self, past_results: pd.DataFrame, runners: pd.DataFrame) -> pd.DataFrame:
+        runs = (past_results.dropna(subset=['horse_id', 'date'])
+                .drop_duplicates(['horse_id', 'date'], keep='last')
+                .sort_values(['horse_id', 'date'], ignore_index=True))
+        windows = HorseWindows(runs['horse_id'].to_numpy(dtype=object), self.window)
+        finish = runs['finish_position'].to_numpy(dtype=np.float64, na_value=np.nan)
+        poor = finish >= self.poor_finish
+        good = finish <= self.good_finish
+        interval = windows.diff(runs['date'].to_numpy(dtype='datetime64[D]').astype(np.float64))
+
+        # ① 次のレースのコメントに理由が書かれている凡走
+        excused = poor & self._excused_runs(runs, runners)
+        # ② そのレース時点の調教が分かっていて軽くなければ叩きとはみなさない（分からなければ間隔だけで判断）
+        known = runners.dropna(subset=['horse_id', 'race_date']).drop_duplicates(['horse_id', 'race_date'])
+        light = runs[['horse_id', 'date']].merge(
+            known[['horse_id', 'race_date', 'light_training']].rename(columns={'race_date': 'date'}),
+            on=['horse_id', 'date'], how='left')['light_training']
+        light = light.astype(object).fillna(True).astype(bool).to_numpy()
+        tataki = poor & ((interval >= self.layoff_days) | (interval <= self.rento_days)) & light & ~excused
+
+        weight = np.where(excused, self.excused_weight, 1.0)
+        weight = np.where(tataki | np.isnan(finish), 0.0, weight)
+        ratio = (runs['weight'].to_numpy(dtype=np.float64, na_value=np.nan)
+                 / runs['body_weight'].to_numpy(dtype=np.float64, na_value=np.nan))
+
+        weight_sum = windows.sum(weight)
+        finish_std = windows.std(finish)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            adjusted = np.where(weight_sum > 0, windows.sum(weight * np.nan_to_num(finish)) / weight_sum, np.nan)
+        return pd.DataFrame({
+            'horse_id': runs['horse_id'],
+            'date': runs['date'],
+            'n_runs': windows.position + 1,
+            'last_finish': finish,
+            'finish_mean': windows.mean(finish),
+            'finish_std': finish_std,
+            'adjusted_finish_mean': adjusted,
+            'excused_runs': windows.sum(excused),
+            'tataki_runs': windows.sum(tataki),
+            'inconsistent': ((windows.count(finish) >= self.inconsistent_min_runs) & (finish_std >= self.inconsistent_std)
+                             & (windows.sum(good) > 0) & (windows.sum(poor) > 0)),
+            'last_weight_ratio': ratio,
+            'weight_ratio_mean': windows.mean(ratio),
+        })
+
+    def _excused_runs(self, runs: pd.DataFrame, runners: pd.DataFrame) -> np.ndarray:
+        # 出走馬のコメントが指すのは、その出走日より前の最新の過去走
+        flagged = runners.loc[runners['prev_run_excused'], ['horse_id', 'race_date']].dropna()
+        if flagged.empty or runs.empty:
+            return np.zeros(len(runs), dtype=bool)
+        previous = pd.merge_asof(
+            flagged.sort_values('race_date'),
+            runs[['horse_id', 'date']].sort_values('date'),
+            left_on='race_date', right_on='date', by='horse_id', allow_exact_matches=False,
+        ).dropna(subset=['date'])
+        keys = pd.MultiIndex.from_frame(previous[['horse_id', 'date']])
+        return pd.MultiIndex.from_frame(runs[['horse_id', 'date']]).isin(keys)
+
+    def _as_of(self, runners: pd.DataFrame, history: pd.DataFrame) -> pd.DataFrame:
+        keyed = runners.dropna(subset=['horse_id', 'race_date'])
+        matched = pd.merge_asof(
+            keyed[['horse_id', 'race_date']].reset_index().sort_values('race_date'),
+            history.sort_values('date'),
+            left_on='race_date', right_on='date', by='horse_id', allow_exact_matches=False,
+        ).set_index('index')
+        features = runners.join(matched.drop(columns=['horse_id', 'race_date']))
+        features['days_since_last'] = (features['race_date'] - features['date']).dt.days
+        features['n_runs'] = features['n_runs'].fillna(0).astype('int16')
+        features['n_sessions'] = features['n_sessions'].fillna(0).astype('int16')
+        features['inconsistent'] = features['inconsistent'].astype(object).fillna(False).astype(bool)
+        features['light_training'] = features['light_training'].astype('boolean')
+        features[FLOAT_FEATURES] = features[FLOAT_FEATURES].astype('float32')
+        return features
@@ -0,0 +1,154 @@
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.models.race import Race
+from src.utils.convert import TRAINING_FURLONGS
+
+N_FURLONGS = len(TRAINING_FURLONGS)
+_NO_SESSION = (None,) * (N_FURLONGS + 1)
+
+
+def _to_float32(values: np.ndarray) -> np.ndarray:
+    try:
+        return values.astype(np.float32)
+    except (TypeError, ValueError):
+        # 数値でないセルが混じっていれば NaN にする（遅い経路）
+        series = pd.Series(values, dtype=object).str.normalize('NFKC')
+        return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float32)
+
+
+def decode_times(cells_lists):
+    """パーサーの times（文字列のリスト）の列を一括で数値にする
+
+    返り値は (times, position)。times は (件数, 5) の float32 で列は 6F..1F、無いハロンは NaN。
+    先頭の空欄はパーサーが落としているので右詰めで対応付ける。最後の "［６］" は position（無ければ NaN）。
+    """
+    cells_lists = [cells or () for cells in cells_lists]
+    n = len(cells_lists)
+    times = np.full((n, N_FURLONGS), np.nan, dtype=np.float32)
+    position = np.full(n, np.nan, dtype=np.float32)
+    lengths = np.fromiter(map(len, cells_lists), dtype=np.int64, count=n)
+    if not lengths.sum():
+        return times, position
+
+    cells = np.empty(lengths.sum(), dtype=object)
+    cells[:] = list(itertools.chain.from_iterable(cells_lists))
+    row = np.repeat(np.arange(n), lengths)
+    ends = np.cumsum(lengths)
+    rows = np.flatnonzero(lengths)
+    # 着順マーカー（［６］）は各行の最後のセルにしか無い
+    last = cells[ends[rows] - 1].astype(str)
+    # np.strings は NumPy 2 にしか無いので np.char と pandas の .str で書く
+    is_marker = np.char.startswith(last, '［') | np.char.startswith(last, '[')
+    has_marker = np.zeros(n, dtype=bool)
+    has_marker[rows[is_marker]] = True
+    position[has_marker] = _to_float32(pd.Series(last[is_marker]).str.slice(1, -1).to_numpy())
+
+    # 行末から数えた位置で列を決める（マーカーのある行は1つずらす）
+    from_end = ends[row] - np.arange(len(row)) - 1 - has_marker[row]
+    column = N_FURLONGS - 1 - from_end
+    is_time = (from_end >= 0) & (column >= 0)
+    times[row[is_time], column[is_time]] = _to_float32(cells[is_time])
+    return times, position
+
+
+@dataclass
+class TrainingMatrix:
+    """調教セッションを1行ずつ並べた配列（レース1つでもアーカイブ全体でも同じ形）"""
+    race_id: np.ndarray         # object
+    horse_num: np.ndarray       # int16（不明は -1）
+    session_no: np.ndarray      # int8（馬ごとに 1 から）
+    times: np.ndarray           # (n, 5) float32、列は TRAINING_FURLONGS
+    position: np.ndarray        # float32
+    course_codes: np.ndarray    # int16（不明は -1）、courses の添字
+    courses: pd.Index
+    method_codes: np.ndarray
+    methods: pd.Index
+
+    def __len__(self):
+        return len(self.race_id)
+
+    @classmethod
+    def from_races(cls, races) -> "TrainingMatrix":
+        """Race（または scrape() / to_dict() の辞書）の列から作る
+
+        scrape() の辞書はタイムが文字列のままなので decode_times でまとめて変換する。
+        """
+        keys, sessions, courses, methods = [], [], [], []
+        raw_rows, raw_cells = [], []
+        for race in races:
+            if not (isinstance(race, dict) and 'horses' in race):
+                race = Race.coerce(race)
+                for runner in race.runners:
+                    for session_no, session in enumerate(runner.training, start=1):
+                        keys.append((race.race_id, runner.horse_num, session_no))
+                        sessions.append(session.times + (session.position,))
+                        courses.append(session.course)
+                        methods.append(session.method)
+                continue
+            for horse in race.get('horses', []):
+                details = (horse.get('training_data') or {}).get('details', [])
+                for session_no, detail in enumerate(details, start=1):
+                    raw_rows.append(len(keys))
+                    raw_cells.append(detail.get('times'))
+                    keys.append((str(race['race_id']) if race.get('race_id') else None, horse.get('horse_num'), session_no))
+                    sessions.append(_NO_SESSION)
+                    parts = (detail.get('date_location') or '').split()
+                    courses.append(parts[1] if len(parts) > 1 else None)
+                    methods.append(detail.get('追い切り方') or None)
+
+        # モデルは変換済みなのでそのまま配列にし、未変換の分だけ一括デコードする
+        table = np.array(sessions, dtype=np.float32).reshape(-1, N_FURLONGS + 1)
+        times, position = table[:, :N_FURLONGS], table[:, N_FURLONGS]
+        if raw_rows:
+            times[raw_rows], position[raw_rows] = decode_times(raw_cells)
+
+        race_id = np.array([k[0] for k in keys], dtype=object)
+        horse_num = pd.to_numeric(pd.Series([k[1] for k in keys], dtype=object), errors='coerce')
+        course_codes, course_index = pd.factorize(pd.Series(courses, dtype=object))
+        method_codes, method_index = pd.factorize(pd.Series(methods, dtype=object))
+        return cls(
+            race_id=race_id,
+            horse_num=horse_num.fillna(-1).to_numpy(dtype=np.int16),
+            session_no=np.array([k[2] for k in keys], dtype=np.int8),
+            times=times,
+            position=position,
+            course_codes=course_codes.astype(np.int16),
+            courses=course_index,
+            method_codes=method_codes.astype(np.int16),
+            methods=method_index,
+        )
+
+    def normalized_times(self, min_sessions: int = 2) -> np.ndarray:
+        """コースごと・ハロンごとの z スコア（負ほど速い）。件数が min_sessions 未満のコースは NaN"""
+        return normalize_by_course(self.times, self.course_codes, min_sessions)
+
+    def to_frame(self, normalized: bool = False) -> pd.DataFrame:
+        df = pd.DataFrame({
+            'race_id': self.race_id, 'horse_num': self.horse_num, 'session_no': self.session_no,
+            'course': pd.Categorical.from_codes(self.course_codes, self.courses),
+            'method': pd.Categorical.from_codes(self.method_codes, self.methods),
+            'position': self.position,
+        })
+        for i, furlong in enumerate(TRAINING_FURLONGS):
+            df[f'time_{furlong}'] = self.times[:, i]
+        if normalized:
+            z = self.normalized_times()
+            for i, furlong in enumerate(TRAINING_FURLONGS):
+                df[f'z_{furlong}'] = z[:, i]
+        return df
+
+
+def normalize_by_course(times: np.ndarray, course_codes: np.ndarray, min_sessions: int = 2) -> np.ndarray:
+    """times の各列をコースごとに標準化する。同じタイムでも坂路とウッドでは意味が違うため"""
+    frame = pd.DataFrame(times, dtype=np.float64)
+    groups = frame.groupby(course_codes)
+    mean = groups.transform('mean')
+    std = groups.transform('std')
+    count = groups.transform('count')
+    z = ((frame - mean) / std.where(std > 0)).to_numpy(dtype=np.float32)
+    valid = (count.to_numpy() >= min_sessions) & (np.asarray(course_codes) >= 0)[:, None]
+    return np.where(valid, z, np.float32(np.nan))
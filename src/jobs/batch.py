@@ -0,0 +1,132 @@
+import asyncio
+
+from src.jobs.queue import JobQueue
+from src.scrapers.fetcher import HybridFetcher
+from src.scrapers.keibabook import KeibaBookScraper
+from src.scrapers.resilience import FetchResilience
+from src.storage.change_tracker import ChangeTracker, summarize_changes
+from src.storage.horse_store import HorseStore
+from src.storage.output_sink import JsonlSink
+from src.storage.page_archive import PageArchive
+from src.storage.page_cache import PageCache
+from src.utils.logger import get_logger
+from src.utils.metrics import Metrics
+from src.utils.race_id import race_settings
+from src.utils.rate_limiter import HostRateLimiter
+
+logger = get_logger(__name__)
+
+
+class BatchRunner:
+    """JobQueue のレースを concurrency 件ずつ並行してスクレイピングする
+
+    レート制御・再試行の状態・キャッシュ・アーカイブ・HTTP セッション・ブラウザ/パースのプール・馬柱ストア・変更検出は全レースで共有する。
+    結果は JsonlSink に渡し、実際に書き出された時点でジョブを done にする
+    （書き出し前に落ちたレースは running のまま残り、次回やり直される）。
+    """
+
+    def __init__(self, settings: dict, queue: JobQueue, concurrency: int = None, browser_pool=None,
+                 parse_pool=None, sink: JsonlSink = None):
+        self.settings = settings
+        self.queue = queue
+        self.concurrency = concurrency or (settings.get('batch') or {}).get('concurrency', 2)
+        self.browser_pool = browser_pool
+        self.parse_pool = parse_pool
+        self.metrics = Metrics.from_settings(settings)
+        self.rate_limiter = HostRateLimiter.from_settings(settings)
+        self.page_cache = PageCache.from_settings(settings)
+        self.archive = PageArchive.from_settings(settings)
+        self.fetcher = HybridFetcher.from_settings(settings, self.metrics)
+        self.resilience = FetchResilience.from_settings(settings, self.metrics)
+        self.horse_store = HorseStore.from_settings(settings)
+        self.sink = sink or JsonlSink.from_settings(settings, self.metrics)
+        self.change_tracker = ChangeTracker.from_settings(settings)
+        self._completions = []
+
+    def make_scraper(self, race_id: str) -> KeibaBookScraper:
+        return KeibaBookScraper(
+            race_settings(self.settings, race_id),
+            rate_limiter=self.rate_limiter,
+            page_cache=self.page_cache,
+            fetcher=self.fetcher,
+            browser_pool=self.browser_pool,
+            parse_pool=self.parse_pool,
+            horse_store=self.horse_store,
+            change_tracker=self.change_tracker,
+            metrics=self.metrics,
+            resilience=self.resilience,
+            archive=self.archive,
+        )
+
+    async def run_race(self, race_id: str, entries_only: bool = False):
+        """(race, 前回からの差分, 書き出しの Future) を返す。差分が空なら書き出さない（Future は完了済み）
+
+        entries_only なら出馬表だけを取り直し、他の項目は前回記録したレースから引き継ぐ（記録が無ければ全ページ）。
+        """
+        scraper = self.make_scraper(race_id)
+        previous = None
+        if entries_only and self.change_tracker is not None:
+            previous = self.change_tracker.last_race(race_id)
+        if previous is not None:
+            race = await scraper.scrape_entries(previous)
+        else:
+            race = await scraper.scrape_race(race_id)
+        changes = scraper.changes
+        if changes == []:
+            logger.info("race %s unchanged", race_id, extra={'race_id': race_id})
+            written = asyncio.get_running_loop().create_future()
+            written.set_result(None)
+            return race, changes, written
+        if changes is not None:
+            logger.info("race %s changed: %s", race_id, summarize_changes(changes), extra={'race_id': race_id})
+        return race, changes, await self.sink.write(race)
+
+    async def _complete_when_written(self, race, changes, written: asyncio.Future):
+        race_id = race.race_id
+        try:
+            await written
+        except Exception as e:
+            self.queue.fail(race_id, f"write failed: {e}")
+            return
+        if changes and self.change_tracker is not None:
+            # 書き出せたものだけを次回の比較対象にする
+            self.change_tracker.record(race, changes)
+        self.queue.complete(race_id, self.sink.race_json_path(race_id) if self.sink.write_race_json else None)
+        logger.info("race %s done", race_id, extra={'race_id': race_id})
+
+    async def _worker(self):
+        while True:
+            race_id = self.queue.claim()
+            if race_id is None:
+                return
+            try:
+                result = await self.run_race(race_id)
+            except Exception as e:
+                state = self.queue.fail(race_id, f"{type(e).__name__}: {e}")
+                logger.warning("race %s failed (%s): %s", race_id, state, e, extra={'race_id': race_id})
+            else:
+                # 書き出しを待たずに次のレースへ進む
+                self._completions.append(asyncio.create_task(self._complete_when_written(*result)))
+
+    async def run(self) -> dict:
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+        finally:
+            await self.close('batch')
+        return self.queue.counts()
+
+    async def close(self, run_name: str = 'batch'):
+        await self.sink.close()
+        await asyncio.gather(*self._completions)
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.horse_store is not None:
+            self.horse_store.close()
+        if self.change_tracker is not None:
+            self.change_tracker.close()
+        self.fetcher.close()
+        paths = self.metrics.export(run_name)
+        if paths is not None:
+            logger.info("metrics written to %s", ', '.join(paths))
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import time
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """SQLite に永続化したレース単位のジョブキュー
+
+    状態は pending → running → done / failed。プロセスが落ちて running のまま残ったジョブは
+    次回 open 時に pending に戻すので、完了済み (done) 以外だけが再実行される。
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " race_id TEXT PRIMARY KEY, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT, result_path TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state)")
+        self._conn.commit()
+        self.recover()
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "JobQueue":
+        cfg = settings.get('batch') or {}
+        path = cfg.get('queue_path') or os.path.join(settings.get('output_dir', 'data'), 'jobs.sqlite3')
+        return cls(path, max_attempts=cfg.get('max_attempts', 3))
+
+    def recover(self) -> int:
+        cursor = self._conn.execute("UPDATE jobs SET state = ? WHERE state = ?", (PENDING, RUNNING))
+        self._conn.commit()
+        return cursor.rowcount
+
+    def enqueue(self, race_ids) -> int:
+        """未登録のレースだけを追加する（既存ジョブの状態は変えない）"""
+        now = time.time()
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO jobs (race_id, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((race_id, PENDING, now, now) for race_id in race_ids),
+        )
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def retry_failed(self) -> int:
+        cursor = self._conn.execute(
+            "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?", (PENDING, time.time(), FAILED))
+        self._conn.commit()
+        return cursor.rowcount
+
+    def claim(self):
+        """pending のジョブを1件 running にして race_id を返す。無ければ None"""
+        row = self._conn.execute(
+            "SELECT race_id FROM jobs WHERE state = ? ORDER BY race_id LIMIT 1", (PENDING,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE race_id = ?",
+            (RUNNING, time.time(), row[0]))
+        self._conn.commit()
+        return row[0]
+
+    def complete(self, race_id: str, result_path: str = None):
+        self._conn.execute(
+            "UPDATE jobs SET state = ?, error = NULL, result_path = ?, updated_at = ? WHERE race_id = ?",
+            (DONE, result_path, time.time(), race_id))
+        self._conn.commit()
+
+    def fail(self, race_id: str, error: str):
+        """失敗を記録する。試行回数が max_attempts 未満なら pending に戻す"""
+        (attempts,) = self._conn.execute("SELECT attempts FROM jobs WHERE race_id = ?", (race_id,)).fetchone()
+        state = FAILED if attempts >= self.max_attempts else PENDING
+        self._conn.execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE race_id = ?",
+            (state, error, time.time(), race_id))
+        self._conn.commit()
+        return state
+
+    def get(self, race_id: str):
+        row = self._conn.execute(
+            "SELECT race_id, state, attempts, error, result_path FROM jobs WHERE race_id = ?", (race_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('race_id', 'state', 'attempts', 'error', 'result_path'), row))
+
+    def counts(self) -> dict:
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")))
+        return counts
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,286 @@
+import asyncio
+import csv
+import datetime
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+
+import schedule
+
+from src.jobs.batch import BatchRunner
+from src.utils.logger import get_logger
+from src.utils.race_id import expand_race_ids, parse_race_id, race_settings
+
+logger = get_logger(__name__)
+
+ENTRIES = 'entries'   # 出馬表だけ取り直す（取消・乗り替わり）
+FULL = 'full'         # 全ページ（調教・血統・コメント・馬柱）
+RESULTS = 'results'   # 成績ページ（成績のパーサーはまだ無いので、取得してキャッシュとアーカイブに残すだけ）
+
+# 準備できたジョブの優先順（小さいほど先）。同じ順位なら発走が近いレースから
+KIND_PRIORITY = {ENTRIES: 0, FULL: 1, RESULTS: 2}
+
+
+def estimate_post_times(race_ids, date: datetime.date, first_post: str = '10:05', interval_min: int = 30,
+                        overrides: dict = None) -> dict:
+    """race_id → 発走時刻（UNIX 時刻）。overrides（race_id → "HH:MM"）が無いレースは
+    1R を first_post として interval_min 分おきと見積もる"""
+    overrides = {str(k): v for k, v in (overrides or {}).items()}
+    first = datetime.datetime.combine(date, datetime.time.fromisoformat(first_post))
+    card = {}
+    for race_id in race_ids:
+        if race_id in overrides:
+            post = datetime.datetime.combine(date, datetime.time.fromisoformat(overrides[race_id]))
+        else:
+            post = first + datetime.timedelta(minutes=interval_min * (parse_race_id(race_id)['race'] - 1))
+        card[race_id] = post.timestamp()
+    return card
+
+
+def load_card_csv(path: str) -> dict:
+    """race_id,post_time（HH:MM）の CSV を読む"""
+    with open(path, encoding='utf-8') as f:
+        return {row['race_id']: row['post_time'] for row in csv.DictReader(f)}
+
+
+@dataclass(order=True)
+class RaceDayJob:
+    due: float
+    seq: int
+    race_id: str = field(compare=False)
+    kind: str = field(compare=False)
+    post_time: float = field(compare=False)
+
+    @property
+    def key(self):
+        return self.race_id, self.kind
+
+
+class RequestBudget:
+    """1時間あたりのリクエスト数の上限（トークンバケット）
+
+    ジョブの実行前に見込みの件数を reserve し、実行後に実際の件数で settle する。
+    """
+
+    def __init__(self, per_hour: float, burst: float = None, clock=time.monotonic):
+        self.rate = per_hour / 3600.0
+        self.burst = burst if burst is not None else max(1.0, per_hour / 6)
+        self.clock = clock
+        self.tokens = self.burst
+        self.spent = 0
+        self._last = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def reserve(self, cost: float) -> bool:
+        self._refill()
+        cost = min(cost, self.burst)  # バーストより大きいジョブも満杯になれば実行できる
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def settle(self, reserved: float, used: float):
+        # 見込みとの差を戻す（キャッシュで済めば戻り、多ければ前借りになる）
+        self.tokens = min(self.burst, self.tokens + min(reserved, self.burst) - used)
+        self.spent += used
+
+    def seconds_until(self, cost: float) -> float:
+        missing = min(cost, self.burst) - self.available()
+        return max(0.0, missing / self.rate) if self.rate > 0 else float('inf')
+
+
+class RaceDayScheduler:
+    """開催日のジョブを発走時刻に合わせて並べる優先度付きキュー（I/O は持たない）
+
+    同じレース・同じ種類のジョブは1つにまとめ（早い方の予定時刻を残す）、同じレースの全ページ取得が
+    実行待ちになっているときは出馬表だけの取り直しを省く。
+    """
+
+    def __init__(self, budget: RequestBudget, costs: dict = None, clock=time.time):
+        self.budget = budget
+        self.costs = {ENTRIES: 1, FULL: 23, RESULTS: 1}
+        self.costs.update(costs or {})
+        self.clock = clock
+        self.stats = {'added': 0, 'coalesced': 0, 'dropped': 0, 'run': 0}
+        self._pending = {}   # (race_id, kind) → RaceDayJob
+        self._waiting = []   # 予定時刻順のヒープ
+        self._ready = []     # (優先度, 発走時刻, seq, key) のヒープ
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, kind: str, race_id: str, due: float, post_time: float) -> bool:
+        key = (race_id, kind)
+        existing = self._pending.get(key)
+        if existing is not None:
+            self.stats['coalesced'] += 1
+            if existing.due <= due:
+                return False
+        job = RaceDayJob(due, next(self._seq), race_id, kind, post_time)
+        self._pending[key] = job
+        heapq.heappush(self._waiting, job)
+        self.stats['added'] += 1
+        return True
+
+    def plan(self, card: dict, full_before_min: float = 180, entries_before_min=(30, 10),
+             results_after_min: float = 20):
+        """card（race_id → 発走時刻）の各レースにジョブを積む"""
+        now = self.clock()
+        for race_id, post in card.items():
+            self.add(FULL, race_id, max(now, post - full_before_min * 60), post)
+            for minutes in entries_before_min:
+                if post - minutes * 60 > now:
+                    self.add(ENTRIES, race_id, post - minutes * 60, post)
+            self.add(RESULTS, race_id, max(now, post + results_after_min * 60), post)
+
+    def release(self) -> int:
+        """予定時刻を過ぎたジョブを実行待ちに移す"""
+        now = self.clock()
+        released = 0
+        while self._waiting and self._waiting[0].due <= now:
+            job = heapq.heappop(self._waiting)
+            if self._pending.get(job.key) is not job:
+                continue  # まとめられて置き換わった古いジョブ
+            heapq.heappush(self._ready, (KIND_PRIORITY[job.kind], job.post_time, job.seq, job.key))
+            released += 1
+        return released
+
+    def next_job(self):
+        """次に実行するジョブ。予算が足りなければ None（優先度の低いジョブで追い越さない）"""
+        self.release()
+        now = self.clock()
+        while self._ready:
+            _, post_time, seq, key = self._ready[0]
+            job = self._pending.get(key)
+            if job is None or job.seq != seq:
+                heapq.heappop(self._ready)
+                continue
+            if job.kind == ENTRIES and post_time <= now:
+                # 発走後の出馬表の取り直しは意味がない
+                heapq.heappop(self._ready)
+                del self._pending[key]
+                self.stats['dropped'] += 1
+                continue
+            full = self._pending.get((job.race_id, FULL))
+            if job.kind == ENTRIES and full is not None and full.due <= now:
+                # 同じレースの全ページ取得が実行待ちなら出馬表もそちらで取れる
+                heapq.heappop(self._ready)
+                del self._pending[key]
+                self.stats['coalesced'] += 1
+                continue
+            if not self.budget.reserve(self.costs[job.kind]):
+                return None
+            heapq.heappop(self._ready)
+            del self._pending[key]
+            return job
+        return None
+
+    def done(self, job: RaceDayJob, requests: int):
+        self.budget.settle(self.costs[job.kind], requests)
+        self.stats['run'] += 1
+
+    def seconds_until_next(self) -> float:
+        """次に何か実行できそうになるまでの秒数の目安"""
+        if self._ready:
+            _, _, _, key = self._ready[0]
+            job = self._pending.get(key)
+            if job is not None:
+                return self.budget.seconds_until(self.costs[job.kind])
+            return 0.0
+        if self._waiting:
+            return max(0.0, self._waiting[0].due - self.clock())
+        return 0.0
+
+
+class RaceDayDaemon:
+    """開催日の出馬表・調教・コメント・成績を発走時刻に合わせて取りに行く
+
+    取得と保存は BatchRunner の部品（レート制御・キャッシュ・変更検出・JsonlSink）を共有して行う。
+    ジョブは1つずつ実行し、実際に送ったリクエスト数（fetcher の requests）を予算から引く。
+    出馬表の取り直しは出馬表のページだけを取り、他の項目は前回記録したレースから引き継ぐ。
+    成績は取得してキャッシュとアーカイブに残すだけ（成績のパーサーはまだ無いので書き出さない）。
+    """
+
+    def __init__(self, settings: dict, card: dict, browser_pool=None, parse_pool=None, sink=None, clock=time.time):
+        cfg = settings.get('race_day') or {}
+        self.settings = settings
+        self.card = card
+        self.runner = BatchRunner(settings, None, browser_pool=browser_pool, parse_pool=parse_pool, sink=sink)
+        if self.runner.page_cache is not None:
+            self.runner.page_cache.set_post_times(card)
+        budget = RequestBudget(cfg.get('requests_per_hour', 600), cfg.get('burst'))
+        self.scheduler = RaceDayScheduler(budget, cfg.get('costs'), clock=clock)
+        self.scheduler.plan(card, cfg.get('full_before_min', 180), cfg.get('entries_before_min', (30, 10)),
+                            cfg.get('results_after_min', 20))
+        self.tick_seconds = cfg.get('tick_seconds', 15)
+        # 待ち時間の管理は asyncio 側で行い、schedule は定期処理（状況の記録）に使う
+        self._schedule = schedule.Scheduler()
+        self._schedule.every(cfg.get('status_interval_min', 10)).minutes.do(self.log_status)
+
+    def _requests(self) -> int:
+        return self.runner.fetcher.stats['requests']
+
+    async def execute(self, job: RaceDayJob):
+        if job.kind == RESULTS:
+            await self.runner.make_scraper(job.race_id).fetch_results()
+            return
+        if job.kind == ENTRIES and self.runner.page_cache is not None:
+            self.runner.page_cache.invalidate(race_settings(self.settings, job.race_id)['shutuba_url'])
+        race, changes, written = await self.runner.run_race(job.race_id, entries_only=job.kind == ENTRIES)
+        await written
+        if changes and self.runner.change_tracker is not None:
+            self.runner.change_tracker.record(race, changes)
+
+    async def run_once(self) -> bool:
+        """実行できるジョブを1つ実行する。無ければ False"""
+        job = self.scheduler.next_job()
+        if job is None:
+            return False
+        before = self._requests()
+        try:
+            await self.execute(job)
+        except Exception as e:
+            logger.warning("%s %s failed: %s", job.kind, job.race_id, e, extra={'race_id': job.race_id, 'job': job.kind})
+        finally:
+            self.scheduler.done(job, self._requests() - before)
+        requests = self._requests() - before
+        logger.info("%s %s done (%d requests)", job.kind, job.race_id, requests,
+                    extra={'race_id': job.race_id, 'job': job.kind, 'requests': requests})
+        return True
+
+    def log_status(self):
+        logger.info("race day: %d jobs pending, budget %.0f requests available, %s",
+                    len(self.scheduler), self.scheduler.budget.available(), self.scheduler.stats)
+        # 開催中も段階ごとの所要時間を見られるように metrics.prom を更新する
+        self.runner.metrics.export_prometheus()
+
+    async def run(self):
+        try:
+            while len(self.scheduler):
+                self._schedule.run_pending()
+                if not await self.run_once():
+                    await asyncio.sleep(min(self.tick_seconds, max(0.1, self.scheduler.seconds_until_next())))
+        finally:
+            await self.runner.close('race_day')
+        self.log_status()
+        return self.scheduler.stats
+
+
+def day_card(settings: dict, year: int, kai: int, venue: str, day: int, races: str = '1-12',
+             date: datetime.date = None, overrides: dict = None) -> dict:
+    cfg = settings.get('race_day') or {}
+    race_ids = expand_race_ids(year, kai, venue, str(day), races, settings.get('venue_codes'))
+    merged = dict(cfg.get('post_times') or {})
+    merged.update(overrides or {})
+    return estimate_post_times(race_ids, date or datetime.date.today(), cfg.get('first_post', '10:05'),
+                               cfg.get('post_interval_min', 30), merged)
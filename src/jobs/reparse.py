@@ -0,0 +1,614 @@
+import datetime
+import functools
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+
+import numpy as np
+
+from src.models.race import Race
+from src.scrapers.keibabook import PAGE_PARSERS, merge_pages
+from src.scrapers.parse_pool import worker_settings
+from src.storage.change_tracker import ChangeTracker, diff_races
+from src.storage.output_sink import write_json_atomic
+from src.storage.page_archive import PageArchive, page_type_code, url_hash
+from src.storage.page_cache import classify_url
+from src.utils import convert
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# レースを組み立てるページ種別（出馬表に他を付ける）と、再パースできる全種別
+RACE_PAGE_TYPES = ('syutuba', 'cyokyo', 'kettou', 'danwa', 'syoin')
+REPARSE_PAGE_TYPES = RACE_PAGE_TYPES + ('horse',)
+# 差分の要約に載せるページの数（空になったページ・エラー）
+EXAMPLES = 20
+
+# ワーカープロセス内でだけ使うパーサーとアーカイブ（initializer で1回だけ作る）
+_worker = None
+
+
+def _init_worker(settings, archive_path):
+    global _worker
+    from src.scrapers.keibabook import KeibaBookScraper
+    # 索引もセグメントも mmap で開くだけなので、ワーカーごとに開いても軽い
+    _worker = (KeibaBookScraper(settings), PageArchive(archive_path, readonly=True))
+
+
+def _parse_pages(pages):
+    scraper, _ = _worker
+    records = []
+    for page in pages:
+        parsed, error = None, None
+        try:
+            parsed = getattr(scraper, PAGE_PARSERS[page.page_type])(page.html)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        records.append({'url': page.url, 'page_type': page.page_type, 'race_id': page.race_id,
+                        'fetched_at': page.fetched_at, 'parsed': parsed, 'error': error})
+    return records
+
+
+def _parse_rows(rows):
+    """索引の行（セグメント・オフセット）を受け取り、本文を読んでパースする（HTML はプロセス間で送らない）"""
+    _, archive = _worker
+    return _parse_pages(archive.read(row) for row in rows)
+
+
+def _parse_urls(urls):
+    """URL の最新の版をアーカイブで引いてパースする（出馬表から辿った馬柱。無い URL は飛ばす）"""
+    _, archive = _worker
+    return _parse_pages(page for page in map(archive.page, urls) if page is not None)
+
+
+# --- 差分 ---
+
+def _fields(value) -> dict:
+    return value if isinstance(value, dict) else {'comment': value}
+
+
+def _result_key(index, result) -> str:
+    # 馬柱は新しい出走が先頭に増えるので、添字ではなく日付・場・R で対応させる
+    if isinstance(result, dict) and result.get('date'):
+        return f"{result.get('date')}/{result.get('venue')}/{result.get('race_num')}"
+    return str(index)
+
+
+def page_rows(parsed) -> dict:
+    """パース結果を 行キー → {項目: 値} にする（差分を行・項目の単位で数えるため）"""
+    if isinstance(parsed, list):  # 馬柱: 過去の出走ごと
+        return {_result_key(i, r): _fields(r) for i, r in enumerate(parsed)}
+    if not isinstance(parsed, dict):
+        return {}
+    if 'horses' in parsed:  # 出馬表: レース全体の項目と各馬
+        rows = {'race': {k: v for k, v in parsed.items() if k != 'horses'}}
+        rows.update({str(h.get('horse_num')): _fields(h) for h in parsed['horses']})
+        return rows
+    return {str(k): _fields(v) for k, v in parsed.items()}  # 馬番 → 項目 / コメント
+
+
+def is_populated(value) -> bool:
+    return value not in (None, '', [], {})
+
+
+def is_empty(parsed) -> bool:
+    """何も取れていないパース結果か（出馬表は馬がいなければ空）"""
+    if isinstance(parsed, dict) and 'horses' in parsed:
+        return not parsed['horses']
+    return not parsed
+
+
+class ParseDiff:
+    """ページ種別ごと・項目ごとに、前回の出力と今回の出力の違いを数える
+
+    項目ごとに changed（値が変わった行）・newly_populated（空だったのが取れるようになった行）・
+    newly_empty（取れていたのが空になった行）を数え、ページが丸ごと空になったものは now_empty に挙げる。
+    """
+
+    def __init__(self):
+        self.page_types = {}
+
+    def _stats(self, page_type: str) -> dict:
+        stats = self.page_types.get(page_type)
+        if stats is None:
+            stats = self.page_types[page_type] = {
+                'pages': 0, 'errors': 0, 'new_pages': 0, 'changed_pages': 0, 'empty_pages': 0,
+                'rows_changed': 0, 'rows_added': 0, 'rows_removed': 0,
+                'fields': {}, 'now_empty': [], 'now_empty_count': 0, 'error_examples': [],
+            }
+        return stats
+
+    def add(self, record: dict, previous=None, has_previous: bool = False):
+        stats = self._stats(record['page_type'])
+        stats['pages'] += 1
+        label = record['race_id'] or record['url']
+        if record['error'] is not None:
+            stats['errors'] += 1
+            if len(stats['error_examples']) < EXAMPLES:
+                stats['error_examples'].append({'page': label, 'error': record['error']})
+            return
+        parsed = record['parsed']
+        if is_empty(parsed):
+            stats['empty_pages'] += 1
+        if not has_previous:
+            stats['new_pages'] += 1
+            return
+        if is_empty(parsed) and not is_empty(previous):
+            stats['now_empty_count'] += 1
+            if len(stats['now_empty']) < EXAMPLES:
+                stats['now_empty'].append(label)
+
+        old_rows, new_rows = page_rows(previous), page_rows(parsed)
+        stats['rows_added'] += len(new_rows.keys() - old_rows.keys())
+        stats['rows_removed'] += len(old_rows.keys() - new_rows.keys())
+        page_changed = bool(new_rows.keys() ^ old_rows.keys())
+        for key in new_rows.keys() & old_rows.keys():
+            old, new = old_rows[key], new_rows[key]
+            row_changed = False
+            for name in old.keys() | new.keys():
+                before, after = old.get(name), new.get(name)
+                if before == after:
+                    continue
+                row_changed = True
+                field = stats['fields'].setdefault(name, {'changed': 0, 'newly_populated': 0, 'newly_empty': 0})
+                field['changed'] += 1
+                if is_populated(after) and not is_populated(before):
+                    field['newly_populated'] += 1
+                elif is_populated(before) and not is_populated(after):
+                    field['newly_empty'] += 1
+            if row_changed:
+                stats['rows_changed'] += 1
+                page_changed = True
+        if page_changed:
+            stats['changed_pages'] += 1
+
+    def summary(self) -> dict:
+        return {page_type: dict(stats, fields=dict(sorted(stats['fields'].items(),
+                                                           key=lambda item: item[1]['changed'], reverse=True)))
+                for page_type, stats in sorted(self.page_types.items())}
+
+
+# --- レースの組み立て ---
+
+def _run_before(result, race_date) -> bool:
+    run_date = convert.slash_date(result.get('date')) if isinstance(result, dict) else None
+    return race_date is None or run_date is None or run_date < race_date
+
+
+def assemble_race(race_id: str, pages: dict, horse_pages: dict) -> Race:
+    """1レース分のパース結果（種別 → 結果）と馬柱（リンクのパス → 結果）から scrape() と同じ形を作って Race にする
+
+    馬柱はアーカイブの最新の版なので、レース当日以降の出走は落としてそのレース時点の馬柱にする。
+    """
+    race_data = pages['syutuba']
+    merge_pages(race_data, pages.get('cyokyo') or {}, pages.get('kettou') or {}, pages.get('danwa') or {},
+                pages.get('syoin') or {})
+    race_date = convert.race_date(race_data.get('race_name'))
+    for horse in race_data.get('horses', []):
+        link = horse.get('horse_name_link')
+        past_results = horse_pages.get(urlparse(link).path) if link else None
+        if past_results is not None:
+            horse['past_results'] = [r for r in past_results if _run_before(r, race_date)]
+    return Race.from_scraped(race_data, race_id)
+
+
+def _page_key(record) -> str:
+    # レースのページはレースごとに1つなので race_id、馬柱は URL で引く
+    return record['race_id'] or record['url']
+
+
+def _json_line(value) -> bytes:
+    return (json.dumps(value, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _index_jsonl(path: str, key) -> dict:
+    """jsonl の 行のキー → バイトオフセット（エラーだった行は含めない）"""
+    offsets = {}
+    if not os.path.exists(path):
+        return offsets
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get('error') is None:
+                    offsets[key(record)] = offset
+            offset += len(line)
+    return offsets
+
+
+class RunBaseline:
+    """以前の再パースの出力を比較対象にする（各行の位置だけを持ち、記録はその都度ファイルから読む）"""
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self._offsets = {t: _index_jsonl(os.path.join(run_dir, f"pages-{t}.jsonl"), _page_key)
+                         for t in REPARSE_PAGE_TYPES}
+        self._race_offsets = _index_jsonl(os.path.join(run_dir, 'races.jsonl'), lambda r: r['race_id'])
+        self._files = {}
+
+    def _read(self, name: str, offset: int) -> bytes:
+        f = self._files.get(name)
+        if f is None:
+            f = self._files[name] = open(os.path.join(self.run_dir, name), 'rb')
+        f.seek(offset)
+        return f.readline()
+
+    def page(self, page_type: str, key: str):
+        offset = self._offsets[page_type].get(key)
+        return json.loads(self._read(f"pages-{page_type}.jsonl", offset)) if offset is not None else None
+
+    def race(self, race_id: str):
+        offset = self._race_offsets.get(race_id)
+        return Race.from_dict(json.loads(self._read('races.jsonl', offset))) if offset is not None else None
+
+    def remaining_pages(self, page_type: str, done: set):
+        """done に無いページの記録（ファイルの並び順）"""
+        offsets = self._offsets[page_type]
+        for key in sorted(offsets.keys() - done, key=offsets.get):
+            yield self.page(page_type, key)
+
+    def remaining_races(self, done: set):
+        """done に無いレースの行（そのまま書き写す）"""
+        for race_id in sorted(self._race_offsets.keys() - done, key=self._race_offsets.get):
+            yield self._read('races.jsonl', self._race_offsets[race_id])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class TrackerBaseline:
+    """ChangeTracker に残っている通常のスクレイプのパース結果を比較対象にする（URL だけを持ち、結果はその都度引く）"""
+
+    def __init__(self, change_tracker: ChangeTracker):
+        self.change_tracker = change_tracker
+        self._urls = {t: {} for t in REPARSE_PAGE_TYPES}
+        for url in change_tracker.page_urls():
+            page_type, race_id = classify_url(url)
+            if page_type in self._urls:
+                self._urls[page_type][race_id or url] = url
+
+    def page(self, page_type: str, key: str):
+        url = self._urls[page_type].get(key)
+        if url is None:
+            return None
+        return {'url': url, 'page_type': page_type, 'race_id': classify_url(url)[1], 'fetched_at': None,
+                'parsed': self.change_tracker.last_parsed(url), 'error': None}
+
+    def race(self, race_id: str):
+        return self.change_tracker.last_race(race_id)
+
+    def remaining_pages(self, page_type: str, done: set):
+        for key in sorted(self._urls[page_type].keys() - done):
+            yield self.page(page_type, key)
+
+    def remaining_races(self, done: set):
+        # レースは通常のスクレイプの出力なので、今回組み立てなかったものは書き写さない
+        return iter(())
+
+    def close(self):
+        pass
+
+
+class RunOutput:
+    """1回の実行の出力ファイル（馬柱は書いた位置を覚えておき、レースを組み立てるときに読み直す）"""
+
+    def __init__(self, run_dir: str):
+        self._pages = {t: open(os.path.join(run_dir, f"pages-{t}.jsonl"), 'wb') for t in REPARSE_PAGE_TYPES}
+        self._races = open(os.path.join(run_dir, 'races.jsonl'), 'wb')
+        self._horse_reader = open(os.path.join(run_dir, 'pages-horse.jsonl'), 'rb')
+        self._horse_offsets = {}
+        self.done = {t: set() for t in REPARSE_PAGE_TYPES}  # 種別 → 書いたページのキー
+        self.races = set()
+
+    def write_page(self, record: dict):
+        f = self._pages[record['page_type']]
+        if record['page_type'] == 'horse' and record['error'] is None:
+            self._horse_offsets[record['url']] = f.tell()
+        f.write(_json_line(record))
+        self.done[record['page_type']].add(_page_key(record))
+
+    def horse(self, url: str):
+        """書き出した馬柱のパース結果（無い・エラーだったなら None）"""
+        offset = self._horse_offsets.get(url)
+        if offset is None:
+            return None
+        self._pages['horse'].flush()
+        self._horse_reader.seek(offset)
+        return json.loads(self._horse_reader.readline())['parsed']
+
+    def write_race(self, race_id: str, line: bytes):
+        self._races.write(line)
+        self.races.add(race_id)
+
+    def close(self):
+        for f in (*self._pages.values(), self._races, self._horse_reader):
+            f.close()
+
+
+class ReparseRun:
+    """1回の再パースの進行
+
+    レースごとにそのレースのページをワーカーでパースし、出馬表のリンクから馬柱をアーカイブで引いてパースさせ、
+    揃ったレースから組み立てて前回と比べて書き出す。手元に残すのは組み立て待ちのレースと、書いたページのキー・
+    位置だけ（パース結果はファイルに書いたら手放す）。同時にワーカーへ渡すレースのチャンクは workers の2倍まで。
+    """
+
+    def __init__(self, executor, workers: int, page_types: tuple, baseline, output: RunOutput):
+        self.executor = executor
+        self.window = workers * 2
+        self.page_types = page_types
+        self.baseline = baseline
+        self.output = output
+        self.diff = ParseDiff()
+        self.races = {'races': 0, 'changed': 0, 'new': 0, 'changes': {}}
+        self.tasks = {}          # future → 結果を受け取る関数
+        self.waiting = {}        # race_id → (種別 → パース結果, 馬柱のパス → URL, パース待ちの URL)
+        self.horse_waiters = {}  # パース中の馬柱の URL → 待っているレース
+
+    def execute(self, chunks):
+        """chunks は (ワーカーで呼ぶ関数, 引数, 結果を受け取る関数)。馬柱は結果を受け取る側が追加で投げる"""
+        chunks = iter(chunks)
+        while True:
+            for fn, arg, handler in itertools.islice(chunks, max(0, self.window - len(self.tasks))):
+                self._submit(fn, arg, handler)
+            if not self.tasks:
+                return
+            done, _ = wait(self.tasks, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.tasks.pop(future)(future.result())
+
+    def _submit(self, fn, arg, handler):
+        self.tasks[self.executor.submit(fn, arg)] = handler
+
+    def write(self, record: dict):
+        previous = self.baseline.page(record['page_type'], _page_key(record)) if self.baseline is not None else None
+        self.diff.add(record, previous and previous['parsed'], previous is not None)
+        self.output.write_page(record)
+
+    def write_all(self, records: list):
+        for record in records:
+            self.write(record)
+
+    def carry(self, page_type: str, key: str):
+        """今回パースしないページは比較対象の結果を引き継ぐ"""
+        record = self.baseline.page(page_type, key) if self.baseline is not None else None
+        if record is not None:
+            self.output.write_page(record)
+        return record
+
+    def races_parsed(self, race_ids: list, records: list):
+        pages = {race_id: {} for race_id in race_ids}
+        for record in records:
+            self.write(record)
+            if record['error'] is None:
+                pages[record['race_id']][record['page_type']] = record
+        for race_id, race_records in pages.items():
+            for page_type in RACE_PAGE_TYPES:
+                if page_type not in race_records and race_id not in self.output.done[page_type]:
+                    record = self.carry(page_type, race_id)
+                    if record is not None:
+                        race_records[page_type] = record
+            if 'syutuba' in race_records:
+                self._collect_horses(race_id, race_records)
+
+    def _collect_horses(self, race_id: str, race_records: dict):
+        syutuba = race_records['syutuba']
+        urls = {}
+        for horse in syutuba['parsed'].get('horses', []):
+            link = horse.get('horse_name_link')
+            if link:
+                urls[urlparse(link).path] = urljoin(syutuba['url'], link)
+        missing, to_parse = set(), []
+        for url in urls.values():
+            if url in self.output.done['horse']:
+                continue
+            if url in self.horse_waiters:
+                self.horse_waiters[url].add(race_id)
+                missing.add(url)
+            elif 'horse' in self.page_types:
+                self.horse_waiters[url] = {race_id}
+                missing.add(url)
+                to_parse.append(url)
+            else:
+                self.carry('horse', url)
+        self.waiting[race_id] = ({t: r['parsed'] for t, r in race_records.items()}, urls, missing)
+        if to_parse:
+            self._submit(_parse_urls, to_parse, functools.partial(self.horses_parsed, to_parse))
+        if not missing:
+            self.assemble(race_id)
+
+    def horses_parsed(self, urls: list, records: list):
+        self.write_all(records)
+        for url in urls:
+            if url not in self.output.done['horse']:
+                self.carry('horse', url)  # アーカイブに無い馬柱
+            for race_id in self.horse_waiters.pop(url):
+                missing = self.waiting[race_id][2]
+                missing.discard(url)
+                if not missing:
+                    self.assemble(race_id)
+
+    def assemble(self, race_id: str):
+        pages, urls, _ = self.waiting.pop(race_id)
+        race = assemble_race(race_id, pages, {path: self.output.horse(url) for path, url in urls.items()})
+        self.output.write_race(race_id, _json_line(race.to_dict()))
+        self.races['races'] += 1
+        old = self.baseline.race(race_id) if self.baseline is not None else None
+        if old is None:
+            self.races['new'] += 1
+            return
+        changes = diff_races(old, race)
+        if changes:
+            self.races['changed'] += 1
+        for change in changes:
+            key = f"{change['section']}.{change['field']}"
+            self.races['changes'][key] = self.races['changes'].get(key, 0) + 1
+
+    def carry_remaining(self):
+        """パースもしなかった比較対象のページ・レースをそのまま引き継ぐ"""
+        if self.baseline is None:
+            return
+        for page_type in REPARSE_PAGE_TYPES:
+            for record in self.baseline.remaining_pages(page_type, self.output.done[page_type]):
+                self.output.write_page(record)
+        for line in self.baseline.remaining_races(self.output.races):
+            self.output.write_race(json.loads(line)['race_id'], line)
+
+
+class Reparser:
+    """アーカイブのページをワーカープロセスでパースし直し、出力と前回との差分を output_root/{実行名}/ に書く
+
+    pages-{種別}.jsonl にページごとのパース結果、races.jsonl に組み立て直したレース（組み上がった順）、
+    summary.json に項目ごとの差分を書く。比較対象は baseline で指定した以前の実行、無ければ直前の実行、
+    それも無ければ ChangeTracker に残っている通常のスクレイプのパース結果。今回パースしなかったページ
+    （対象外の種別・レース）は比較対象の結果を引き継ぐので、各実行は常に全体を持ち、次の実行の比較対象になれる。
+    """
+
+    def __init__(self, settings: dict, archive: PageArchive, output_root: str, workers: int = None,
+                 chunk_size: int = 200, change_tracker: ChangeTracker = None):
+        self.settings = settings
+        self.archive = archive
+        self.output_root = output_root
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.change_tracker = change_tracker
+
+    @classmethod
+    def from_settings(cls, settings: dict, workers: int = None) -> "Reparser":
+        cfg = settings.get('reparse') or {}
+        archive_settings = dict(settings, archive=dict(settings.get('archive') or {}, enabled=True))
+        output_root = cfg.get('dir') or os.path.join(settings.get('output_dir', 'data'), 'reparse')
+        return cls(settings, PageArchive.from_settings(archive_settings, readonly=True), output_root,
+                   workers=workers or cfg.get('workers'), chunk_size=cfg.get('chunk_size', 200),
+                   change_tracker=ChangeTracker.from_settings(settings))
+
+    def runs(self) -> list:
+        """完了した実行のディレクトリ（古い順）"""
+        if not os.path.isdir(self.output_root):
+            return []
+        return [os.path.join(self.output_root, name) for name in sorted(os.listdir(self.output_root))
+                if os.path.exists(os.path.join(self.output_root, name, 'summary.json'))]
+
+    def _baseline(self, baseline: str):
+        if baseline is not None:
+            return RunBaseline(baseline)
+        return TrackerBaseline(self.change_tracker) if self.change_tracker is not None else None
+
+    def _race_chunks(self, page_types, race_ids):
+        """レースのページをレース単位でまとめたチャンク（1つのレースのページは同じチャンクに入る）
+
+        対象の種別のページが無いレースも、引き継いだページと今回の馬柱で組み立て直すためにチャンクに入れる
+        （race_ids の外のレースは比較対象の行をそのまま引き継ぐ）。
+        """
+        rows = self.archive.entries(RACE_PAGE_TYPES, race_ids)
+        rows = rows[rows['race_id'] != 0]
+        rows = rows[np.argsort(rows['race_id'], kind='stable')]
+        reparse = np.isin(rows['page_type'], [page_type_code(t) for t in page_types])
+        starts = np.flatnonzero(np.append(True, rows['race_id'][1:] != rows['race_id'][:-1]))
+        chunk_ids, chunk_rows, size = [], [], 0
+        for race_rows, race_reparse in zip(np.split(rows, starts[1:]), np.split(reparse, starts[1:])):
+            if not len(race_rows):
+                continue
+            chunk_ids.append(str(race_rows['race_id'][0]))
+            chunk_rows.append(race_rows[race_reparse])
+            size += 1 + int(race_reparse.sum())
+            if size >= self.chunk_size:
+                yield self._race_chunk(chunk_ids, chunk_rows)
+                chunk_ids, chunk_rows, size = [], [], 0
+        if chunk_ids:
+            yield self._race_chunk(chunk_ids, chunk_rows)
+
+    def _race_chunk(self, race_ids, rows):
+        rows = np.concatenate(rows)
+        # ディスク上の並びで読ませる（セグメントを先頭から順に触る）
+        rows = rows[np.lexsort((rows['offset'], rows['segment']))]
+        return rows, race_ids
+
+    def _horse_chunks(self, done_urls):
+        """どのレースからも引かれなかった馬柱のページ"""
+        rows = self.archive.entries(['horse'])
+        rows = rows[~np.isin(rows['url_hash'], np.array([url_hash(u) for u in done_urls], dtype=np.uint64))]
+        rows = rows[np.lexsort((rows['offset'], rows['segment']))]
+        return [rows[i:i + self.chunk_size] for i in range(0, len(rows), self.chunk_size)]
+
+    def run(self, page_types=None, race_ids=None, baseline: str = None, run_name: str = None) -> dict:
+        page_types = tuple(page_types or REPARSE_PAGE_TYPES)
+        run_name = run_name or datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        run_dir = os.path.join(self.output_root, run_name)
+        if baseline is None:
+            previous = [d for d in self.runs() if os.path.basename(d) != run_name]
+            baseline = previous[-1] if previous else None
+        os.makedirs(run_dir, exist_ok=True)
+        self.archive.flush()
+
+        started = time.perf_counter()
+        source = self._baseline(baseline)
+        output = RunOutput(run_dir)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(worker_settings(self.settings), self.archive.path)) as executor:
+                progress = ReparseRun(executor, self.workers, page_types, source, output)
+                progress.execute((_parse_rows, rows, functools.partial(progress.races_parsed, ids))
+                                 for rows, ids in self._race_chunks(page_types, race_ids))
+                if 'horse' in page_types and race_ids is None:
+                    progress.execute((_parse_rows, rows, progress.write_all)
+                                     for rows in self._horse_chunks(output.done['horse']))
+            progress.carry_remaining()
+        finally:
+            output.close()
+            if source is not None:
+                source.close()
+
+        elapsed = time.perf_counter() - started
+        pages = progress.diff.summary()
+        total = sum(s['pages'] for s in pages.values())
+        summary = {
+            'run': run_dir,
+            'baseline': baseline or ('change_tracker' if self.change_tracker is not None else None),
+            'page_types': list(page_types),
+            'workers': self.workers,
+            'seconds': round(elapsed, 3),
+            'pages_per_second': round(total / elapsed, 1) if elapsed else None,
+            'pages': pages,
+            'races': progress.races,
+        }
+        write_json_atomic(os.path.join(run_dir, 'summary.json'), summary)
+        logger.info(f"再パース {total} ページ（{elapsed:.1f} 秒）: {run_dir}", extra={'elapsed': round(elapsed, 3)})
+        return summary
+
+    def close(self):
+        self.archive.close()
+        if self.change_tracker is not None:
+            self.change_tracker.close()
+
+
+def format_summary(summary: dict) -> str:
+    """summary を表にする（ページ種別ごとの件数と、変わった項目）"""
+    lines = [f"比較対象: {summary['baseline'] or 'なし'}  {summary['seconds']:.1f} 秒"
+             f"（{summary['pages_per_second']} ページ/秒, {summary['workers']} プロセス）",
+             f"{'種別':<8} {'ページ':>7} {'エラー':>6} {'新規':>6} {'変更':>6} {'空':>6} {'空になった':>10} "
+             f"{'変更行':>7} {'追加行':>7} {'削除行':>7}"]
+    for page_type, s in summary['pages'].items():
+        lines.append(f"{page_type:<8} {s['pages']:>7} {s['errors']:>6} {s['new_pages']:>6} {s['changed_pages']:>6} "
+                     f"{s['empty_pages']:>6} {s['now_empty_count']:>10} {s['rows_changed']:>7} "
+                     f"{s['rows_added']:>7} {s['rows_removed']:>7}")
+    for page_type, s in summary['pages'].items():
+        for name, f in s['fields'].items():
+            lines.append(f"  {page_type}.{name}: 変更 {f['changed']} / 新たに取得 {f['newly_populated']}"
+                         f" / 空になった {f['newly_empty']}")
+        if s['now_empty']:
+            lines.append(f"  {page_type} 空になったページ: {', '.join(s['now_empty'])}")
+        for example in s['error_examples'][:5]:
+            lines.append(f"  {page_type} エラー {example['page']}: {example['error']}")
+    races = summary['races']
+    if races['races']:
+        lines.append(f"レース {races['races']} 件（変更 {races['changed']}、比較対象なし {races['new']}）")
+        for key, count in sorted(races['changes'].items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  {key}: {count}")
+    return '\n'.join(lines)
@@ -1,25 +1,174 @@
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
-
-@dataclass
-class Horse:
-    number: int
-    name: str
-    sex_age: str
-    weight: str
-    jockey: str
-    trainer: str
-    stable: str
-    blood: Dict[str, Any]
-
-@dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from src.utils import convert
+
+# パーサーは HTML の文字列をそのまま辞書で返す。数値への変換はここで1回だけ行い、
+# 以降（出力・エクスポート・DB・特徴量）は型付きのモデルを使う。
+# to_dict / from_dict は asdict より速い手書きで、JSONL にはこの形（キーは 'runners'）で書く。
+
+_NO_TIMES = (None,) * len(convert.TRAINING_FURLONGS)
+
+
+@dataclass(slots=True)
+class TrainingSession:
+    date: Optional[str] = None          # "8/6"
+    course: Optional[str] = None        # "美Ｗ"
+    condition: Optional[str] = None     # "良"
+    method: Optional[str] = None        # 追い切り方
+    times: Tuple[Optional[float], ...] = _NO_TIMES  # 6F..1F 秒
+    position: Optional[int] = None
+    awase: Optional[str] = None
+
+    @classmethod
+    def from_scraped(cls, detail: dict) -> "TrainingSession":
+        date, course, condition = convert.split_date_location(detail.get('date_location'))
+        times, position = convert.training_times(detail.get('times'))
+        return cls(date, course, condition, detail.get('追い切り方') or None, tuple(times.values()), position,
+                   detail.get('awase') or None)
+
+    def time(self, furlong: str) -> Optional[float]:
+        return self.times[convert.TRAINING_FURLONGS.index(furlong)]
+
+    def to_dict(self) -> dict:
+        return {'date': self.date, 'course': self.course, 'condition': self.condition, 'method': self.method,
+                'times': list(self.times), 'position': self.position, 'awase': self.awase}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TrainingSession":
+        return cls(d.get('date'), d.get('course'), d.get('condition'), d.get('method'),
+                   tuple(d.get('times') or _NO_TIMES), d.get('position'), d.get('awase'))
+
+
+@dataclass(slots=True)
+class Pedigree:
+    father: Optional[str] = None
+    mother: Optional[str] = None
+    mothers_father: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {'father': self.father, 'mother': self.mother, 'mothers_father': self.mothers_father}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Pedigree":
+        return cls(d.get('father'), d.get('mother'), d.get('mothers_father'))
+
+
+@dataclass(slots=True)
+class PastResult:
+    date: Optional[str] = None          # ISO 形式 "2025-10-20"
+    venue: Optional[str] = None
+    race_num: Optional[int] = None
+    finish_position: Optional[int] = None
+    time_s: Optional[float] = None
+    jockey: Optional[str] = None
+    weight: Optional[float] = None      # 斤量
+    body_weight: Optional[int] = None   # 馬体重 "480(+2)" → 480
+
+    @classmethod
+    def from_scraped(cls, result: dict) -> "PastResult":
+        date = convert.slash_date(result.get('date'))
+        return cls(date.isoformat() if date else None, result.get('venue'), convert.to_int(result.get('race_num')),
+                   convert.to_int(result.get('finish_position')), convert.time_seconds(result.get('time')),
+                   result.get('jockey'), convert.to_float(result.get('weight')),
+                   convert.to_int(result.get('body_weight')))
+
+    def to_dict(self) -> dict:
+        return {'date': self.date, 'venue': self.venue, 'race_num': self.race_num,
+                'finish_position': self.finish_position, 'time_s': self.time_s, 'jockey': self.jockey,
+                'weight': self.weight, 'body_weight': self.body_weight}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PastResult":
+        return cls(d.get('date'), d.get('venue'), d.get('race_num'), d.get('finish_position'), d.get('time_s'),
+                   d.get('jockey'), d.get('weight'), d.get('body_weight'))
+
+
+@dataclass(slots=True)
+class Runner:
+    horse_num: Optional[int] = None
+    horse_name: Optional[str] = None
+    jockey: Optional[str] = None
+    horse_id: Optional[str] = None
+    horse_name_link: Optional[str] = None
+    tanpyo: Optional[str] = None
+    training: List[TrainingSession] = field(default_factory=list)
+    pedigree: Optional[Pedigree] = None
+    stable_comment: Optional[str] = None
+    previous_race_comment: Optional[str] = None
+    past_results: List[PastResult] = field(default_factory=list)
+
+    @classmethod
+    def from_scraped(cls, horse: dict) -> "Runner":
+        training = horse.get('training_data') or {}
+        pedigree = horse.get('pedigree_data')
+        link = horse.get('horse_name_link') or None
+        return cls(
+            convert.to_int(horse.get('horse_num')), horse.get('horse_name'), horse.get('jockey'),
+            convert.horse_id(link), link, training.get('tanpyo') or None,
+            [TrainingSession.from_scraped(d) for d in training.get('details', [])],
+            Pedigree.from_dict(pedigree) if pedigree else None,
+            horse.get('stable_comment') or None, horse.get('previous_race_comment') or None,
+            [PastResult.from_scraped(r) for r in horse.get('past_results') or []],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'horse_num': self.horse_num, 'horse_name': self.horse_name, 'jockey': self.jockey,
+            'horse_id': self.horse_id, 'horse_name_link': self.horse_name_link, 'tanpyo': self.tanpyo,
+            'training': [t.to_dict() for t in self.training],
+            'pedigree': self.pedigree.to_dict() if self.pedigree else None,
+            'stable_comment': self.stable_comment, 'previous_race_comment': self.previous_race_comment,
+            'past_results': [r.to_dict() for r in self.past_results],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Runner":
+        pedigree = d.get('pedigree')
+        return cls(
+            d.get('horse_num'), d.get('horse_name'), d.get('jockey'), d.get('horse_id'), d.get('horse_name_link'),
+            d.get('tanpyo'), [TrainingSession.from_dict(t) for t in d.get('training') or []],
+            Pedigree.from_dict(pedigree) if pedigree else None, d.get('stable_comment'),
+            d.get('previous_race_comment'), [PastResult.from_dict(r) for r in d.get('past_results') or []],
+        )
+
+
+@dataclass(slots=True)
 class Race:
-    race_id: str
-    venue: str
-    date: str
-    horses: List[Horse]
-    results: Dict[str, Any]
-    payouts: Dict[str, Any]
-
-    def to_dict(self):
-        return asdict(self)
+    race_id: Optional[str] = None
+    race_name: Optional[str] = None
+    race_grade: Optional[str] = None
+    race_date: Optional[str] = None     # ISO 形式 "2025-11-09"
+    distance_m: Optional[int] = None
+    surface: Optional[str] = None
+    runners: List[Runner] = field(default_factory=list)
+
+    @classmethod
+    def from_scraped(cls, race_data: dict, race_id: str = None) -> "Race":
+        """KeibaBookScraper.scrape() の辞書（値は文字列のまま）から作る"""
+        race_date = convert.race_date(race_data.get('race_name'))
+        race_id = race_id or race_data.get('race_id')
+        return cls(
+            str(race_id) if race_id else None, race_data.get('race_name'), race_data.get('race_grade'),
+            race_date.isoformat() if race_date else None, convert.distance_m(race_data.get('distance')),
+            race_data.get('surface'), [Runner.from_scraped(h) for h in race_data.get('horses', [])],
+        )
+
+    def to_dict(self) -> dict:
+        return {'race_id': self.race_id, 'race_name': self.race_name, 'race_grade': self.race_grade,
+                'race_date': self.race_date, 'distance_m': self.distance_m, 'surface': self.surface,
+                'runners': [r.to_dict() for r in self.runners]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Race":
+        return cls(d.get('race_id'), d.get('race_name'), d.get('race_grade'), d.get('race_date'),
+                   d.get('distance_m'), d.get('surface'), [Runner.from_dict(r) for r in d.get('runners') or []])
+
+    @classmethod
+    def coerce(cls, race) -> "Race":
+        """Race / to_dict() の辞書 / scrape() の辞書のどれでも Race にする"""
+        if isinstance(race, cls):
+            return race
+        if 'runners' in race:
+            return cls.from_dict(race)
+        return cls.from_scraped(race)
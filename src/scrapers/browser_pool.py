@@ -0,0 +1,199 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from src.scrapers.resource_blocker import ResourceBlocker
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Slot:
+    __slots__ = ('context', 'page', 'uses', 'page_type')
+
+    def __init__(self):
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.page_type = None
+
+
+class PageLease:
+    """BrowserPool の page を必要になった時にだけ借りるための引換券
+
+    HybridFetcher は HTTP で取れなかった時にだけ open() で page を借りる。
+    キャッシュに当たったページや HTTP で済んだページではブラウザの起動もスロット待ちも起きない。
+    """
+
+    __slots__ = ('pool', 'page_type')
+
+    def __init__(self, pool, page_type=None):
+        self.pool = pool
+        self.page_type = page_type
+
+    def open(self):
+        return self.pool.page(page_type=self.page_type)
+
+
+class BrowserPool:
+    """プロセス内で1つのブラウザを起動したまま使い回し、page を貸し出すプール
+
+    スロットごとに context + page を1組持ち、max_uses_per_context 回貸し出すか
+    JS ヒープが max_js_heap_mb を超えたら context を作り直す（Chromium の肥大化対策）。
+    ブラウザの起動と context の作成は最初に必要になった時点まで遅らせる。
+    """
+
+    def __init__(self, size: int = 4, headless: bool = True, max_uses_per_context: int = 50,
+                 max_js_heap_mb: float = None, heap_check_interval: int = 10,
+                 resource_blocker: ResourceBlocker = None, playwright_factory=None):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_uses_per_context = max_uses_per_context
+        self.max_js_heap_mb = max_js_heap_mb
+        self.heap_check_interval = max(1, heap_check_interval)
+        self.resource_blocker = resource_blocker
+        self._playwright_factory = playwright_factory or async_playwright
+        self._playwright = None
+        self._browser = None
+        self._slots = None
+        self._start_lock = asyncio.Lock()
+        self._in_use = 0
+        self._waiting = 0
+        self._counters = {'acquisitions': 0, 'contexts_created': 0, 'contexts_recycled': 0, 'wait_seconds': 0.0}
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "BrowserPool":
+        cfg = settings.get('browser_pool') or {}
+        return cls(
+            size=settings.get('max_concurrency', 1),
+            headless=settings.get('playwright_headless', True),
+            max_uses_per_context=cfg.get('max_uses_per_context', 50),
+            max_js_heap_mb=cfg.get('max_js_heap_mb'),
+            heap_check_interval=cfg.get('heap_check_interval', 10),
+            resource_blocker=ResourceBlocker.from_settings(settings),
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+            self._playwright = await self._playwright_factory().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                self._slots.put_nowait(_Slot())
+            logger.info("browser pool started (size=%d)", self.size)
+
+    async def stop(self):
+        async with self._start_lock:
+            if self._browser is None:
+                return
+            while not self._slots.empty():
+                slot = self._slots.get_nowait()
+                if slot.context is not None:
+                    await slot.context.close()
+            await self._browser.close()
+            await self._playwright.stop()
+            self._browser = None
+            self._playwright = None
+            self._slots = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _js_heap_mb(self, slot) -> float:
+        cdp = await slot.context.new_cdp_session(slot.page)
+        try:
+            await cdp.send('Performance.enable')
+            metrics = await cdp.send('Performance.getMetrics')
+        finally:
+            await cdp.detach()
+        for metric in metrics.get('metrics', []):
+            if metric['name'] == 'JSHeapUsedSize':
+                return metric['value'] / (1024 * 1024)
+        return 0.0
+
+    async def _should_recycle(self, slot) -> bool:
+        if slot.uses >= self.max_uses_per_context:
+            return True
+        # CDP の往復が発生するのでヒープ計測は heap_check_interval 回に1回だけ
+        if self.max_js_heap_mb is not None and slot.uses % self.heap_check_interval == 0:
+            try:
+                return await self._js_heap_mb(slot) > self.max_js_heap_mb
+            except Exception as e:
+                logger.debug("could not read JS heap size: %s", e)
+        return False
+
+    async def _recycle(self, slot):
+        await slot.context.close()
+        slot.context = None
+        slot.page = None
+        slot.uses = 0
+        self._counters['contexts_recycled'] += 1
+
+    async def _open_slot(self, slot):
+        context = await self._browser.new_context()
+        try:
+            if self.resource_blocker is not None:
+                # 貸し出し中のページ種別に応じて遮断ルールを切り替える
+                await self.resource_blocker.install(context, lambda: slot.page_type)
+            page = await context.new_page()
+        except BaseException:
+            # 作りかけの context は閉じ、スロットは空のまま返す（次に借りた時に作り直す）
+            await context.close()
+            raise
+        slot.context, slot.page = context, page
+        self._counters['contexts_created'] += 1
+
+    @asynccontextmanager
+    async def page(self, page_type=None):
+        if not self.started:
+            await self.start()
+        waited_from = time.monotonic()
+        self._waiting += 1
+        try:
+            slot = await self._slots.get()
+        finally:
+            self._waiting -= 1
+        self._counters['wait_seconds'] += time.monotonic() - waited_from
+        self._counters['acquisitions'] += 1
+        self._in_use += 1
+        try:
+            if slot.page is None:
+                await self._open_slot(slot)
+            slot.page_type = page_type
+            yield slot.page
+        finally:
+            slot.page_type = None
+            try:
+                # page を開けなかったスロットは使用回数も作り直しの判定も無い
+                if slot.page is not None:
+                    slot.uses += 1
+                    if await self._should_recycle(slot):
+                        await self._recycle(slot)
+            finally:
+                self._in_use -= 1
+                self._slots.put_nowait(slot)
+
+    def stats(self) -> dict:
+        stats = dict(self._counters)
+        stats.update({
+            'size': self.size,
+            'in_use': self._in_use,
+            'idle': self.size - self._in_use,
+            'utilisation': self._in_use / self.size,
+            'waiting': self._waiting,
+        })
+        if self.resource_blocker is not None:
+            stats['resource_blocking'] = dict(self.resource_blocker.stats)
+        return stats
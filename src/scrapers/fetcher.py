@@ -0,0 +1,209 @@
+import asyncio
+import email.utils
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.scrapers.browser_pool import PageLease
+from src.scrapers.readiness import PageReadiness
+from src.utils.logger import get_logger
+from src.utils.metrics import Metrics
+
+logger = get_logger(__name__)
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+
+# サーバー側で描画済みなら HTML に含まれているはずのクラス名（ページ種別ごと）
+PAGE_MARKERS = {
+    'syutuba': 'syutuba_sp',
+    'cyokyo': 'cyokyo',
+    'kettou': 'PedigreeTable',
+    'danwa': 'StableCommentTable',
+    'syoin': 'PreviousRaceCommentTable',
+    'horse': 'HorsePastResultsTable',
+}
+# サーバー描画のページならデータが無くても必ずある骨組み（JS で描画するページの HTML には本体が無い）
+SKELETON_PATTERN = re.compile(r'<footer\b', re.IGNORECASE)
+
+
+# 待てば直る見込みのある HTTP ステータス（混雑・一時的な障害）
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class FetchError(Exception):
+    """HTTP のエラー応答。retry_after はサーバーが Retry-After で指定した秒数（無ければ None）"""
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUS
+
+
+def parse_retry_after(value):
+    """Retry-After（秒数か HTTP 日付）を秒数にする"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def needs_js(html_content: str, page_type: str) -> bool:
+    """データ部分のマーカーもページの骨組みも HTML に無ければ JS 描画が必要と判断する
+
+    骨組みだけがあるページ（新馬戦の前走コメント・未公開の厩舎の話など）はデータの無いページとしてパーサーに渡す。
+    """
+    marker = PAGE_MARKERS.get(page_type)
+    if marker is None:
+        return False
+    if re.search(r'class="[^"]*\b' + re.escape(marker) + r'\b', html_content) is not None:
+        return False
+    return SKELETON_PATTERN.search(html_content) is None
+
+
+class PlaywrightFetcher:
+    def __init__(self, readiness: PageReadiness = None):
+        self.readiness = readiness or PageReadiness()
+
+    async def fetch(self, page, url, page_type=None):
+        return await self.readiness.load(page, url, page_type)
+
+
+class HttpFetcher:
+    """keep-alive の requests.Session を共有する HTTP 取得（gzip は requests が自動で展開する）"""
+
+    def __init__(self, timeout: float = 15, user_agent: str = DEFAULT_USER_AGENT, pool_size: int = 4,
+                 session: requests.Session = None):
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'User-Agent': user_agent, 'Accept-Encoding': 'gzip, deflate'})
+
+    def import_cookies(self, cookies):
+        """Playwright の context.cookies() 形式の Cookie を取り込む（ログインは1回で済ませる）"""
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+    def _get(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code in RETRYABLE_STATUS:
+            # 混雑・障害はブラウザで取り直しても同じなので、呼び出し側の再試行に任せる
+            raise FetchError(url, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        if 'charset' not in response.headers.get('Content-Type', ''):
+            response.encoding = 'utf-8'
+        return response.status_code, response.text
+
+    async def fetch(self, url):
+        # requests は同期 API なのでスレッドで実行してイベントループを止めない
+        return await asyncio.to_thread(self._get, url)
+
+    def close(self):
+        self.session.close()
+
+
+class HybridFetcher:
+    """HTTP を既定にし、JS が必要と判定したページだけ Playwright で取り直す
+
+    同じ種別が js_switch_after 回続けて JS 描画と判定されたら、その種別は以後最初から Playwright で取る
+    （1ページだけの判定では種別ごと切り替えない）。
+    """
+
+    def __init__(self, http_fetcher: HttpFetcher = None, browser_fetcher: PlaywrightFetcher = None,
+                 force_playwright=(), metrics: Metrics = None, js_switch_after: int = 3):
+        self.http_fetcher = http_fetcher
+        self.browser_fetcher = browser_fetcher or PlaywrightFetcher()
+        self.js_page_types = set(force_playwright)
+        self.js_switch_after = max(1, js_switch_after)
+        self._js_streak = {}  # 種別 → 続けて JS 描画と判定した回数
+        # requests は実際に送った数（ブラウザへ切り替える前に失敗した HTTP も数える）
+        self.stats = {'requests': 0, 'http': 0, 'playwright': 0, 'escalations': 0}
+        # ブラウザ側の network / ready は PageReadiness が同じ Metrics に記録する
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    @classmethod
+    def from_settings(cls, settings: dict, metrics: Metrics = None) -> "HybridFetcher":
+        cfg = settings.get('http') or {}
+        http_fetcher = None
+        if cfg.get('enabled', True):
+            http_fetcher = HttpFetcher(
+                timeout=cfg.get('timeout', 15),
+                user_agent=cfg.get('user_agent') or DEFAULT_USER_AGENT,
+                pool_size=max(1, settings.get('max_concurrency', 1)),
+            )
+        browser_fetcher = PlaywrightFetcher(PageReadiness.from_settings(settings, metrics))
+        return cls(http_fetcher, browser_fetcher, force_playwright=cfg.get('force_playwright') or (), metrics=metrics,
+                   js_switch_after=cfg.get('js_switch_after', 3))
+
+    async def _fetch_with_browser(self, page, url, page_type=None):
+        if isinstance(page, PageLease):
+            # ここで初めて page を借りる（待っている間もスロットを塞がない）
+            async with page.open() as leased:
+                return await self._fetch_with_browser(leased, url, page_type)
+        self.stats['requests'] += 1
+        self.stats['playwright'] += 1
+        self.metrics.inc('pages_total', page_type=page_type, source='playwright')
+        content = await self.browser_fetcher.fetch(page, url, page_type)
+        if self.http_fetcher is not None and hasattr(page, 'context'):
+            # ブラウザ側で得た Cookie を HTTP セッションでも使う
+            try:
+                self.http_fetcher.import_cookies(await page.context.cookies())
+            except Exception as e:
+                logger.debug("could not copy browser cookies: %s", e)
+        return content
+
+    async def fetch(self, page, url, page_type=None, acquire=None):
+        # page は Playwright の page か PageLease（ブラウザが要る時にだけ借りる）
+        # acquire はレート制御。呼び出し側が最初のリクエストの分を取るので、ここでは取り直しの分だけ取る
+        # 種別が分からないページは HTTP の結果を検証できないのでブラウザで取る
+        if self.http_fetcher is None or page_type is None or page_type in self.js_page_types:
+            return await self._fetch_with_browser(page, url, page_type)
+
+        self.stats['requests'] += 1
+        with self.metrics.span('network', page_type=page_type, transport='http'):
+            status, content = await self.http_fetcher.fetch(url)
+        if status == 200 and not needs_js(content, page_type):
+            self._js_streak.pop(page_type, None)
+            self.stats['http'] += 1
+            self.metrics.inc('pages_total', page_type=page_type, source='http')
+            return content
+
+        self.stats['escalations'] += 1
+        # 再試行（page_retries_total）とは別に数える（初めての JS 描画のページを再試行に見せない）
+        self.metrics.inc('page_escalations_total', page_type=page_type, reason='js' if status == 200 else 'http_status')
+        if status == 200:
+            streak = self._js_streak[page_type] = self._js_streak.get(page_type, 0) + 1
+            if streak >= self.js_switch_after:
+                # 続けて JS 描画だったので、以後この種別は最初から Playwright を使う
+                logger.info("page type %s needs JS rendering; switching to Playwright", page_type,
+                            extra={'page_type': page_type})
+                self.js_page_types.add(page_type)
+            else:
+                logger.info("%s needs JS rendering; fetching it with Playwright", url,
+                            extra={'page_type': page_type, 'url': url})
+        else:
+            logger.info("HTTP %s for %s; retrying with Playwright", status, url,
+                        extra={'page_type': page_type, 'url': url})
+        if acquire is not None:
+            # HTTP で1件送った後に同じホストへもう1件送る
+            await acquire()
+        return await self._fetch_with_browser(page, url, page_type)
+
+    def close(self):
+        if self.http_fetcher is not None:
+            self.http_fetcher.close()
@@ -1,22 +1,174 @@
+import asyncio
+import datetime
+import functools
+import hashlib
+import inspect
 import os
 from src.utils.config import load_settings
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from src.models.race import Race
+from src.utils import convert
+from src.utils.rate_limiter import HostRateLimiter
+from src.storage.page_cache import PageCache, classify_url
+from src.storage.change_tracker import content_hash
+from src.scrapers.fetcher import HybridFetcher
+from src.scrapers.browser_pool import BrowserPool, PageLease
+from src.scrapers.parser_backend import extract_regions, get_parser_backend
+from src.scrapers.resilience import FetchResilience
+from src.utils.logger import get_logger
+from src.utils.metrics import Metrics
+
+logger = get_logger(__name__)
+
+# 各パーサーが読む領域（クラス名の組）。partial_parse が有効ならこの部分だけをパースする
+PARSE_REGIONS = {
+    'race': (('racemei',), ('racetitle_sub',), ('syutuba_sp',)),
+    'training': (('default', 'cyokyo'),),
+    'pedigree': (('PedigreeTable',),),
+    'stable_comment': (('StableCommentTable',),),
+    'previous_race_comment': (('PreviousRaceCommentTable',),),
+    'horse_past_results': (('HorsePastResultsTable',),),
+}
+
+# ページ種別 → パーサーが読む領域（PARSE_REGIONS のキー）
+PAGE_REGIONS = {
+    'syutuba': 'race',
+    'cyokyo': 'training',
+    'kettou': 'pedigree',
+    'danwa': 'stable_comment',
+    'syoin': 'previous_race_comment',
+    'horse': 'horse_past_results',
+}
+
+# ページ種別 → パーサー
+# パーサーは型付きモデルではなく文字列のままの辞書を返す（ChangeTracker に保存するパース結果・再パースの差分・
+# parse_pool のプロセス間の受け渡しはこの辞書の JSON を使う）。数値への変換と Race への詰め替えは
+# scrape_race / assemble_race の Race.from_scraped で1回だけ行う
+PAGE_PARSERS = {
+    'syutuba': '_parse_race_data',
+    'cyokyo': '_parse_training_data',
+    'kettou': '_parse_pedigree_data',
+    'danwa': '_parse_stable_comment_data',
+    'syoin': '_parse_previous_race_comment_data',
+    'horse': '_parse_horse_past_results_data',
+}
+
+# パース結果の形や補助関数（_region_soup・parser_backend など）を変えたら上げる。
+# _parse_* 本体と読む領域の変更は parser_fingerprint がソースから自動で拾う
+PARSER_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def _parser_source_hash(page_type):
+    method = getattr(KeibaBookScraper, PAGE_PARSERS[page_type])
+    try:
+        source = inspect.getsource(method)
+    except (OSError, TypeError):  # ソースが無い環境では PARSER_VERSION だけで区別する
+        source = ''
+    source += repr(PARSE_REGIONS[PAGE_REGIONS[page_type]])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+
+
+def parser_fingerprint(page_type) -> str:
+    """パーサーの版。前回のパース結果は HTML とこれの両方が同じ時だけ使う（パーサーを直したら取り直しでなくパースし直す）"""
+    return f"v{PARSER_VERSION}-{_parser_source_hash(page_type)}"
+
+
+def merge_pages(race_data, training, pedigree, stable_comments, previous_race_comments):
+    """出馬表の各馬に調教・血統・厩舎の話・前走コメントを付ける（scrape() とアーカイブの再パースで共通）"""
+    for horse in race_data.get('horses', []):
+        horse_num = horse['horse_num']
+        horse['training_data'] = training.get(horse_num, {}) # データがない場合は空の辞書
+        horse['pedigree_data'] = pedigree.get(horse_num, {})
+        horse['stable_comment'] = stable_comments.get(horse_num, "") # データがない場合は空文字列
+        horse['previous_race_comment'] = previous_race_comments.get(horse_num, "")
+    return race_data
+
+
+def carry_details(race: Race, previous: Race) -> Race:
+    """出馬表以外のページの項目（調教・血統・コメント・馬柱）を previous の同じ馬（馬番と馬名が一致）から写す"""
+    runners = {(r.horse_num, r.horse_name): r for r in previous.runners}
+    for runner in race.runners:
+        old = runners.get((runner.horse_num, runner.horse_name))
+        if old is not None:
+            runner.tanpyo, runner.training, runner.pedigree = old.tanpyo, old.training, old.pedigree
+            runner.stable_comment, runner.previous_race_comment = old.stable_comment, old.previous_race_comment
+            runner.past_results = old.past_results
+    return race
+
 
 class KeibaBookScraper:
     BASE_URL = "https://race.netkeiba.com/race/shutuba.html"
 
-    def __init__(self, settings):
+    def __init__(self, settings, rate_limiter=None, page_cache=None, fetcher=None, browser_pool=None,
+                 parse_pool=None, horse_store=None, change_tracker=None, metrics=None, resilience=None,
+                 archive=None):
         self.settings = settings
         self.shutuba_url = settings['shutuba_url']
+        self.max_concurrency = max(1, settings.get('max_concurrency', 1))
+        self.rate_limiter = rate_limiter or HostRateLimiter.from_settings(settings)
+        # 渡されたキャッシュは呼び出し側のもの（複数レースで共有する）なので scrape の後に閉じない
+        self._owns_page_cache = page_cache is None
+        self.page_cache = page_cache if page_cache is not None else PageCache.from_settings(settings)
+        # 段階ごとの所要時間とページ種別ごとの件数（BatchRunner から渡されたものは全レースで共有する）
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.fetcher = fetcher or HybridFetcher.from_settings(settings, self.metrics)
+        # 再試行・サーキットブレーカー・同時リクエスト数の調整（ホストの状態は全レースで共有する）
+        self.resilience = resilience or FetchResilience.from_settings(settings, self.metrics)
+        # 外から渡されたプールは呼び出し側が起動・停止する（複数レースで同じブラウザを使い回す）
+        self.browser_pool = browser_pool
+        # parse_pool が無ければイベントループ上でそのままパースする
+        self.parse_pool = parse_pool
+        # horse_store があれば馬柱はレースをまたいで使い回す（出走していなければ取り直さない）
+        self.horse_store = horse_store
+        # change_tracker があれば内容の変わっていないページはパースせず、前回のレースとの差分を changes に入れる
+        self.change_tracker = change_tracker
+        self.changes = None
+        # archive があれば取得した HTML をそのまま残す（セレクタを直した後にパースし直せるように）
+        self.archive = archive
+        self._soup = get_parser_backend(settings.get('parser_backend', 'html.parser'))
+        self.partial_parse = settings.get('partial_parse', True)
 
     async def _fetch_page_content(self, page, url):
-        await page.goto(url, wait_until="domcontentloaded")
-        content = await page.content()
+        # 種別の分かるページはキャッシュを先に見る（取得済みのデータでサイトに再アクセスしない）
+        page_type, race_id = classify_url(url)
+        use_cache = self.page_cache is not None and page_type is not None
+        if use_cache:
+            cached = self.page_cache.get(url)
+            if cached is not None:
+                self.metrics.inc('cache_hits_total', page_type=page_type)
+                return cached
+
+        async def wait():
+            with self.metrics.span('rate_limit', page_type=page_type):
+                await self.rate_limiter.acquire(url)
+
+        # 再試行も Playwright への切り替えもレート制御を通す（送るリクエスト1件ごとに1つ）
+        content = await self.resilience.call(url, page_type, lambda: self.fetcher.fetch(page, url, page_type, acquire=wait),
+                                             wait)
+        if self.archive is not None:
+            # 圧縮・書き込み・索引の書き出しはイベントループの外で（アーカイブ側でロックする）
+            await asyncio.to_thread(self.archive.append, url, content, page_type=page_type, race_id=race_id)
+        self.metrics.inc('page_bytes_total', len(content.encode('utf-8')), page_type=page_type)
+        if use_cache:
+            self.page_cache.put(url, content, page_type=page_type, race_id=race_id)
         return content
 
+    def _region_soup(self, html_content, region):
+        if self.partial_parse:
+            html_content = extract_regions(html_content, PARSE_REGIONS[region]) or html_content
+        return self._soup(html_content)
+
+    @staticmethod
+    def _table_body(soup, selector):
+        # 表の tbody（HTML に書かれていなければ表そのもの）。lexbor は tbody を補うが
+        # html.parser / lxml は補わないので、どのバックエンドでも同じ行を読むようにする
+        table = soup.select_one(selector)
+        if table is None:
+            return None
+        return table.find('tbody', recursive=False) or table
+
     def _parse_race_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'race')
         race_data = {}
 
         # レース名とグレード
@@ -31,10 +183,11 @@ class KeibaBookScraper:
             distance_text = racetitle_sub_p_elements[1].get_text(strip=True)
             # "1150m (ダート・右) 曇・良" のような形式から距離を抽出
             race_data['distance'] = distance_text.split(' ')[0]
+            race_data['surface'] = convert.surface(distance_text)
 
         # 出馬表
         horses = []
-        shutuba_table = soup.select_one(".syutuba_sp tbody")
+        shutuba_table = self._table_body(soup, ".syutuba_sp")
         if shutuba_table:
             for row in shutuba_table.find_all('tr'):
                 horse_num_elem = row.select_one(".umaban")
@@ -53,10 +206,10 @@ class KeibaBookScraper:
         return race_data
 
     def _parse_training_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'training')
         training_data = {}
 
-        training_table = soup.select_one("table.default.cyokyo tbody")
+        training_table = self._table_body(soup, "table.default.cyokyo")
         if not training_table:
             return training_data
 
@@ -120,10 +273,10 @@ class KeibaBookScraper:
         return training_data
 
     def _parse_pedigree_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'pedigree')
         pedigree_data = {}
 
-        pedigree_table = soup.select_one(".PedigreeTable tbody")
+        pedigree_table = self._table_body(soup, ".PedigreeTable")
         if pedigree_table:
             for row in pedigree_table.find_all('tr'):
                 horse_num_elem = row.select_one(".HorseNum")
@@ -141,7 +294,7 @@ class KeibaBookScraper:
         return pedigree_data
 
     def _parse_stable_comment_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'stable_comment')
         stable_comment_data = {}
 
         comment_divs = soup.select(".StableCommentTable .HorseComment")
@@ -155,7 +308,7 @@ class KeibaBookScraper:
         return stable_comment_data
 
     def _parse_previous_race_comment_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'previous_race_comment')
         previous_race_comment_data = {}
 
         comment_divs = soup.select(".PreviousRaceCommentTable .HorseComment")
@@ -169,15 +322,15 @@ class KeibaBookScraper:
         return previous_race_comment_data
 
     def _parse_horse_past_results_data(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._region_soup(html_content, 'horse_past_results')
         past_results = []
 
-        results_table = soup.select_one(".HorsePastResultsTable tbody")
+        results_table = self._table_body(soup, ".HorsePastResultsTable")
         if results_table:
             for row in results_table.find_all('tr'):
                 columns = row.find_all('td')
-                if len(columns) >= 7: # 日付, 開催, R, 着順, タイム, 騎手, 斤量
-                    past_results.append({
+                if len(columns) >= 7: # 日付, 開催, R, 着順, タイム, 騎手, 斤量（, 馬体重）
+                    result = {
                         'date': columns[0].get_text(strip=True),
                         'venue': columns[1].get_text(strip=True),
                         'race_num': columns[2].get_text(strip=True),
@@ -185,97 +338,178 @@ class KeibaBookScraper:
                         'time': columns[4].get_text(strip=True),
                         'jockey': columns[5].get_text(strip=True),
                         'weight': columns[6].get_text(strip=True)
-                    })
+                    }
+                    if len(columns) >= 8:
+                        result['body_weight'] = columns[7].get_text(strip=True)
+                    past_results.append(result)
         return past_results
 
-    async def scrape(self):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.settings.get("playwright_headless", True))
-            page = await browser.new_page()
-            try:
-                # 血統ページのHTMLを取得して保存する
-                pedigree_url = f"{'/'.join(self.settings['shutuba_url'].split('/')[:4])}/kettou/{self.settings['race_id']}"
-                pedigree_html_content = await self._fetch_page_content(page, pedigree_url)
-                with open("debug_pedigree.html", "w", encoding="utf-8") as f:
-                    f.write(pedigree_html_content)
-                
-                # 今回はHTMLの取得が目的なので、ここで処理を中断するためにからの辞書を返す
-                return {}
+    def _site_url(self, path):
+        # 馬のページ（/db/uma/...）は出馬表と同じホストにある
+        return '/'.join(self.shutuba_url.split('/')[:3]) + path
+
+    def _page_url(self, page_type):
+        base_url = '/'.join(self.shutuba_url.split('/')[:4])
+        race_id = self.settings['race_id']
+        if page_type == 'syutuba':
+            return self.shutuba_url
+        if page_type in ('cyokyo', 'danwa'):
+            return f"{base_url}/{page_type}/0/{race_id}"
+        return f"{base_url}/{page_type}/{race_id}"
+
+    async def _fetch_with_pool(self, browser_pool, url):
+        # page は Playwright に切り替える時にだけ借りる（キャッシュや HTTP で済めばブラウザを起動しない。
+        # レート制御は _fetch_page_content 側）
+        return await self._fetch_page_content(PageLease(browser_pool, classify_url(url)[0]), url)
+
+    async def _fetch_and_parse(self, browser_pool, url, page_type):
+        try:
+            return await self._fetch_and_parse_page(browser_pool, url, page_type)
+        except Exception as e:
+            self.metrics.inc('page_errors_total', page_type=page_type, error=type(e).__name__)
+            logger.warning("%s page failed: %s", page_type, e,
+                           extra={'race_id': self.settings.get('race_id'), 'page_type': page_type, 'url': url})
+            raise
+
+    async def _fetch_and_parse_page(self, browser_pool, url, page_type):
+        # 取得できたページから順にパースへ回す（他のページの取得と重なる）
+        method = PAGE_PARSERS[page_type]
+        if self.parse_pool is None:
+            html_content = await self._fetch_with_pool(browser_pool, url)
+            digest, parsed = self._unchanged_page(url, page_type, html_content)
+            if parsed is not None:
+                return parsed
+            with self.metrics.span('parse', page_type=page_type, parser=method):
+                parsed = getattr(self, method)(html_content)
+            return self._remember_page(url, digest, parsed)
+        async with self.parse_pool.slot():
+            html_content = await self._fetch_with_pool(browser_pool, url)
+            digest, parsed = self._unchanged_page(url, page_type, html_content)
+            if parsed is not None:
+                return parsed
+            # プロセスプールでは受け渡しの時間も含む
+            with self.metrics.span('parse', page_type=page_type, parser=method):
+                parsed = await self.parse_pool.parse(method, html_content)
+            return self._remember_page(url, digest, parsed)
+
+    def _unchanged_page(self, url, page_type, html_content):
+        # 前回と同じ内容のページなら前回のパース結果を返す
+        if self.change_tracker is None:
+            return None, None
+        digest = f"{content_hash(html_content, PARSE_REGIONS[PAGE_REGIONS[page_type]])}:{parser_fingerprint(page_type)}"
+        parsed = self.change_tracker.parsed(url, digest)
+        if parsed is not None:
+            self.metrics.inc('unchanged_pages_total', page_type=page_type)
+        return digest, parsed
+
+    def _remember_page(self, url, digest, parsed):
+        if self.change_tracker is not None:
+            self.change_tracker.store_parsed(url, digest, parsed)
+        return parsed
+
+    @staticmethod
+    async def _optional(awaitable, default):
+        # 出馬表以外のページ（調教・血統・コメント・馬柱）は取れなくてもレースは残す（失敗は _fetch_and_parse が記録済み）
+        try:
+            return await awaitable
+        except Exception:
+            return default
+
+    async def _fetch_and_parse_many(self, browser_pool, urls, page_types):
+        return await asyncio.gather(*(
+            self._fetch_and_parse(browser_pool, url, page_type) for url, page_type in zip(urls, page_types)
+        ))
+
+    def _race_date(self, race_data):
+        # レース名の先頭行 "2025年11月9日 3回福島2日目" から開催日を得る
+        return convert.race_date(race_data.get('race_name')) or datetime.date.today()
+
+    async def _horse_past_results(self, browser_pool, horse_detail_url, horse_name_link, race_date):
+        async def fetch():
+            (past_results,) = await self._fetch_and_parse_many(browser_pool, [horse_detail_url], ['horse'])
+            return past_results
+        if self.horse_store is None:
+            return await fetch()
+        past_results = await self.horse_store.get_or_fetch(horse_name_link, race_date, fetch)
+        self.horse_store.record_run(horse_name_link, race_date)
+        return past_results
 
-                # url = self.shutuba_url
-                # html_content = await self._fetch_page_content(page, url)
-                
-                # # --- デバッグ用にHTMLをファイルに保存 ---
-                # with open("debug_page.html", "w", encoding="utf-8") as f:
-                #     f.write(html_content)
-                # # ------------------------------------
-
-                # race_data = self._parse_race_data(html_content)
-
-                # # 調教データを取得してマージ
-                # training_url = f"{'/'.join(self.settings['shutuba_url'].split('/')[:4])}/cyokyo/0/{self.settings['race_id']}"
-                # training_html_content = await self._fetch_page_content(page, training_url)
-                # with open("debug_training.html", "w", encoding="utf-8") as f:
-                #     f.write(training_html_content)
-                # parsed_training_data = self._parse_training_data(training_html_content)
-
-                # for horse in race_data['horses']:
-                #     horse_num = horse['horse_num']
-                #     if horse_num in parsed_training_data:
-                #         horse['training_data'] = parsed_training_data[horse_num]
-                #     else:
-                #         horse['training_data'] = {} # データがない場合は空の辞書
-
-                # # 血統データを取得してマージ
-                # pedigree_url = f"{'/'.join(self.settings['shutuba_url'].split('/')[:4])}/kettou/{self.settings['race_id']}"
-                # pedigree_html_content = await self._fetch_page_content(page, pedigree_url)
-                # with open("debug_pedigree.html", "w", encoding="utf-8") as f:
-                #     f.write(pedigree_html_content)
-                # parsed_pedigree_data = self._parse_pedigree_data(pedigree_html_content)
-
-                # for horse in race_data['horses']:
-                #     horse_num = horse['horse_num']
-                #     if horse_num in parsed_pedigree_data:
-                #         horse['pedigree_data'] = parsed_pedigree_data[horse_num]
-                #     else:
-                #         horse['pedigree_data'] = {} # データがない場合は空の辞書
-
-                # # 厩舎の話データを取得してマージ
-                # stable_comment_url = f"{'/'.join(self.settings['shutuba_url'].split('/')[:4])}/danwa/0/{self.settings['race_id']}"
-                # stable_comment_html_content = await self._fetch_page_content(page, stable_comment_url)
-                # with open("debug_stable_comment.html", "w", encoding="utf-8") as f:
-                #     f.write(stable_comment_html_content)
-                # parsed_stable_comment_data = self._parse_stable_comment_data(stable_comment_html_content)
-
-                # for horse in race_data['horses']:
-                #     horse_num = horse['horse_num']
-                #     if horse_num in parsed_stable_comment_data:
-                #         horse['stable_comment'] = parsed_stable_comment_data[horse_num]
-                #     else:
-                #         horse['stable_comment'] = "" # データがない場合は空文字列
-
-                # # 前走コメントデータを取得してマージ
-                # previous_race_comment_url = f"{'/'.join(self.settings['shutuba_url'].split('/')[:4])}/syoin/{self.settings['race_id']}"
-                # previous_race_comment_html_content = await self._fetch_page_content(page, previous_race_comment_url)
-                # with open("debug_previous_race_comment.html", "w", encoding="utf-8") as f:
-                #     f.write(previous_race_comment_html_content)
-                # parsed_previous_race_comment_data = self._parse_previous_race_comment_data(previous_race_comment_html_content)
-
-                # for horse in race_data['horses']:
-                #     horse_num = horse['horse_num']
-                #     if horse_num in parsed_previous_race_comment_data:
-                #         horse['previous_race_comment'] = parsed_previous_race_comment_data[horse_num]
-                #     else:
-                #         horse['previous_race_comment'] = "" # データがない場合は空文字列
-
-                #     # 各馬の馬柱データを取得
-                #     horse_detail_url = f"https://s.keibabook.co.jp{horse['horse_name_link']}" # horse_name_linkは後で追加
-                #     horse_detail_html_content = await self._fetch_page_content(page, horse_detail_url)
-                #     with open(f"debug_horse_{horse_num}.html", "w", encoding="utf-8") as f:
-                #         f.write(horse_detail_html_content)
-                #     horse_past_results = self._parse_horse_past_results_data(horse_detail_html_content)
-                #     horse['past_results'] = horse_past_results
-
-                # return race_data
-            finally:
-                await browser.close()
\ No newline at end of file
+    async def scrape(self):
+        browser_pool = self.browser_pool or BrowserPool.from_settings(self.settings)
+        try:
+            # 出馬表・調教・血統・厩舎の話・前走コメントは互いに独立しているので並列に取得する。
+            # 出馬表が取れなければレースは失敗、他のページは取れなければ空として扱う
+            (race_data, parsed_training_data, parsed_pedigree_data, parsed_stable_comment_data,
+             parsed_previous_race_comment_data) = await asyncio.gather(
+                self._fetch_and_parse(browser_pool, self._page_url('syutuba'), 'syutuba'),
+                *(self._optional(self._fetch_and_parse(browser_pool, self._page_url(t), t), {})
+                  for t in ('cyokyo', 'kettou', 'danwa', 'syoin')))
+
+            with self.metrics.span('merge'):
+                merge_pages(race_data, parsed_training_data, parsed_pedigree_data, parsed_stable_comment_data,
+                            parsed_previous_race_comment_data)
+
+            # 各馬の馬柱データは出馬表のリンクが揃ってから並列に取得する
+            linked_horses = [h for h in race_data['horses'] if h.get('horse_name_link')]
+            race_date = self._race_date(race_data)
+            horse_past_results = await asyncio.gather(*(
+                self._optional(self._horse_past_results(
+                    browser_pool, self._site_url(h['horse_name_link']), h['horse_name_link'], race_date), [])
+                for h in linked_horses
+            ))
+            for horse, past_results in zip(linked_horses, horse_past_results):
+                horse['past_results'] = past_results
+
+            return race_data
+        finally:
+            if self.browser_pool is None:
+                await browser_pool.stop()
+            if self._owns_page_cache and self.page_cache is not None:
+                self.page_cache.close()
+
+    async def fetch_results(self):
+        """成績ページを取得してキャッシュに入れる（確定したレースのページは以後期限切れにならない）"""
+        browser_pool = self.browser_pool or BrowserPool.from_settings(self.settings)
+        try:
+            return await self._fetch_with_pool(browser_pool, self._page_url('seiseki'))
+        finally:
+            if self.browser_pool is None:
+                await browser_pool.stop()
+            if self._owns_page_cache and self.page_cache is not None:
+                self.page_cache.close()
+
+    async def scrape_entries(self, previous: Race) -> Race:
+        """出馬表だけを取り直し、他の項目は previous（前回のレース）から引き継いだ Race（発走前の取消・乗り替わり用）
+
+        previous に居ない馬は調教などが空になる。差分は scrape_race と同じく self.changes に入れる。
+        """
+        browser_pool = self.browser_pool or BrowserPool.from_settings(self.settings)
+        try:
+            with self.metrics.span('scrape'):
+                (race_data,) = await self._fetch_and_parse_many(browser_pool, [self._page_url('syutuba')], ['syutuba'])
+        finally:
+            if self.browser_pool is None:
+                await browser_pool.stop()
+            if self._owns_page_cache and self.page_cache is not None:
+                self.page_cache.close()
+        with self.metrics.span('convert'):
+            race = Race.from_scraped(race_data, previous.race_id or str(self.settings.get('race_id', '')) or None)
+            carry_details(race, previous)
+        if self.change_tracker is not None:
+            with self.metrics.span('diff'):
+                self.changes = self.change_tracker.changes_for(race)
+        return race
+
+    async def scrape_race(self, race_id: str = None) -> Race:
+        """scrape() の結果を型付きの Race にする（数値への変換はここで1回だけ行う）
+
+        change_tracker があれば前回記録した出力との差分を self.changes に入れる（空なら変化なし）。
+        """
+        with self.metrics.span('scrape'):
+            race_data = await self.scrape()
+        with self.metrics.span('convert'):
+            race = Race.from_scraped(race_data, race_id or str(self.settings.get('race_id', '')) or None)
+        if self.change_tracker is not None:
+            with self.metrics.span('diff'):
+                self.changes = self.change_tracker.changes_for(race)
+        return race
@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# ワーカープロセス内でだけ使うパーサー（initializer で1回だけ作る）
+_worker_scraper = None
+
+
+def _init_worker(settings):
+    global _worker_scraper
+    from src.scrapers.keibabook import KeibaBookScraper
+    _worker_scraper = KeibaBookScraper(settings)
+
+
+def _parse_in_worker(method, html_content):
+    return getattr(_worker_scraper, method)(html_content)
+
+
+def worker_settings(settings: dict) -> dict:
+    """ワーカーに渡す設定。パースに要る項目だけにし、キャッシュや HTTP セッションは作らせない"""
+    return {
+        'shutuba_url': settings.get('shutuba_url', ''),
+        'race_id': settings.get('race_id'),
+        'parser_backend': settings.get('parser_backend', 'html.parser'),
+        'partial_parse': settings.get('partial_parse', True),
+        'cache': {'enabled': False},
+        'http': {'enabled': False},
+    }
+
+
+class ParsePool:
+    """_parse_* を ProcessPoolExecutor で実行し、イベントループを CPU 処理で止めないようにする
+
+    slot() は「取得してからパースが終わるまで」の枠で、max_pending 個を超えると
+    新しい取得が待たされる（パースが追いつかない時に HTML を溜め込まないための背圧）。
+    """
+
+    def __init__(self, settings: dict, workers: int = None, max_tasks_per_child: int = None,
+                 max_pending: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        kwargs = {}
+        if max_tasks_per_child:
+            # max_tasks_per_child は fork では使えないので spawn で起動する
+            kwargs = {'max_tasks_per_child': max_tasks_per_child, 'mp_context': multiprocessing.get_context('spawn')}
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(worker_settings(settings),), **kwargs
+        )
+        self._pending = None
+        self.stats = {'parsed': 0, 'backpressure_waits': 0}
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "ParsePool":
+        cfg = settings.get('parse_pool') or {}
+        return cls(settings, workers=cfg.get('workers'), max_tasks_per_child=cfg.get('max_tasks_per_child'),
+                   max_pending=cfg.get('max_pending'))
+
+    def _semaphore(self):
+        # Semaphore は使うイベントループの中で作る
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+        return self._pending
+
+    def slot(self):
+        semaphore = self._semaphore()
+        if semaphore.locked():
+            self.stats['backpressure_waits'] += 1
+        return semaphore
+
+    async def parse(self, method: str, html_content: str):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, _parse_in_worker, method, html_content)
+        self.stats['parsed'] += 1
+        return result
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
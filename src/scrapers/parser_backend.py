@@ -0,0 +1,157 @@
+import re
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+
+
+class SelectolaxNode:
+    """selectolax (lexbor) のノードを、_parse_* が使う BeautifulSoup の API の範囲で包む"""
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def name(self):
+        return self._node.tag
+
+    def select(self, selector):
+        return [SelectolaxNode(n) for n in self._node.css(selector)]
+
+    def select_one(self, selector):
+        node = self._node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def get_text(self, separator='', strip=False):
+        return self._node.text(deep=True, separator=separator, strip=strip)
+
+    def get(self, key, default=None):
+        attributes = self._node.attributes
+        if key not in attributes:
+            return default
+        value = attributes[key] or ''
+        # BeautifulSoup と同じく class は単語のリストで返す
+        return value.split() if key == 'class' else value
+
+    def has_attr(self, key):
+        return key in self._node.attributes
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def _matches(self, node, name, attrs):
+        if name is not None and node.tag != name:
+            return False
+        node_attrs = node.attributes
+        return all(node_attrs.get(k) == v for k, v in attrs.items())
+
+    def _descendants(self, recursive):
+        if not recursive:
+            return self._node.iter(include_text=False)
+        # css('*') は自分自身も返すが、BeautifulSoup の find_all は子孫だけを見る
+        return (n for n in self._node.css('*') if n.mem_id != self._node.mem_id)
+
+    def find_all(self, name=None, recursive=True, **attrs):
+        return [SelectolaxNode(n) for n in self._descendants(recursive) if self._matches(n, name, attrs)]
+
+    def find(self, name=None, recursive=True, **attrs):
+        for node in self._descendants(recursive):
+            if self._matches(node, name, attrs):
+                return SelectolaxNode(node)
+        return None
+
+
+def _selectolax_soup(html_content):
+    from selectolax.lexbor import LexborHTMLParser
+    return SelectolaxNode(LexborHTMLParser(html_content).root)
+
+
+def get_parser_backend(name: str = 'html.parser'):
+    """HTML 文字列 → soup 互換オブジェクトを返す関数を得る"""
+    if name in ('html.parser', 'lxml'):
+        if name == 'lxml':
+            import lxml  # noqa: F401  未インストールならここで ImportError にする
+        return lambda html_content: BeautifulSoup(html_content, name)
+    if name == 'selectolax':
+        import selectolax  # noqa: F401
+        return _selectolax_soup
+    raise ValueError(f"unknown parser backend: {name!r} (choose from {', '.join(PARSER_BACKENDS)})")
+
+
+def available_backends():
+    backends = []
+    for name in PARSER_BACKENDS:
+        try:
+            get_parser_backend(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+_CLASS_TAG_PATTERN = re.compile(
+    r'<([a-zA-Z][a-zA-Z0-9]*)\b[^>]*?\sclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))[^>]*>'
+)
+
+
+@lru_cache(maxsize=None)
+def _tag_pattern(tag):
+    return re.compile(r'<(/?)' + tag + r'\b[^>]*>', re.IGNORECASE)
+
+
+def _region_end(html_content, tag, start):
+    """start 以降で tag の入れ子を数え、対応する閉じタグの直後の位置を返す"""
+    depth = 0
+    for m in _tag_pattern(tag).finditer(html_content, start):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        elif not m.group(0).endswith('/>'):
+            depth += 1
+    return None
+
+
+def _find_region_starts(html_content, classes):
+    """classes を全て持つ開始タグを探す。一番長いクラス名を str.find で探してからタグを検証する"""
+    key = max(classes, key=len)
+    pos = html_content.find(key)
+    while pos != -1:
+        lt = html_content.rfind('<', 0, pos)
+        m = _CLASS_TAG_PATTERN.match(html_content, lt) if lt != -1 else None
+        if m and m.end() > pos and classes <= set((m.group(2) or m.group(3) or m.group(4) or '').split()):
+            yield m
+            pos = html_content.find(key, m.end())
+        else:
+            pos = html_content.find(key, pos + len(key))
+
+
+def extract_regions(html_content, regions):
+    """regions（クラス名の組のタプル）に一致する要素の HTML だけを文書順に連結して返す
+
+    soup を作る前に文字列のまま切り出すので、ヘッダーや広告、フッターの DOM を作らずに済む。
+    どの領域も見つからなければ None（呼び出し側は全体をパースする）。
+    """
+    spans = []
+    for classes in regions:
+        for m in _find_region_starts(html_content, frozenset(classes)):
+            end = _region_end(html_content, m.group(1).lower(), m.start())
+            if end is None:
+                return None
+            spans.append((m.start(), end))
+    if not spans:
+        return None
+    # 入れ子や重複した領域は外側だけを残す
+    pieces = []
+    last_end = -1
+    for start, end in sorted(spans):
+        if start >= last_end:
+            pieces.append(html_content[start:end])
+            last_end = end
+    return '\n'.join(pieces)
@@ -0,0 +1,90 @@
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from src.utils.metrics import Histogram, Metrics
+
+# ページ種別ごとの「データが揃った」ことを示すセレクタ
+READY_SELECTORS = {
+    'syutuba': '.syutuba_sp',
+    'cyokyo': 'table.default.cyokyo',
+    'kettou': '.PedigreeTable',
+    'danwa': '.StableCommentTable',
+    'syoin': '.PreviousRaceCommentTable',
+    'horse': '.HorsePastResultsTable',
+}
+
+
+class PageNotReadyError(Exception):
+    def __init__(self, url, page_type, selector, timeout_ms):
+        super().__init__(f"{page_type} page not ready within {timeout_ms}ms (waiting for {selector!r}): {url}")
+        self.url = url
+        self.page_type = page_type
+        self.selector = selector
+        self.timeout_ms = timeout_ms
+
+
+class PageReadiness:
+    """ページ種別のセレクタが現れ、HTML を最後まで読み終えた時点で内容を返す（load イベントを待たない）
+
+    表の要素は行より先に現れるので、セレクタの後に domcontentloaded も待つ（受信途中の表で行が欠けないように）。
+    画像や広告の読み込み（load）は待たない。セレクタが無い種別は domcontentloaded まで待つ。
+    どちらも timeout_ms（settings の playwright_timeout）以内に終わらなければ PageNotReadyError。
+    ただし HTML は読み終えたのにセレクタが現れないページ（新馬戦の前走コメントなど、データが無いページ）は
+    待っても変わらないので、そのまま返してパーサーに空のページとして扱わせる（再試行させない）。
+    metrics には応答の開始まで（network）とセレクタの出現まで（ready）を分けて記録する。
+    """
+
+    def __init__(self, timeout_ms: int = 30000, selectors: dict = None, metrics: Metrics = None):
+        self.timeout_ms = timeout_ms
+        self.selectors = dict(READY_SELECTORS)
+        self.selectors.update(selectors or {})
+        self.time_to_ready = {}
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    @classmethod
+    def from_settings(cls, settings: dict, metrics: Metrics = None) -> "PageReadiness":
+        return cls(timeout_ms=settings.get('playwright_timeout', 30000), selectors=settings.get('ready_selectors'),
+                   metrics=metrics)
+
+    def _observe(self, page_type, seconds: float):
+        key = page_type or 'other'
+        if key not in self.time_to_ready:
+            self.time_to_ready[key] = Histogram()
+        self.time_to_ready[key].observe(seconds)
+
+    async def load(self, page, url, page_type=None):
+        selector = self.selectors.get(page_type)
+        started = time.monotonic()
+        try:
+            if selector is None:
+                with self.metrics.span('network', page_type=page_type, transport='playwright'):
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_ms)
+            else:
+                # レスポンスを受け取り始めたら、あとはセレクタの出現だけを待つ
+                with self.metrics.span('network', page_type=page_type, transport='playwright'):
+                    await page.goto(url, wait_until="commit", timeout=self.timeout_ms)
+                remaining = max(1, self.timeout_ms - (time.monotonic() - started) * 1000)
+                with self.metrics.span('ready', page_type=page_type, transport='playwright'):
+                    await page.wait_for_selector(selector, state="attached", timeout=remaining)
+                    # 表が現れた時点ではまだ行を受信中のことがある
+                    remaining = max(1, self.timeout_ms - (time.monotonic() - started) * 1000)
+                    await page.wait_for_load_state("domcontentloaded", timeout=remaining)
+        except PlaywrightTimeoutError as e:
+            if selector is not None and await self._document_loaded(page):
+                self.metrics.inc('pages_without_data_total', page_type=page_type)
+                return await page.content()
+            raise PageNotReadyError(url, page_type, selector, self.timeout_ms) from e
+        self._observe(page_type, time.monotonic() - started)
+        return await page.content()
+
+    @staticmethod
+    async def _document_loaded(page) -> bool:
+        try:
+            return await page.evaluate("document.readyState") in ('interactive', 'complete')
+        except PlaywrightError:
+            return False
+
+    def stats(self) -> dict:
+        return {page_type: h.to_dict() for page_type, h in self.time_to_ready.items()}
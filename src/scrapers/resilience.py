@@ -0,0 +1,331 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import requests
+from playwright.async_api import Error as PlaywrightError
+
+from src.scrapers.fetcher import FetchError
+from src.scrapers.readiness import PageNotReadyError
+from src.utils.logger import get_logger
+from src.utils.metrics import Metrics
+
+logger = get_logger(__name__)
+
+# 待てば直る見込みのある失敗（5xx・429・タイムアウト・接続エラー）
+RETRYABLE_ERRORS = (FetchError, PageNotReadyError, PlaywrightError, requests.RequestException, asyncio.TimeoutError)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, FetchError):
+        return error.retryable
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class RetryPolicy:
+    """attempt 回目（0 始まり）の失敗の後に待つ秒数を決める（full jitter の指数バックオフ）
+
+    0 〜 min(max_delay, base_delay * 2**attempt) の一様乱数。サーバーが Retry-After を返したら
+    それより短くはしない。
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0, rng=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class RetryBudget:
+    """再試行をリクエスト数の ratio 倍（+ min_retries 回）までに抑える
+
+    サイトが落ちているときに全ページが max_attempts 回ずつ叩き直して負荷を何倍にもしないため。
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 5):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_retry(self) -> bool:
+        if self.retries >= self.min_retries + self.ratio * self.requests:
+            return False
+        self.retries += 1
+        return True
+
+
+class CircuitBreaker:
+    """1ホスト分のサーキットブレーカー
+
+    連続 failure_threshold 回失敗すると open になり reset_timeout 秒はリクエストを出さない。
+    その後 half_open で1件だけ試し、成功すれば closed に戻る。失敗すれば次の待ち時間を倍にする
+    （max_reset_timeout まで）。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, max_reset_timeout: float = 600.0,
+                 clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._timeout = reset_timeout
+        self._open_until = 0.0
+        self._probing = False
+
+    def wait_time(self) -> float:
+        """リクエストを出せるようになるまでの秒数の目安（0 なら try_acquire してよい）"""
+        if self.state == OPEN:
+            return max(0.0, self._open_until - self.clock())
+        if self.state == HALF_OPEN and self._probing:
+            return min(1.0, self._timeout)
+        return 0.0
+
+    def try_acquire(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.clock() < self._open_until:
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._timeout = self.reset_timeout
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._timeout = min(self.max_reset_timeout, self._timeout * 2)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """試しのリクエストが結果を出さずに終わった（キャンセルなど）"""
+        self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened += 1
+        self._probing = False
+        self._open_until = self.clock() + self._timeout
+
+
+class AdaptiveConcurrency:
+    """同時に出すリクエスト数を AIMD で調整する
+
+    応答時間の移動平均が健全（基準の latency_tolerance 倍以内、latency_target があればそれ以下）な間は
+    リクエストごとに 1/limit ずつ増やし（おおむね1往復で +1）、遅いかエラーなら limit に decrease を掛ける。
+    減らすのは1往復に1回まで。基準は移動平均の最小値で、遅い状態が続けばゆっくり追従する
+    （1件だけの揺らぎでは減らさない）。上限は max_limit（max_concurrency）で、レート制御の上限は別に効く。
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: float = None, tolerance: float = 2.0,
+                 target: float = None, decrease: float = 0.5, smoothing: float = 0.2, clock=time.monotonic):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial or self.min_limit)))
+        self.tolerance = tolerance
+        self.target = target
+        self.decrease = decrease
+        self.smoothing = smoothing
+        self.clock = clock
+        self.smoothed = None
+        self.baseline = None
+        self.in_flight = 0
+        self.stats = {'increases': 0, 'decreases': 0}
+        self._last_decrease = float('-inf')
+        self._condition = None
+
+    def _cond(self):
+        # Condition は使うイベントループの中で作る
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self):
+        cond = self._cond()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with cond:
+                self.in_flight -= 1
+                cond.notify_all()
+
+    def healthy(self, latency: float) -> bool:
+        if self.target is not None and latency > self.target:
+            return False
+        return self.baseline is None or latency <= self.baseline * self.tolerance
+
+    def record(self, latency: float, ok: bool = True):
+        if ok:
+            self.smoothed = latency if self.smoothed is None else \
+                self.smoothed + (latency - self.smoothed) * self.smoothing
+            latency = self.smoothed
+        if ok and self.healthy(latency):
+            # 待っているリクエストは slot() を抜けるときの notify_all で新しい上限を見る
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.stats['increases'] += 1
+        else:
+            now = self.clock()
+            # 同じ混雑で並行中のリクエストが一斉に失敗しても、1往復の間に何度も減らさない
+            if now - self._last_decrease >= (self.baseline or latency):
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self._last_decrease = now
+                self.stats['decreases'] += 1
+        if ok:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += (latency - self.baseline) * 0.01
+
+
+class FetchResilience:
+    """取得の再試行・ホストごとのサーキットブレーカー・同時リクエスト数の自動調整をまとめたもの
+
+    call() は attempt（1回分の取得を行うコルーチン関数）を、再試行できる失敗なら
+    ページ種別ごとの max_attempts と再試行予算の範囲でバックオフしながら繰り返す。
+    wait（レート制御の待ち）は毎回の試行の前に呼び、応答時間には含めない。
+    """
+
+    def __init__(self, policies: dict = None, budgets: dict = None, breaker_options: dict = None,
+                 concurrency: AdaptiveConcurrency = None, metrics: Metrics = None, sleep=asyncio.sleep):
+        self.policies = policies or {}
+        self.budgets = budgets or {}
+        self.breaker_options = breaker_options or {}
+        self.concurrency = concurrency
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.sleep = sleep
+        self.breakers = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict, metrics: Metrics = None) -> "FetchResilience":
+        retry = settings.get('retry') or {}
+        overrides = retry.get('page_types') or {}
+        page_types = set(overrides) | {None}
+        policies, budgets = {}, {}
+        for page_type in page_types:
+            cfg = dict(retry, **(overrides.get(page_type) or {}))
+            policies[page_type] = RetryPolicy(cfg.get('max_attempts', 4), cfg.get('base_delay', 1.0),
+                                              cfg.get('max_delay', 60.0))
+            budgets[page_type] = RetryBudget(cfg.get('budget_ratio', 0.2), cfg.get('min_retries', 5))
+        breaker = settings.get('circuit_breaker') or {}
+        adaptive = settings.get('adaptive_concurrency') or {}
+        concurrency = None
+        if adaptive.get('enabled', True):
+            concurrency = AdaptiveConcurrency(
+                settings.get('max_concurrency', 1), adaptive.get('min', 1), adaptive.get('initial'),
+                adaptive.get('latency_tolerance', 2.0), adaptive.get('latency_target'), adaptive.get('decrease', 0.5))
+        return cls(policies, budgets, {
+            'failure_threshold': breaker.get('failure_threshold', 5),
+            'reset_timeout': breaker.get('reset_timeout', 30.0),
+            'max_reset_timeout': breaker.get('max_reset_timeout', 600.0),
+        }, concurrency, metrics)
+
+    def policy(self, page_type) -> RetryPolicy:
+        if page_type not in self.policies:
+            self.policies[page_type] = self.policies.get(None) or RetryPolicy()
+        return self.policies[page_type]
+
+    def budget(self, page_type) -> RetryBudget:
+        # 予算は種別ごとに別に数える（馬柱の失敗で出馬表の再試行を使い切らない）
+        if page_type not in self.budgets:
+            default = self.budgets.get(None) or RetryBudget()
+            self.budgets[page_type] = RetryBudget(default.ratio, default.min_retries)
+        return self.budgets[page_type]
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(**self.breaker_options)
+        return self.breakers[host]
+
+    async def _pass_breaker(self, breaker: CircuitBreaker, page_type):
+        if breaker.try_acquire():
+            return
+        with self.metrics.span('circuit_wait', page_type=page_type):
+            while not breaker.try_acquire():
+                await self.sleep(max(0.05, breaker.wait_time()))
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self.concurrency is None:
+            yield
+            return
+        async with self.concurrency.slot():
+            yield
+
+    async def _attempt(self, url, page_type, attempt, wait):
+        breaker = self.breaker(url)
+        await self._pass_breaker(breaker, page_type)
+        async with self._slot():
+            if wait is not None:
+                await wait()
+            started = time.monotonic()
+            try:
+                content = await attempt()
+            except BaseException as e:
+                if isinstance(e, Exception) and is_retryable(e):
+                    breaker.record_failure()
+                    if breaker.state == OPEN:
+                        self.metrics.inc('circuit_open_total', host=urlparse(url).netloc)
+                    if self.concurrency is not None:
+                        self.concurrency.record(time.monotonic() - started, ok=False)
+                else:
+                    breaker.release()
+                raise
+            breaker.record_success()
+            if self.concurrency is not None:
+                self.concurrency.record(time.monotonic() - started)
+                self.metrics.set('concurrency_limit', self.concurrency.limit)
+            return content
+
+    async def call(self, url: str, page_type, attempt, wait=None):
+        policy = self.policy(page_type)
+        budget = self.budget(page_type)
+        budget.record_request()
+        for n in range(policy.max_attempts):
+            try:
+                return await self._attempt(url, page_type, attempt, wait)
+            except Exception as e:
+                last_try = n + 1 >= policy.max_attempts
+                if not is_retryable(e) or last_try or not budget.try_retry():
+                    if is_retryable(e) and not last_try:
+                        self.metrics.inc('retry_budget_exhausted_total', page_type=page_type)
+                    raise
+                delay = policy.delay(n, getattr(e, 'retry_after', None))
+                reason = f"http_{e.status}" if isinstance(e, FetchError) else type(e).__name__
+                self.metrics.inc('page_retries_total', page_type=page_type, reason=reason)
+                logger.info("retrying %s in %.1fs (attempt %d/%d): %s", url, delay, n + 2, policy.max_attempts, e,
+                            extra={'page_type': page_type, 'url': url})
+                with self.metrics.span('backoff', page_type=page_type):
+                    await self.sleep(delay)
@@ -0,0 +1,190 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+from src.models.race import Race
+from src.scrapers.parser_backend import extract_regions
+
+_WHITESPACE = re.compile(r'\s+')
+# 取得のたびに変わるが内容ではないもの（埋め込みスクリプト・コメント）
+_VOLATILE = re.compile(r'<script\b.*?</script>|<!--.*?-->', re.DOTALL | re.IGNORECASE)
+
+# 差分を取る出走馬の項目（項目名 → 変更の種類）
+RUNNER_SECTIONS = {
+    'horse_name': 'entry', 'jockey': 'entry', 'horse_name_link': 'entry',
+    'tanpyo': 'training', 'training': 'training',
+    'pedigree': 'pedigree',
+    'stable_comment': 'stable_comment',
+    'previous_race_comment': 'previous_race_comment',
+    'past_results': 'past_results',
+}
+RACE_FIELDS = ('race_name', 'race_grade', 'race_date', 'distance_m', 'surface')
+
+
+def content_hash(html_content: str, regions=None) -> str:
+    """パーサーが読む領域だけを正規化してハッシュする（広告や空白の違いでは変わらない）"""
+    if regions:
+        html_content = extract_regions(html_content, regions) or html_content
+    normalized = _WHITESPACE.sub(' ', _VOLATILE.sub('', html_content)).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _runner_values(runner):
+    data = runner.to_dict()
+    return {field: data[field] for field in RUNNER_SECTIONS}
+
+
+def diff_races(old: Race, new: Race) -> list:
+    """2つの Race の違いを [{'section', 'horse_num', 'field', 'old', 'new'}, ...] で返す
+
+    出走馬の増減は section 'entry' の field 'added' / 'scratched'（取消・除外）になる。
+    """
+    changes = []
+    if old is None:
+        return [{'section': 'race', 'horse_num': None, 'field': 'new_race', 'old': None, 'new': new.race_id}]
+    for field in RACE_FIELDS:
+        before, after = getattr(old, field), getattr(new, field)
+        if before != after:
+            changes.append({'section': 'race', 'horse_num': None, 'field': field, 'old': before, 'new': after})
+
+    old_runners = {r.horse_num: r for r in old.runners}
+    new_runners = {r.horse_num: r for r in new.runners}
+    for horse_num in sorted(old_runners.keys() - new_runners.keys(), key=str):
+        changes.append({'section': 'entry', 'horse_num': horse_num, 'field': 'scratched',
+                        'old': old_runners[horse_num].horse_name, 'new': None})
+    for horse_num in sorted(new_runners.keys() - old_runners.keys(), key=str):
+        changes.append({'section': 'entry', 'horse_num': horse_num, 'field': 'added',
+                        'old': None, 'new': new_runners[horse_num].horse_name})
+    for horse_num in sorted(old_runners.keys() & new_runners.keys(), key=str):
+        before, after = _runner_values(old_runners[horse_num]), _runner_values(new_runners[horse_num])
+        for field, section in RUNNER_SECTIONS.items():
+            if before[field] != after[field]:
+                changes.append({'section': section, 'horse_num': horse_num, 'field': field,
+                                'old': before[field], 'new': after[field]})
+    return changes
+
+
+class ChangeTracker:
+    """ページごとの正規化ハッシュとパース結果、レースごとの最終出力を保持する
+
+    ハッシュが前回と同じページはパースせずに前回の結果を使う。レースの内容が前回の出力と同じなら
+    呼び出し側は書き出しを省き、変化があれば書き出した後に record() で項目ごとの差分を changes に残す。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = {'unchanged_pages': 0, 'changed_pages': 0, 'unchanged_races': 0, 'changed_races': 0}
+        self._conn = None
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        cfg = settings.get('incremental') or {}
+        if not cfg.get('enabled', True):
+            return None
+        path = cfg.get('path') or os.path.join(settings.get('output_dir', 'data'), 'pages.sqlite3')
+        return cls(path)
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, parsed TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS races (race_id TEXT PRIMARY KEY, race TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes ("
+                " race_id TEXT NOT NULL, checked_at REAL NOT NULL, changes TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS changes_race_id ON changes(race_id, checked_at)")
+            self._conn.commit()
+        return self._conn
+
+    # --- ページ ---
+
+    def parsed(self, url: str, digest: str):
+        """前回と同じハッシュならそのときのパース結果、違えば None
+
+        digest は呼び出し側でパーサーの版も含めて作る（パーサーが変われば一致しない）。
+        """
+        row = self._db().execute("SELECT content_hash, parsed FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] != digest:
+            self.stats['changed_pages'] += 1
+            return None
+        self.stats['unchanged_pages'] += 1
+        return json.loads(row[1])
+
+    def page_urls(self):
+        """パース結果を保存しているページの URL（再パースの比較対象。結果は last_parsed で1件ずつ引く）"""
+        for (url,) in self._db().execute("SELECT url FROM pages ORDER BY url"):
+            yield url
+
+    def last_parsed(self, url: str):
+        """保存されているパース結果（ハッシュは見ない）。無ければ None"""
+        row = self._db().execute("SELECT parsed FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_parsed(self, url: str, digest: str, parsed):
+        db = self._db()
+        db.execute(
+            "INSERT INTO pages (url, content_hash, parsed, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(url) DO UPDATE SET content_hash = excluded.content_hash, parsed = excluded.parsed,"
+            " updated_at = excluded.updated_at",
+            (url, digest, json.dumps(parsed, ensure_ascii=False), time.time()))
+        db.commit()
+
+    # --- レース ---
+
+    def last_race(self, race_id: str):
+        row = self._db().execute("SELECT race FROM races WHERE race_id = ?", (race_id,)).fetchone()
+        return Race.from_dict(json.loads(row[0])) if row else None
+
+    def changes_for(self, race: Race) -> list:
+        """前回記録した出力との差分（初回は new_race の1件、変化がなければ空）"""
+        changes = diff_races(self.last_race(race.race_id), race)
+        self.stats['changed_races' if changes else 'unchanged_races'] += 1
+        return changes
+
+    def record(self, race: Race, changes: list):
+        """書き出しが済んだ race を次回の比較対象として保存し、差分を changes に残す"""
+        if not changes:
+            return
+        now = time.time()
+        db = self._db()
+        db.execute(
+            "INSERT INTO races (race_id, race, updated_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(race_id) DO UPDATE SET race = excluded.race, updated_at = excluded.updated_at",
+            (race.race_id, json.dumps(race.to_dict(), ensure_ascii=False), now))
+        db.execute("INSERT INTO changes (race_id, checked_at, changes) VALUES (?, ?, ?)",
+                   (race.race_id, now, json.dumps(changes, ensure_ascii=False)))
+        db.commit()
+
+    def change_report(self, since: float = 0.0) -> list:
+        """since（UNIX 時刻）以降に記録された変化を古い順に返す"""
+        rows = self._db().execute(
+            "SELECT race_id, checked_at, changes FROM changes WHERE checked_at >= ? ORDER BY checked_at",
+            (since,)).fetchall()
+        return [{'race_id': race_id,
+                 'checked_at': datetime.datetime.fromtimestamp(checked_at).isoformat(timespec='seconds'),
+                 'changes': json.loads(changes)} for race_id, checked_at, changes in rows]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def summarize_changes(changes: list) -> str:
+    """"stable_comment×2, entry(scratched)×1" のような1行の要約"""
+    counts = {}
+    for change in changes:
+        key = change['section'] if change['section'] != 'entry' else f"entry({change['field']})"
+        counts[key] = counts.get(key, 0) + 1
+    return ', '.join(f"{key}×{count}" for key, count in counts.items()) or 'no changes'
@@ -0,0 +1,200 @@
+import os
+
+import pandas as pd
+from sqlalchemy import (Column, Date, Float, ForeignKey, Index, Integer, String, Text, create_engine, delete,
+                        select)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from src.storage.exporter import flatten_race
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class RaceRow(Base):
+    __tablename__ = 'races'
+    race_id = Column(String(12), primary_key=True)
+    race_date = Column(Date, index=True)
+    year = Column(Integer)
+    venue = Column(String, index=True)
+    venue_code = Column(String(2))
+    kai = Column(Integer)
+    day = Column(Integer)
+    race_num = Column(Integer)
+    race_name = Column(String)
+    race_grade = Column(String)
+    distance_m = Column(Integer)
+    surface = Column(String)
+    __table_args__ = (Index('ix_races_surface_distance', 'surface', 'distance_m'),)
+
+
+class HorseRow(Base):
+    __tablename__ = 'horses'
+    horse_id = Column(String, primary_key=True)
+    horse_name = Column(String, index=True)
+
+
+class PedigreeRow(Base):
+    __tablename__ = 'pedigrees'
+    horse_id = Column(String, primary_key=True)
+    father = Column(String, index=True)
+    mother = Column(String)
+    mothers_father = Column(String, index=True)
+
+
+class RunnerRow(Base):
+    __tablename__ = 'runners'
+    race_id = Column(String(12), ForeignKey('races.race_id'), primary_key=True)
+    horse_num = Column(Integer, primary_key=True)
+    horse_id = Column(String, index=True)
+    jockey = Column(String)
+    tanpyo = Column(String)
+
+
+class TrainingRow(Base):
+    __tablename__ = 'trainings'
+    race_id = Column(String(12), primary_key=True)
+    horse_num = Column(Integer, primary_key=True)
+    session_no = Column(Integer, primary_key=True)
+    date = Column(String)
+    course = Column(String)
+    condition = Column(String)
+    method = Column(String)
+    time_6f = Column(Float)
+    time_5f = Column(Float)
+    time_4f = Column(Float)
+    time_3f = Column(Float)
+    time_1f = Column(Float)
+    position = Column(Integer)
+    awase = Column(Text)
+
+
+class CommentRow(Base):
+    __tablename__ = 'comments'
+    race_id = Column(String(12), primary_key=True)
+    horse_num = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)  # stable / previous_race
+    comment = Column(Text)
+
+
+class ResultRow(Base):
+    __tablename__ = 'results'
+    horse_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True, index=True)
+    venue = Column(String, primary_key=True, index=True)
+    race_num = Column(Integer, primary_key=True)
+    finish_position = Column(Integer)
+    time_s = Column(Float)
+    jockey = Column(String)
+    weight = Column(Float)
+    body_weight = Column(Integer)
+
+
+def _clean(value):
+    # pandas 由来の NaT / Timestamp を DB に入れられる値にする
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.date()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _rows_for(model, rows, **extra):
+    columns = [c.name for c in model.__table__.columns]
+    return [{c: _clean(dict(row, **extra).get(c)) for c in columns} for row in rows]
+
+
+class RaceDatabase:
+    """パース済みレースを正規化スキーマに保存する（SQLite / PostgreSQL）
+
+    書き込みは主キーでの一括 upsert なので、同じレースを取り直して保存しても行は増えない。
+    レースに属する行（出走馬・調教・コメント）は同じトランザクションで消してから入れ直すので、
+    取消になった馬や無くなった調教・コメントの行は残らない。batch_size レースごとに1トランザクションにまとめる。
+    """
+
+    def __init__(self, url: str, batch_size: int = 50):
+        self.engine = create_engine(url)
+        self.batch_size = batch_size
+        Base.metadata.create_all(self.engine)
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "RaceDatabase":
+        cfg = settings.get('database') or {}
+        url = cfg.get('url') or f"sqlite:///{os.path.join(settings.get('output_dir', 'data'), 'keibabook.sqlite3')}"
+        return cls(url, batch_size=cfg.get('batch_size', 50))
+
+    def _insert(self, table):
+        if self.engine.dialect.name == 'postgresql':
+            return postgresql.insert(table)
+        return sqlite.insert(table)
+
+    def _upsert(self, session, model, rows):
+        if not rows:
+            return
+        table = model.__table__
+        # 同じバッチ内の重複は後のものを残す
+        keys = [c.name for c in table.primary_key.columns]
+        rows = list({tuple(r[k] for k in keys): r for r in rows}.values())
+        stmt = self._insert(table)
+        updates = {c.name: stmt.excluded[c.name] for c in table.columns if not c.primary_key}
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=updates) if updates else stmt.on_conflict_do_nothing()
+        session.execute(stmt, rows)
+
+    def _save_batch(self, races):
+        tables = {name: [] for name in ('races', 'runners', 'trainings', 'pedigrees', 'stable_comments',
+                                        'previous_race_comments', 'past_results')}
+        for race in races:
+            flatten_race(race, tables)
+        horses = [{'horse_id': r['horse_id'], 'horse_name': r['horse_name']} for r in tables['runners'] if r['horse_id']]
+        race_ids = [r['race_id'] for r in tables['races']]
+        with Session(self.engine) as session, session.begin():
+            for model in (TrainingRow, CommentRow, RunnerRow):
+                session.execute(delete(model).where(model.race_id.in_(race_ids)))
+            self._upsert(session, RaceRow, _rows_for(RaceRow, tables['races']))
+            self._upsert(session, HorseRow, _rows_for(HorseRow, horses))
+            self._upsert(session, PedigreeRow, _rows_for(PedigreeRow, [p for p in tables['pedigrees'] if p['horse_id']]))
+            self._upsert(session, RunnerRow, _rows_for(RunnerRow, tables['runners']))
+            self._upsert(session, TrainingRow, _rows_for(TrainingRow, tables['trainings']))
+            self._upsert(session, CommentRow, _rows_for(CommentRow, tables['stable_comments'], kind='stable')
+                         + _rows_for(CommentRow, tables['previous_race_comments'], kind='previous_race'))
+            self._upsert(session, ResultRow, _rows_for(ResultRow, [r for r in tables['past_results']
+                                                                   if r['horse_id'] and not pd.isna(r['date'])]))
+
+    def save_races(self, races) -> int:
+        batch = []
+        count = 0
+        for race in races:
+            batch.append(race)
+            if len(batch) >= self.batch_size:
+                self._save_batch(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._save_batch(batch)
+            count += len(batch)
+        return count
+
+    def runs_by_sire(self, sire: str, surface: str = None, distance_m: int = None):
+        """父 sire の産駒の出走（例: runs_by_sire('ドレフォン', 'ダート', 1150)）"""
+        stmt = (
+            select(RaceRow.race_id, RaceRow.race_date, RaceRow.venue, RaceRow.surface, RaceRow.distance_m,
+                   RunnerRow.horse_num, HorseRow.horse_name, RunnerRow.jockey)
+            .join(RunnerRow, RunnerRow.race_id == RaceRow.race_id)
+            .join(PedigreeRow, PedigreeRow.horse_id == RunnerRow.horse_id)
+            .join(HorseRow, HorseRow.horse_id == RunnerRow.horse_id)
+            .where(PedigreeRow.father == sire)
+            .order_by(RaceRow.race_date)
+        )
+        if surface is not None:
+            stmt = stmt.where(RaceRow.surface == surface)
+        if distance_m is not None:
+            stmt = stmt.where(RaceRow.distance_m == distance_m)
+        with Session(self.engine) as session:
+            return [row._asdict() for row in session.execute(stmt)]
+
+    def close(self):
+        self.engine.dispose()
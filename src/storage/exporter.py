@@ -0,0 +1,155 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+from src.models.race import Race
+from src.utils import convert
+from src.utils.race_id import VENUE_CODES, parse_race_id
+
+VENUE_NAMES = {code: name for name, code in VENUE_CODES.items()}
+
+# テーブルごとの列と型。文字列で値の種類が少ない列は category（Parquet では辞書エンコード）にする
+TABLE_SCHEMAS = {
+    'races': {
+        'race_id': 'string', 'year': 'int16', 'venue': 'category', 'venue_code': 'category', 'kai': 'int8',
+        'day': 'int8', 'race_num': 'int8', 'race_date': 'datetime64[s]', 'race_name': 'string',
+        'race_grade': 'category', 'distance_m': 'Int16', 'surface': 'category',
+    },
+    'runners': {
+        'race_id': 'string', 'horse_num': 'Int8', 'horse_id': 'string', 'horse_name': 'string',
+        'jockey': 'category', 'tanpyo': 'category', 'year': 'int16', 'venue': 'category',
+    },
+    'trainings': {
+        'race_id': 'string', 'horse_num': 'Int8', 'session_no': 'int8', 'date': 'string', 'course': 'category',
+        'condition': 'category', 'method': 'category', 'time_6f': 'float32', 'time_5f': 'float32',
+        'time_4f': 'float32', 'time_3f': 'float32', 'time_1f': 'float32', 'position': 'Int8', 'awase': 'string',
+        'year': 'int16', 'venue': 'category',
+    },
+    'pedigrees': {
+        'race_id': 'string', 'horse_num': 'Int8', 'horse_id': 'string', 'father': 'category', 'mother': 'string',
+        'mothers_father': 'category', 'year': 'int16', 'venue': 'category',
+    },
+    'stable_comments': {
+        'race_id': 'string', 'horse_num': 'Int8', 'comment': 'string', 'year': 'int16', 'venue': 'category',
+    },
+    'previous_race_comments': {
+        'race_id': 'string', 'horse_num': 'Int8', 'comment': 'string', 'year': 'int16', 'venue': 'category',
+    },
+    'past_results': {
+        'horse_id': 'string', 'date': 'datetime64[s]', 'venue': 'category', 'race_num': 'Int8',
+        'finish_position': 'Int8', 'time_s': 'float32', 'jockey': 'category', 'weight': 'float32', 'body_weight': 'Int16',
+        'year': 'int16',
+    },
+}
+
+# 各テーブルの一意キー（同じレースを再出力しても行が重複しない）
+TABLE_KEYS = {
+    'races': ['race_id'],
+    'runners': ['race_id', 'horse_num'],
+    'trainings': ['race_id', 'horse_num', 'session_no'],
+    'pedigrees': ['race_id', 'horse_num'],
+    'stable_comments': ['race_id', 'horse_num'],
+    'previous_race_comments': ['race_id', 'horse_num'],
+    'past_results': ['horse_id', 'date', 'venue', 'race_num'],
+}
+
+PARTITION_COLUMNS = ['year', 'venue']
+
+
+def _timestamp(iso_date):
+    return pd.Timestamp(iso_date) if iso_date else pd.NaT
+
+
+def flatten_race(race, tables: dict):
+    """レース1件（Race か辞書）を、各テーブルの行として tables に追加する"""
+    race = Race.coerce(race)
+    key = parse_race_id(race.race_id)
+    venue = VENUE_NAMES.get(key['venue_code'], key['venue_code'])
+    year = key['year']
+    tables['races'].append({
+        'race_id': race.race_id, 'year': year, 'venue': venue, 'venue_code': key['venue_code'], 'kai': key['kai'],
+        'day': key['day'], 'race_num': key['race'], 'race_date': _timestamp(race.race_date),
+        'race_name': race.race_name, 'race_grade': race.race_grade, 'distance_m': race.distance_m,
+        'surface': race.surface,
+    })
+    for runner in race.runners:
+        common = {'race_id': race.race_id, 'horse_num': runner.horse_num, 'year': year, 'venue': venue}
+        tables['runners'].append(dict(
+            common, horse_id=runner.horse_id, horse_name=runner.horse_name, jockey=runner.jockey,
+            tanpyo=runner.tanpyo))
+        for session_no, session in enumerate(runner.training, start=1):
+            tables['trainings'].append(dict(
+                common, session_no=session_no, date=session.date, course=session.course,
+                condition=session.condition, method=session.method, position=session.position,
+                awase=session.awase,
+                **{f'time_{furlong}': value for furlong, value in zip(convert.TRAINING_FURLONGS, session.times)}))
+        if runner.pedigree:
+            tables['pedigrees'].append(dict(
+                common, horse_id=runner.horse_id, father=runner.pedigree.father, mother=runner.pedigree.mother,
+                mothers_father=runner.pedigree.mothers_father))
+        if runner.stable_comment:
+            tables['stable_comments'].append(dict(common, comment=runner.stable_comment))
+        if runner.previous_race_comment:
+            tables['previous_race_comments'].append(dict(common, comment=runner.previous_race_comment))
+        for result in runner.past_results:
+            date = _timestamp(result.date)
+            tables['past_results'].append({
+                'horse_id': runner.horse_id, 'date': date, 'venue': result.venue, 'race_num': result.race_num,
+                'finish_position': result.finish_position, 'time_s': result.time_s, 'jockey': result.jockey,
+                'weight': result.weight, 'body_weight': result.body_weight, 'year': date.year if not pd.isna(date) else 0,
+            })
+
+
+def build_tables(races) -> dict:
+    """レース（Race か辞書）の列から正規化したテーブル（DataFrame）を作る"""
+    rows = {name: [] for name in TABLE_SCHEMAS}
+    for race in races:
+        flatten_race(race, rows)
+    tables = {}
+    for name, schema in TABLE_SCHEMAS.items():
+        df = pd.DataFrame(rows[name], columns=list(schema))
+        df = df.astype(schema)
+        tables[name] = df.drop_duplicates(subset=TABLE_KEYS[name], keep='last').reset_index(drop=True)
+    return tables
+
+
+def iter_jsonl_races(paths):
+    """JSONL ファイル群からレースを読み、同じ race_id は後に書かれたものだけを返す"""
+    latest = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    race = json.loads(line)
+                    latest[str(race['race_id'])] = race
+    return latest.values()
+
+
+def export_tables(tables: dict, out_dir: str, formats=('parquet', 'csv')):
+    """Parquet は year/venue でパーティション分割、CSV はテーブルごとに1ファイル"""
+    written = []
+    for name, df in tables.items():
+        if 'parquet' in formats:
+            path = os.path.join(out_dir, 'parquet', name)
+            partition_cols = [c for c in PARTITION_COLUMNS if c in df.columns]
+            df.to_parquet(path, engine='pyarrow', index=False, partition_cols=partition_cols,
+                          existing_data_behavior='delete_matching')
+            written.append(path)
+        if 'csv' in formats:
+            path = os.path.join(out_dir, 'csv', f'{name}.csv')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_csv(path, index=False, encoding='utf-8')
+            written.append(path)
+    return written
+
+
+def load_table(out_dir: str, name: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(out_dir, 'parquet', name), engine='pyarrow')
+
+
+def export_from_jsonl(output_dir: str, out_dir: str = None, formats=('parquet', 'csv')):
+    paths = sorted(glob.glob(os.path.join(output_dir, 'jsonl', '*.jsonl')))
+    tables = build_tables(iter_jsonl_races(paths))
+    return tables, export_tables(tables, out_dir or os.path.join(output_dir, 'tables'), formats)
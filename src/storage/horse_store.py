@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+
+
+class HorseStore:
+    """馬ごとの過去走（馬柱）をレースをまたいで保持する。キーは出馬表の horse_name_link
+
+    fetched_on は馬ページを取得した日、last_run_on はこの馬が出走したレースのうち把握している最新の日。
+    取得後に出走していれば（fetched_on <= last_run_on < 今回のレース日）過去走が増えているので取り直す。
+    把握していない出走に備えて、max_age_days を過ぎたものも取り直す。
+    """
+
+    def __init__(self, path: str, max_age_days: int = 14):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'coalesced': 0}
+        self._conn = None
+        self._inflight = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        cfg = settings.get('horse_store') or {}
+        if not cfg.get('enabled', True):
+            return None
+        path = cfg.get('path') or os.path.join(settings.get('output_dir', 'data'), 'horses.sqlite3')
+        return cls(path, max_age_days=cfg.get('max_age_days', 14))
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS horses ("
+                " horse_name_link TEXT PRIMARY KEY, past_results TEXT, fetched_on TEXT, last_run_on TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _is_fresh(self, fetched_on: str, last_run_on: str, race_date: datetime.date) -> bool:
+        fetched = datetime.date.fromisoformat(fetched_on)
+        if (race_date - fetched).days > self.max_age_days:
+            return False
+        if last_run_on is not None:
+            last_run = datetime.date.fromisoformat(last_run_on)
+            if fetched <= last_run < race_date:
+                return False
+        return True
+
+    def get(self, horse_name_link: str, race_date: datetime.date):
+        row = self._db().execute(
+            "SELECT past_results, fetched_on, last_run_on FROM horses WHERE horse_name_link = ?",
+            (horse_name_link,)).fetchone()
+        if row is None or row[0] is None:
+            self.stats['misses'] += 1
+            return None
+        past_results, fetched_on, last_run_on = row
+        if not self._is_fresh(fetched_on, last_run_on, race_date):
+            self.stats['stale'] += 1
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return json.loads(past_results)
+
+    def put(self, horse_name_link: str, past_results, fetched_on: datetime.date):
+        db = self._db()
+        db.execute(
+            "INSERT INTO horses (horse_name_link, past_results, fetched_on) VALUES (?, ?, ?)"
+            " ON CONFLICT(horse_name_link) DO UPDATE SET past_results = excluded.past_results,"
+            " fetched_on = excluded.fetched_on",
+            (horse_name_link, json.dumps(past_results, ensure_ascii=False), fetched_on.isoformat()))
+        db.commit()
+
+    def record_run(self, horse_name_link: str, race_date: datetime.date):
+        db = self._db()
+        db.execute(
+            "INSERT INTO horses (horse_name_link, last_run_on) VALUES (?, ?)"
+            " ON CONFLICT(horse_name_link) DO UPDATE SET last_run_on ="
+            " CASE WHEN last_run_on IS NULL OR last_run_on < excluded.last_run_on"
+            " THEN excluded.last_run_on ELSE last_run_on END",
+            (horse_name_link, race_date.isoformat()))
+        db.commit()
+
+    async def get_or_fetch(self, horse_name_link: str, race_date: datetime.date, fetch):
+        """保存済みの過去走を返し、無い/古い場合だけ fetch() を await する
+
+        同じ馬を複数のレースが同時に取りに来た場合は1回の fetch にまとめる。
+        """
+        cached = self.get(horse_name_link, race_date)
+        if cached is not None:
+            return cached
+        if horse_name_link in self._inflight:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self._inflight[horse_name_link])
+        task = asyncio.ensure_future(fetch())
+        self._inflight[horse_name_link] = task
+        try:
+            past_results = await task
+        finally:
+            del self._inflight[horse_name_link]
+        self.put(horse_name_link, past_results, datetime.date.today())
+        return past_results
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,154 @@
+import asyncio
+import datetime
+import json
+import os
+import time
+
+from src.utils.metrics import Metrics
+
+
+def write_json_atomic(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class JsonlSink:
+    """完成したレースを1行 JSON で output_dir/jsonl/races-YYYYMMDD.jsonl に追記する
+
+    write() はキューに積むだけで、バックグラウンドのタスクが batch_size 件か flush_interval 秒ごとに
+    まとめて書き出す（ファイルは書き込んだ日付ごとに切り替える）。fsync は fsync_interval 秒に1回。
+    キューは max_queue 件で頭打ちになり、書き込みが追いつかないと write() が待たされる。
+    write_race_json が有効なら PROJECT_LOG の「レースごとの詳細 JSON」も races/{race_id}.json に書く。
+    """
+
+    def __init__(self, output_dir: str, batch_size: int = 20, flush_interval: float = 2.0,
+                 fsync_interval: float = 30.0, max_queue: int = 100, write_race_json: bool = True,
+                 metrics: Metrics = None):
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_queue = max_queue
+        self.write_race_json = write_race_json
+        self.stats = {'records': 0, 'batches': 0, 'fsyncs': 0}
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._queue = None
+        self._task = None
+        self._file = None
+        self._file_date = None
+        self._last_fsync = time.monotonic()
+
+    @classmethod
+    def from_settings(cls, settings: dict, metrics: Metrics = None) -> "JsonlSink":
+        cfg = settings.get('output') or {}
+        return cls(
+            settings.get('output_dir', 'data'),
+            batch_size=cfg.get('batch_size', 20),
+            flush_interval=cfg.get('flush_interval', 2.0),
+            fsync_interval=cfg.get('fsync_interval', 30.0),
+            max_queue=cfg.get('max_queue', 100),
+            write_race_json=cfg.get('write_race_json', True),
+            metrics=metrics,
+        )
+
+    def jsonl_path(self, date: datetime.date) -> str:
+        return os.path.join(self.output_dir, 'jsonl', f"races-{date:%Y%m%d}.jsonl")
+
+    def race_json_path(self, race_id: str) -> str:
+        return os.path.join(self.output_dir, 'races', f"{race_id}.json")
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, race_data) -> asyncio.Future:
+        """書き出しを予約する。返り値の Future はファイルに書き出された時点で完了する"""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((race_data, future))
+        return future
+
+    async def close(self):
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        await asyncio.to_thread(self._close_file)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # --- バックグラウンド書き込み ---
+
+    async def _next_batch(self):
+        batch = []
+        item = await self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), max(0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+        return batch, item is None
+
+    async def _run(self):
+        closing = False
+        while not closing:
+            batch, closing = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                with self.metrics.span('write'):
+                    await asyncio.to_thread(self._write_batch, [race_data for race_data, _ in batch], closing)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def _open_file(self, today: datetime.date):
+        if self._file is not None and self._file_date == today:
+            return self._file
+        self._close_file()
+        path = self.jsonl_path(today)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._file_date = today
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self, records, force_fsync=False):
+        # Race などのモデルは書き込みスレッド側で辞書にする
+        records = [r.to_dict() if hasattr(r, 'to_dict') else r for r in records]
+        f = self._open_file(datetime.date.today())
+        f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        f.flush()
+        if force_fsync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            os.fsync(f.fileno())
+            self._last_fsync = time.monotonic()
+            self.stats['fsyncs'] += 1
+        if self.write_race_json:
+            for record in records:
+                if record.get('race_id'):
+                    write_json_atomic(self.race_json_path(record['race_id']), record)
+        self.stats['records'] += len(records)
+        self.stats['batches'] += 1
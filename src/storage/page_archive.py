@@ -0,0 +1,442 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.storage.page_cache import DEFAULT_TTL, classify_url
+
+# 取得した HTML をそのまま残す追記専用のアーカイブ（セレクタがずれたときに全履歴をパースし直すため）
+#
+# segment-NNNNNN.pack: レコードを追記するだけのファイル。1レコードは
+#   RECORD ヘッダー + URL（UTF-8）+ zlib 圧縮した本文
+# index-NNNNNN.npy: INDEX_DTYPE の配列を (url_hash, fetched_at) の順に並べた索引の断片（LSM の run）。
+#   flush() は新しく追記した分だけを新しい run として書き、新しい run が1つ前の run の 1/merge_factor 以上に
+#   なったら2つを併合する（run の数は O(log n)、索引を書くバイト数は全体で O(n log n)）。mmap で開き、二分探索で引く
+# index.json: 使っている run の一覧と、索引に反映済みの各セグメントのバイト数（それより後ろは開くときに読み直す）
+
+RECORD = struct.Struct('<4sBBHQIIId')  # magic, version, page_type, url_len, race_id, length, raw_length, crc32, fetched_at
+MAGIC = b'KBPA'
+VERSION = 1
+
+INDEX_DTYPE = np.dtype([
+    ('url_hash', '<u8'),
+    ('fetched_at', '<f8'),
+    ('race_id', '<u8'),      # 12 桁の race_id（無ければ 0）
+    ('digest', '<u8'),       # 本文のハッシュ（同じ内容の再保存を省く）
+    ('offset', '<u8'),       # レコードの先頭
+    ('length', '<u4'),       # 圧縮後の本文の長さ
+    ('segment', '<u4'),
+    ('page_type', 'u1'),     # PAGE_TYPES の添字 + 1（不明は 0）
+])
+
+PAGE_TYPES = tuple(DEFAULT_TTL)
+_SEGMENT_NAME = re.compile(r'^segment-(\d{6})\.pack$')
+_RUN_NAME = re.compile(r'^index-(\d{6})\.npy$')
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def url_hash(url: str) -> int:
+    return _hash64(url.encode('utf-8'))
+
+
+def page_type_code(page_type) -> int:
+    return PAGE_TYPES.index(page_type) + 1 if page_type in PAGE_TYPES else 0
+
+
+def page_type_name(code: int):
+    return PAGE_TYPES[code - 1] if code else None
+
+
+@dataclass(slots=True)
+class ArchivedPage:
+    url: str
+    page_type: str
+    race_id: str
+    fetched_at: float
+    html: str
+
+
+class PageArchive:
+    """取得したページを圧縮して大きなセグメントファイルに追記するアーカイブ
+
+    同じ URL の取り直しは内容が変わったときだけ新しい版として追記する（古い版も残る）。
+    get() は索引（mmap した整列済みの run）の二分探索で O(log n)、raw() は mmap の切り出しで
+    圧縮された本文をコピーせずに返す。scan() はセグメントを先頭から順に読む。
+    書き込みは1プロセスから行い、索引は flush()（index_every 件ごとと close 時）で書き出す。
+    append() は圧縮・書き込み・fsync をするので、イベントループからは asyncio.to_thread で呼ぶ（内部でロックする）。
+    """
+
+    def __init__(self, path: str, segment_bytes: int = 1 << 30, compress_level: int = 6, index_every: int = 1000,
+                 readonly: bool = False, merge_factor: int = 2):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.compress_level = compress_level
+        self.index_every = index_every
+        self.readonly = readonly
+        self.merge_factor = merge_factor
+        self.stats = {'appended': 0, 'duplicates': 0, 'recovered': 0, 'runs_written': 0, 'runs_merged': 0}
+        self._runs = []          # (run 名, mmap した配列)。古い順
+        self._run_keys = {}      # run 名 → url_hash の列（連続した配列。searchsorted が毎回コピーしないように）
+        self._lock = threading.RLock()
+        self._pending = []       # 索引にまだ入っていない行（タプル）
+        self._pending_by_hash = {}
+        self._covered = {}       # セグメント名 → 索引に反映済みのバイト数
+        self._maps = {}          # セグメント番号 → (mmap, 大きさ)
+        self._writer = None
+        self._writer_segment = None
+        self._opened = False
+
+    @classmethod
+    def from_settings(cls, settings: dict, readonly: bool = False):
+        cfg = settings.get('archive') or {}
+        if not cfg.get('enabled', True):
+            return None
+        path = cfg.get('dir') or os.path.join(settings.get('output_dir', 'data'), 'archive')
+        return cls(path, segment_bytes=cfg.get('segment_bytes', 1 << 30), compress_level=cfg.get('compress_level', 6),
+                   index_every=cfg.get('index_every', 1000), readonly=readonly)
+
+    # --- 開く・閉じる ---
+
+    def _open(self):
+        with self._lock:
+            if self._opened:
+                return
+            self._opened = True
+            if not self.readonly:
+                os.makedirs(self.path, exist_ok=True)
+            meta_path = os.path.join(self.path, 'index.json')
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                # index.json に載っていない run（併合や書き出しの途中で落ちた分）は使わない
+                names = meta.get('runs', ['index.npy'] if os.path.exists(os.path.join(self.path, 'index.npy')) else [])
+                self._runs = [self._load_run(name) for name in names]
+                self._covered = meta['segments']
+            # 索引を書いた後に追記された分（や索引が無い場合は全部）を読み直す
+            for number in self._segment_numbers():
+                name = self._segment_name(number)
+                for row in self._scan_records(number, self._covered.get(name, 0), recover=not self.readonly):
+                    self._add_pending(row)
+                    self.stats['recovered'] += 1
+
+    def _load_run(self, name: str):
+        rows = np.load(os.path.join(self.path, name), mmap_mode='r')
+        # 構造化配列の列は飛び飛びなので、引くための列だけ連続した配列で持つ（1ページ 8 バイト）
+        self._run_keys[name] = np.ascontiguousarray(rows['url_hash'])
+        return name, rows
+
+    def _next_run_name(self) -> str:
+        numbers = [int(m.group(1)) for m in map(_RUN_NAME.match, os.listdir(self.path)) if m]
+        return f"index-{max(numbers, default=0) + 1:06d}.npy"
+
+    def _write_run(self, rows: np.ndarray) -> str:
+        name = self._next_run_name()
+        path = os.path.join(self.path, name)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self.stats['runs_written'] += 1
+        return name
+
+    def _write_meta(self, covered: dict):
+        meta_path = os.path.join(self.path, 'index.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'runs': [name for name, _ in self._runs], 'segments': covered,
+                       'pages': sum(len(rows) for _, rows in self._runs)}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _merge_runs(self):
+        """新しい run が1つ前の run の 1/merge_factor 以上の大きさなら併合する（繰り返す）"""
+        while len(self._runs) > 1 and len(self._runs[-1][1]) * self.merge_factor >= len(self._runs[-2][1]):
+            (older_name, older), (newer_name, newer) = self._runs[-2:]
+            merged = np.concatenate([np.asarray(older), np.asarray(newer)])
+            merged = merged[np.lexsort((merged['fetched_at'], merged['url_hash']))]
+            name = self._write_run(merged)
+            self._runs[-2:] = [self._load_run(name)]
+            self._write_meta(self._covered)
+            for old in (older_name, newer_name):
+                del self._run_keys[old]
+                os.remove(os.path.join(self.path, old))
+            self.stats['runs_merged'] += 1
+
+    def flush(self):
+        """未反映の行を新しい run として書き出し、index.json を置き換える（必要なら run を併合する）"""
+        with self._lock:
+            self._open()
+            if self.readonly or not self._pending:
+                return
+            if self._writer is not None:
+                self._writer.flush()
+                os.fsync(self._writer.fileno())
+            rows = np.array(self._pending, dtype=INDEX_DTYPE)
+            rows = rows[np.lexsort((rows['fetched_at'], rows['url_hash']))]
+            name = self._write_run(rows)
+            self._runs.append(self._load_run(name))
+            # run を先に書いてから index.json を置き換える（index.json が古くてもセグメントの読み直しで補える）
+            self._covered = {self._segment_name(n): self._segment_size(n) for n in self._segment_numbers()}
+            self._write_meta(self._covered)
+            self._pending = []
+            self._pending_by_hash = {}
+            self._merge_runs()
+
+    def close(self):
+        with self._lock:
+            if self._opened:
+                self.flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for mm, _ in self._maps.values():
+                mm.close()
+            self._maps = {}
+            self._runs = []
+            self._run_keys = {}
+            self._opened = False
+
+    def __enter__(self):
+        self._open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- セグメント ---
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"segment-{number:06d}.pack"
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.path, self._segment_name(number))
+
+    def _segment_numbers(self) -> list:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT_NAME.match, os.listdir(self.path)) if m)
+
+    def _segment_size(self, number: int) -> int:
+        return os.path.getsize(self._segment_path(number))
+
+    def _map(self, number: int, end: int):
+        """end バイト目まで読める mmap（追記で伸びていれば張り直す）"""
+        mapped = self._maps.get(number)
+        if mapped is None or mapped[1] < end:
+            if mapped is not None:
+                mapped[0].close()
+            if self._writer is not None and self._writer_segment == number:
+                self._writer.flush()
+            size = self._segment_size(number)
+            with open(self._segment_path(number), 'rb') as f:
+                mapped = (mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ), size)
+            self._maps[number] = mapped
+        return mapped[0]
+
+    def _scan_records(self, number: int, start: int = 0, recover: bool = False):
+        """セグメントの start 以降のレコードを索引の行として返す。途中で壊れていればそこで止める"""
+        size = self._segment_size(number)
+        if start >= size:
+            return
+        mm = self._map(number, size)
+        offset = start
+        while offset + RECORD.size <= size:
+            magic, version, page_type, url_len, race_id, length, raw_length, crc, fetched_at = \
+                RECORD.unpack_from(mm, offset)
+            body_start = offset + RECORD.size + url_len
+            if magic != MAGIC or body_start + length > size:
+                break
+            url = bytes(mm[offset + RECORD.size:body_start])
+            # digest は展開後の本文のハッシュなので、読み直すときだけ展開する
+            body = zlib.decompress(mm[body_start:body_start + length])
+            yield (_hash64(url), fetched_at, race_id, _hash64(body), offset, length, number, page_type)
+            offset = body_start + length
+        if offset < size and recover:
+            # 書きかけで落ちたレコードは捨てる（以降の追記がずれないように）
+            with open(self._segment_path(number), 'r+b') as f:
+                f.truncate(offset)
+            self._maps.pop(number)[0].close()
+
+    def _writer_for(self, needed: int):
+        if self._writer is not None and self._writer.tell() + needed > self.segment_bytes and self._writer.tell() > 0:
+            self._writer.close()
+            self._writer = None
+            self._writer_segment += 1
+        if self._writer is None:
+            if self._writer_segment is None:
+                numbers = self._segment_numbers()
+                self._writer_segment = numbers[-1] if numbers else 1
+            self._writer = open(self._segment_path(self._writer_segment), 'ab')
+        return self._writer
+
+    # --- 書き込み ---
+
+    def _add_pending(self, row):
+        self._pending.append(row)
+        self._pending_by_hash.setdefault(row[0], []).append(row)
+
+    def append(self, url: str, html: str, page_type: str = None, race_id: str = None,
+               fetched_at: float = None) -> bool:
+        """ページを追記する。前の版と同じ内容なら何もせず False"""
+        if self.readonly:
+            raise ValueError("archive is opened read-only")
+        with self._lock:
+            return self._append(url, html, page_type, race_id, fetched_at)
+
+    def _append(self, url, html, page_type, race_id, fetched_at) -> bool:
+        self._open()
+        guessed_type, guessed_race_id = classify_url(url)
+        page_type = page_type or guessed_type
+        race_id = race_id or guessed_race_id
+        body = html.encode('utf-8')
+        digest = _hash64(body)
+        latest = self._latest_row(url)
+        if latest is not None and int(latest['digest']) == digest:
+            self.stats['duplicates'] += 1
+            return False
+
+        url_bytes = url.encode('utf-8')
+        compressed = zlib.compress(body, self.compress_level)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        race_code = int(race_id) if race_id and str(race_id).isdigit() else 0
+        header = RECORD.pack(MAGIC, VERSION, page_type_code(page_type), len(url_bytes), race_code, len(compressed),
+                             len(body), zlib.crc32(body), fetched_at)
+        writer = self._writer_for(len(header) + len(url_bytes) + len(compressed))
+        offset = writer.tell()
+        writer.write(header + url_bytes + compressed)
+        self._add_pending((_hash64(url_bytes), fetched_at, race_code, digest, offset, len(compressed),
+                           self._writer_segment, page_type_code(page_type)))
+        self.stats['appended'] += 1
+        if len(self._pending) >= self.index_every:
+            self.flush()
+        return True
+
+    def import_page_cache(self, page_cache) -> int:
+        """PageCache に残っているページを取り込む（同じ内容の版があれば飛ばす）"""
+        return sum(self.append(url, html) for url, html in page_cache.iter_pages())
+
+    # --- 読み出し ---
+
+    def _rows(self, url: str) -> np.ndarray:
+        """url の全版（古い順）"""
+        self._open()
+        key = np.uint64(url_hash(url))  # Python の int のままだと searchsorted が配列ごと型変換する
+        with self._lock:
+            parts = []
+            for name, run in self._runs:
+                keys = self._run_keys[name]
+                lo = np.searchsorted(keys, key, side='left')
+                hi = np.searchsorted(keys, key, side='right')
+                if hi > lo:
+                    parts.append(np.asarray(run[lo:hi]))
+            pending = self._pending_by_hash.get(int(key))
+            if pending:
+                parts.append(np.array(pending, dtype=INDEX_DTYPE))
+        if not parts:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        rows = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        if len(parts) > 1:
+            rows = rows[np.argsort(rows['fetched_at'], kind='stable')]
+        # 64bit ハッシュの衝突に備えて URL を確かめる
+        return rows[[self._record_url(row) == url for row in rows]] if len(rows) else rows
+
+    def _latest_row(self, url: str, at: float = None):
+        rows = self._rows(url)
+        if at is not None:
+            rows = rows[rows['fetched_at'] <= at]
+        return rows[-1] if len(rows) else None
+
+    def _record_url(self, row) -> str:
+        segment, offset = int(row['segment']), int(row['offset'])
+        mm = self._map(segment, offset + RECORD.size)
+        url_len = RECORD.unpack_from(mm, offset)[3]
+        mm = self._map(segment, offset + RECORD.size + url_len)
+        return bytes(mm[offset + RECORD.size:offset + RECORD.size + url_len]).decode('utf-8')
+
+    def _body_view(self, row) -> memoryview:
+        segment, offset, length = int(row['segment']), int(row['offset']), int(row['length'])
+        mm = self._map(segment, offset + RECORD.size)
+        url_len = RECORD.unpack_from(mm, offset)[3]
+        start = offset + RECORD.size + url_len
+        return memoryview(self._map(segment, start + length))[start:start + length]
+
+    def raw(self, url: str, at: float = None):
+        """圧縮されたままの本文（mmap の memoryview。コピーしない）。無ければ None"""
+        row = self._latest_row(url, at)
+        return self._body_view(row) if row is not None else None
+
+    def get(self, url: str, at: float = None):
+        """url の最新の版（at を指定すればその時点の版）の HTML。無ければ None"""
+        view = self.raw(url, at)
+        return zlib.decompress(view).decode('utf-8') if view is not None else None
+
+    def page(self, url: str, at: float = None):
+        """url の最新の版（at を指定すればその時点の版）の ArchivedPage。無ければ None"""
+        row = self._latest_row(url, at)
+        return self.read(row) if row is not None else None
+
+    def versions(self, url: str) -> list:
+        """url の各版の取得時刻（古い順）"""
+        return [float(t) for t in self._rows(url)['fetched_at']]
+
+    def entries(self, page_types=None, race_ids=None, latest_only: bool = True) -> np.ndarray:
+        """条件に合う索引の行（page_types / race_ids で絞る）。latest_only なら URL ごとに最新の版だけ"""
+        self._open()
+        with self._lock:
+            parts = [np.asarray(run) for _, run in self._runs]
+            pending = bool(self._pending)
+            if pending:
+                parts.append(np.array(self._pending, dtype=INDEX_DTYPE))
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=INDEX_DTYPE)
+        # run はそれぞれ並んでいるが、索引に書く前の分は追記順のまま（URL ごとにまとまっていない）
+        if len(parts) > 1 or pending:
+            rows = rows[np.lexsort((rows['fetched_at'], rows['url_hash']))]
+        if latest_only and len(rows):
+            last = np.append(rows['url_hash'][1:] != rows['url_hash'][:-1], True)
+            rows = rows[last]
+        if page_types is not None:
+            rows = rows[np.isin(rows['page_type'], [page_type_code(t) for t in page_types])]
+        if race_ids is not None:
+            rows = rows[np.isin(rows['race_id'], [int(r) for r in race_ids])]
+        return rows
+
+    def read(self, row) -> ArchivedPage:
+        segment, offset = int(row['segment']), int(row['offset'])
+        mm = self._map(segment, offset + RECORD.size)
+        _, _, page_type, url_len, race_id, length, _, _, fetched_at = RECORD.unpack_from(mm, offset)
+        start = offset + RECORD.size
+        mm = self._map(segment, start + url_len + length)
+        url = bytes(mm[start:start + url_len]).decode('utf-8')
+        html = zlib.decompress(mm[start + url_len:start + url_len + length]).decode('utf-8')
+        return ArchivedPage(url, page_type_name(page_type), str(race_id) if race_id else None, fetched_at, html)
+
+    def scan(self, page_types=None, race_ids=None, latest_only: bool = True):
+        """条件に合うページをセグメント・オフセット順（ディスク上の並び）に返す"""
+        rows = self.entries(page_types, race_ids, latest_only)
+        for row in rows[np.lexsort((rows['offset'], rows['segment']))]:
+            yield self.read(row)
+
+    def summary(self) -> dict:
+        self._open()
+        stored = sum(self._segment_size(n) for n in self._segment_numbers())
+        entries = self.entries(latest_only=False)
+        return {
+            'pages': len(entries),
+            'urls': len(np.unique(entries['url_hash'])),
+            'segments': len(self._segment_numbers()),
+            'index_runs': len(self._runs),
+            'stored_bytes': stored,
+            'by_page_type': {page_type_name(int(code)) or 'other': int(count)
+                             for code, count in zip(*np.unique(entries['page_type'], return_counts=True))},
+        }
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlparse
+
+# ページ種別ごとの既定 TTL（秒）。None は期限なし
+DEFAULT_TTL = {
+    'syutuba': 30 * 60,
+    'cyokyo': 6 * 60 * 60,
+    'kettou': 7 * 24 * 60 * 60,
+    'danwa': 6 * 60 * 60,
+    'syoin': 6 * 60 * 60,
+    'seiseki': None,  # 確定した成績は変わらない
+    'horse': 24 * 60 * 60,
+}
+
+RACE_ID_PATTERN = re.compile(r'^\d{12}$')
+
+
+def classify_url(url: str):
+    """URL から (page_type, race_id) を推定する。判別できない場合は (None, None)"""
+    segments = [s for s in urlparse(url).path.split('/') if s]
+    if len(segments) >= 3 and segments[0] == 'db' and segments[1] == 'uma':
+        return 'horse', None
+    if len(segments) >= 3 and segments[0] in ('cyuou', 'chihou'):
+        page_type = segments[1]
+        race_id = segments[-1] if RACE_ID_PATTERN.match(segments[-1]) else None
+        if page_type in DEFAULT_TTL:
+            return page_type, race_id
+    return None, None
+
+
+class PageCache:
+    """取得済み HTML のディスクキャッシュ
+
+    本文は内容の SHA-256 をキーに zlib 圧縮して blobs/ 以下に置き（同じ内容は1つにまとまる）、
+    URL → 本文の対応とメタデータ（race_id, ページ種別, 期限, 最終参照時刻）は SQLite の索引に持つ。
+    合計サイズが max_bytes を超えたら最終参照が古いものから削除する。
+    発走時刻（set_post_times）が分かっているレースの出馬表は、TTL 内でも発走時刻を越えては使わない。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, ttl: dict = None,
+                 compress_level: int = 6):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.compress_level = compress_level
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self.post_times = {}  # race_id → 発走時刻（UNIX 時刻）
+        self._conn = None
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        cfg = settings.get('cache') or {}
+        if not cfg.get('enabled', True):
+            return None
+        cache_dir = cfg.get('dir') or os.path.join(settings.get('output_dir', 'data'), 'cache')
+        return cls(cache_dir, max_bytes=cfg.get('max_bytes', 512 * 1024 * 1024), ttl=cfg.get('ttl'))
+
+    # --- 内部 ---
+
+    def _db(self):
+        # 初回アクセス時にディレクトリと索引を作る（生成しただけでは何も書かない）
+        if self._conn is None:
+            os.makedirs(os.path.join(self.cache_dir, 'blobs'), exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite3'))
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " url TEXT PRIMARY KEY, blob TEXT NOT NULL, race_id TEXT, page_type TEXT,"
+                " fetched_at REAL NOT NULL, expires_at REAL, last_access REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_race_id ON entries(race_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def _expires_at(self, page_type, race_id, now: float):
+        ttl = self.ttl.get(page_type)
+        if ttl is None:
+            return None
+        post_time = self.post_times.get(race_id) if page_type == 'syutuba' else None
+        if post_time is not None and post_time > now:
+            # 取消・乗り替わりは発走直前まで出るので、発走が TTL より近ければ発走時刻で切る
+            return now + min(ttl, post_time - now)
+        return now + ttl
+
+    def _blob_path(self, blob: str) -> str:
+        return os.path.join(self.cache_dir, 'blobs', blob[:2], blob + '.z')
+
+    def _remove_blob_if_orphan(self, blob: str):
+        (count,) = self._db().execute("SELECT COUNT(*) FROM entries WHERE blob = ?", (blob,)).fetchone()
+        if count == 0:
+            try:
+                os.remove(self._blob_path(blob))
+            except FileNotFoundError:
+                pass
+
+    def _delete(self, url: str, blob: str):
+        self._db().execute("DELETE FROM entries WHERE url = ?", (url,))
+        self._remove_blob_if_orphan(blob)
+
+    # --- 公開 API ---
+
+    def get(self, url: str):
+        db = self._db()
+        row = db.execute("SELECT blob, expires_at FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        blob, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            self._delete(url, blob)
+            db.commit()
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+        try:
+            with open(self._blob_path(blob), 'rb') as f:
+                content = zlib.decompress(f.read()).decode('utf-8')
+        except (FileNotFoundError, zlib.error):
+            self._delete(url, blob)
+            db.commit()
+            self.stats['misses'] += 1
+            return None
+        db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+        db.commit()
+        self.stats['hits'] += 1
+        return content
+
+    def put(self, url: str, content: str, page_type: str = None, race_id: str = None, expires_at: float = None):
+        guessed_type, guessed_race_id = classify_url(url)
+        page_type = page_type or guessed_type
+        race_id = race_id or guessed_race_id
+        now = time.time()
+        if expires_at is None:
+            expires_at = self._expires_at(page_type, race_id, now)
+
+        body = content.encode('utf-8')
+        blob = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(blob)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(body, self.compress_level))
+            os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        db = self._db()
+        previous = db.execute("SELECT blob FROM entries WHERE url = ?", (url,)).fetchone()
+        db.execute(
+            "INSERT OR REPLACE INTO entries (url, blob, race_id, page_type, fetched_at, expires_at, last_access, size)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, blob, race_id, page_type, now, expires_at, now, size),
+        )
+        if previous and previous[0] != blob:
+            self._remove_blob_if_orphan(previous[0])
+        # 成績ページが取れたレースは確定済みなので、そのレースの全ページを無期限にする
+        if page_type == 'seiseki' and race_id:
+            db.execute("UPDATE entries SET expires_at = NULL WHERE race_id = ?", (race_id,))
+        db.commit()
+        self.stats['stores'] += 1
+        self._evict(keep_url=url)
+
+    def set_post_times(self, post_times: dict):
+        """race_id → 発走時刻（UNIX 時刻）。以後に保存する出馬表の期限に使う"""
+        self.post_times.update({str(race_id): post for race_id, post in post_times.items()})
+
+    def invalidate(self, url: str) -> bool:
+        """url のキャッシュを捨てる（次の get は取り直しになる）"""
+        db = self._db()
+        row = db.execute("SELECT blob FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return False
+        self._delete(url, row[0])
+        db.commit()
+        return True
+
+    def iter_pages(self, page_type: str = None):
+        """保存されている (url, 本文) を期限に関係なく順に返す（記録したページの再生用）"""
+        query = "SELECT url, blob FROM entries"
+        params = ()
+        if page_type is not None:
+            query += " WHERE page_type = ?"
+            params = (page_type,)
+        for url, blob in self._db().execute(query + " ORDER BY url", params).fetchall():
+            try:
+                with open(self._blob_path(blob), 'rb') as f:
+                    yield url, zlib.decompress(f.read()).decode('utf-8')
+            except (FileNotFoundError, zlib.error):
+                continue
+
+    def mark_race_finished(self, race_id: str):
+        db = self._db()
+        db.execute("UPDATE entries SET expires_at = NULL WHERE race_id = ?", (race_id,))
+        db.commit()
+
+    def total_bytes(self) -> int:
+        (total,) = self._db().execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)").fetchone()
+        return total
+
+    def _evict(self, keep_url: str = None):
+        db = self._db()
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for url, blob in db.execute("SELECT url, blob FROM entries ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            if url == keep_url:
+                continue
+            size = os.path.getsize(self._blob_path(blob)) if os.path.exists(self._blob_path(blob)) else 0
+            db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            (count,) = db.execute("SELECT COUNT(*) FROM entries WHERE blob = ?", (blob,)).fetchone()
+            if count == 0:
+                self._remove_blob_if_orphan(blob)
+                total -= size
+            self.stats['evictions'] += 1
+        db.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
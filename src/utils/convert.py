@@ -0,0 +1,92 @@
+import datetime
+import re
+
+# 調教タイムの列（右から 1F, 3F, 4F, 5F, 6F）。先頭の空欄はパーサーが落とすので右詰めで対応付ける
+TRAINING_FURLONGS = ('6f', '5f', '4f', '3f', '1f')
+
+_INT_PATTERN = re.compile(r'\d+')
+_DISTANCE_PATTERN = re.compile(r'(\d+)\s*m')
+_TIME_PATTERN = re.compile(r'^(?:(\d+):)?(\d+(?:\.\d+)?)$')
+_RACE_DATE_PATTERN = re.compile(r'(\d{4})年(\d{1,2})月(\d{1,2})日')
+_POSITION_PATTERN = re.compile(r'^[［\[](\d+)[］\]]$')
+
+
+def to_int(text):
+    """文字列中の最初の整数（全角数字も可）。無ければ None"""
+    if text is None:
+        return None
+    m = _INT_PATTERN.search(str(text))
+    return int(m.group()) if m else None
+
+
+def to_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def distance_m(text):
+    """"1150m" / "1150m (ダート・右)" / "ダート1700m" → 1150 / 1700"""
+    m = _DISTANCE_PATTERN.search(text or '')
+    return int(m.group(1)) if m else None
+
+
+def surface(text):
+    """"1150m (ダート・右) 曇・良" → "ダート"（芝・ダート・障害のいずれか）"""
+    for name in ('障害', 'ダート', '芝'):
+        if name in (text or ''):
+            return name
+    return None
+
+
+def time_seconds(text):
+    """"1:35.0" → 95.0, "11.9" → 11.9"""
+    m = _TIME_PATTERN.match((text or '').strip())
+    if not m:
+        return None
+    minutes, seconds = m.groups()
+    return int(minutes or 0) * 60 + float(seconds)
+
+
+def race_date(text):
+    """"2025年11月9日 3回福島2日目" → date(2025, 11, 9)"""
+    m = _RACE_DATE_PATTERN.search(text or '')
+    return datetime.date(*map(int, m.groups())) if m else None
+
+
+def slash_date(text):
+    """"2025/10/20" → date(2025, 10, 20)"""
+    try:
+        return datetime.datetime.strptime((text or '').strip(), '%Y/%m/%d').date()
+    except ValueError:
+        return None
+
+
+def horse_id(horse_name_link):
+    """"/db/uma/0945958" → "0945958\""""
+    if not horse_name_link:
+        return None
+    return horse_name_link.rstrip('/').rsplit('/', 1)[-1] or None
+
+
+def split_date_location(text):
+    """"8/6\xa0美Ｗ\xa0良" → ("8/6", "美Ｗ", "良")"""
+    parts = (text or '').split()
+    parts += [None] * (3 - len(parts))
+    return parts[0], parts[1], parts[2]
+
+
+def training_times(cells):
+    """パーサーの times（例: ['67.0', '52.3', '37.9', '11.7', '［６］']）を
+    ({'6f': None, '5f': 67.0, ..., '1f': 11.7}, 6) にする"""
+    cells = list(cells or [])
+    position = None
+    if cells:
+        m = _POSITION_PATTERN.match(cells[-1])
+        if m:
+            position = int(m.group(1))
+            cells = cells[:-1]
+    values = [to_float(c) for c in cells][-len(TRAINING_FURLONGS):]
+    padded = [None] * (len(TRAINING_FURLONGS) - len(values)) + values
+    return dict(zip(TRAINING_FURLONGS, padded)), position
@@ -1,12 +1,53 @@
+import json
 import logging
 import sys
 
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s - %(message)s"
+# extra={...} で渡すと JSON ログの項目になるもの
+STRUCTURED_FIELDS = ('race_id', 'page_type', 'url', 'stage', 'job', 'elapsed', 'requests')
+
+_loggers = []
+_formatter = logging.Formatter(TEXT_FORMAT)
+_level = logging.INFO
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行の JSON（time, level, logger, message と STRUCTURED_FIELDS のうち渡されたもの）"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
 def get_logger(name: str = __name__):
     logger = logging.getLogger(name)
     if not logger.handlers:
         handler = logging.StreamHandler(sys.stdout)
-        fmt = logging.Formatter("%(asctime)s %(levelname)s %(name)s - %(message)s")
-        handler.setFormatter(fmt)
+        handler.setFormatter(_formatter)
         logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+        logger.setLevel(_level)
+        _loggers.append(logger)
     return logger
+
+
+def configure_logging(settings: dict):
+    """settings の logging（format: text / json, level）を作成済みのロガーにも反映する"""
+    global _formatter, _level
+    cfg = settings.get('logging') or {}
+    _formatter = JsonFormatter() if cfg.get('format') == 'json' else logging.Formatter(TEXT_FORMAT)
+    _level = logging.getLevelName(str(cfg.get('level', 'INFO')).upper())
+    for logger in _loggers:
+        logger.setLevel(_level)
+        for handler in logger.handlers:
+            handler.setFormatter(_formatter)
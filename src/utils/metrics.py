@@ -0,0 +1,219 @@
+import bisect
+import datetime
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 秒単位の既定バケット境界（Prometheus の既定値に近いもの）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 段階ごとの所要時間用（パースは数ミリ秒で終わるので細かく取る）
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025) + DEFAULT_BUCKETS
+
+# Prometheus に出す指標の説明（名前 → HELP）
+METRIC_HELP = {
+    'stage_seconds': 'Time spent per pipeline stage',
+    'pages_total': 'Pages obtained, by page type and source',
+    'page_bytes_total': 'Page content size in bytes',
+    'cache_hits_total': 'Pages served from the page cache',
+    'unchanged_pages_total': 'Pages whose content hash matched the previous run',
+    'page_retries_total': 'Pages fetched again after the first attempt',
+    'page_escalations_total': 'Pages fetched again with Playwright after the HTTP response needed JS or failed',
+    'page_errors_total': 'Pages that could not be fetched or parsed',
+    'pages_without_data_total': 'Pages that loaded without their data table (treated as empty)',
+    'retry_budget_exhausted_total': 'Retryable failures given up because the retry budget ran out',
+    'circuit_open_total': 'Times a host circuit breaker opened',
+    'concurrency_limit': 'Current adaptive request concurrency limit',
+}
+
+
+class Histogram:
+    """累積しない固定バケットのヒストグラム（最後のバケットは +Inf）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """バケット上限で近似した分位点"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'buckets': {str(b): c for b, c in zip(self.buckets, self.counts)},
+            'overflow': self.counts[-1],
+        }
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, 'other' if v is None else str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class Metrics:
+    """1回の実行の計測値（段階ごとの所要時間のヒストグラムと、ページ種別ごとのカウンタ）
+
+    段階は span('parse', page_type='cyokyo') のように測り、stage_seconds{stage=...} にまとめる。
+    書き込みスレッドからも記録するのでロックで守る。export_dir があれば export() で
+    Prometheus のテキスト形式（textfile collector 用の metrics.prom）と実行ごとの JSON 要約を書く。
+    """
+
+    def __init__(self, export_dir: str = None, prefix: str = 'keibabook', buckets=STAGE_BUCKETS):
+        self.export_dir = export_dir
+        self.prefix = prefix
+        self.buckets = buckets
+        self.started = time.time()
+        self.histograms = {}  # (名前, ラベル) → Histogram
+        self.counters = {}    # (名前, ラベル) → 値
+        self.gauges = {}      # (名前, ラベル) → 最新の値
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "Metrics":
+        cfg = settings.get('metrics') or {}
+        export_dir = None
+        if cfg.get('enabled', True):
+            export_dir = cfg.get('dir') or os.path.join(settings.get('output_dir', 'data'), 'metrics')
+        return cls(export_dir, prefix=cfg.get('prefix', 'keibabook'))
+
+    def observe(self, stage: str, seconds: float, **labels):
+        key = ('stage_seconds', _label_key(dict(labels, stage=stage)))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """with ブロックの所要時間を stage に記録する（await を含んでもよい。例外でも記録する）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, _label_key(labels)), 0)
+
+    def stage(self, stage: str, **labels) -> Histogram:
+        return self.histograms.get(('stage_seconds', _label_key(dict(labels, stage=stage))))
+
+    # --- 出力 ---
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+        for name, items in itertools.groupby(histograms, key=lambda item: item[0][0]):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (_, labels), h in items:
+                # Histogram は累積しないので le ごとに足し上げる
+                for bound, cumulative in zip(h.buckets, itertools.accumulate(h.counts)):
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum!r}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        for name, items in itertools.groupby(counters, key=lambda item: item[0][0]):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            for (_, labels), value in items:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        for name, items in itertools.groupby(gauges, key=lambda item: item[0][0]):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} gauge")
+            for (_, labels), value in items:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> dict:
+        """実行の要約。stages は合計時間の長い順（遅い段階が先頭に来る）"""
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+        stages = [{
+            **dict(labels), 'count': h.count, 'sum': round(h.sum, 6), 'mean': round(h.sum / h.count, 6),
+            'p50': h.quantile(0.5), 'p95': h.quantile(0.95), 'max': round(h.max, 6),
+        } for (_, labels), h in histograms if h.count]
+        stages.sort(key=lambda s: s['sum'], reverse=True)
+        return {
+            'started': datetime.datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+            'stages': stages,
+            'counters': [{'name': name, **dict(labels), 'value': value} for (name, labels), value in sorted(counters)],
+            'gauges': [{'name': name, **dict(labels), 'value': value} for (name, labels), value in sorted(gauges)],
+        }
+
+    def export_prometheus(self) -> str:
+        """export_dir/metrics.prom を置き換える（読み手が書きかけを見ないように rename で）"""
+        if self.export_dir is None:
+            return None
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = os.path.join(self.export_dir, 'metrics.prom')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(path + '.tmp', path)
+        return path
+
+    def export(self, run_name: str = 'run'):
+        """metrics.prom と run-{run_name}-{開始時刻}.json を書き、両方のパスを返す（無効なら None）"""
+        if self.export_dir is None:
+            return None
+        prom_path = self.export_prometheus()
+        json_path = os.path.join(
+            self.export_dir, f"run-{run_name}-{datetime.datetime.fromtimestamp(self.started):%Y%m%d-%H%M%S}.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return prom_path, json_path
@@ -0,0 +1,74 @@
+import re
+
+# 競馬ブックの中央競馬レース ID は 年(4) + 回(2) + 場(2) + 日目(2) + R(2)
+# 例: 202503060201 = 2025年 3回 福島(06) 2日目 1R
+RACE_ID_PATTERN = re.compile(r'^(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})$')
+
+# 競馬場コード（settings の venue_codes で上書き・追加できる）
+VENUE_CODES = {
+    '京都': '00',
+    '阪神': '01',
+    '中京': '02',
+    '小倉': '03',
+    '東京': '04',
+    '中山': '05',
+    '福島': '06',
+    '新潟': '07',
+    '札幌': '08',
+    '函館': '09',
+}
+
+
+def venue_code(venue, venue_codes=None) -> str:
+    codes = dict(VENUE_CODES)
+    codes.update(venue_codes or {})
+    venue = str(venue)
+    if venue in codes:
+        return codes[venue]
+    if venue.isdigit() and len(venue) <= 2:
+        return venue.zfill(2)
+    raise ValueError(f"unknown venue: {venue!r}")
+
+
+def make_race_id(year, kai, venue, day, race, venue_codes=None) -> str:
+    return f"{int(year):04d}{int(kai):02d}{venue_code(venue, venue_codes)}{int(day):02d}{int(race):02d}"
+
+
+def parse_race_id(race_id: str) -> dict:
+    m = RACE_ID_PATTERN.match(str(race_id))
+    if not m:
+        raise ValueError(f"invalid race_id: {race_id!r}")
+    year, kai, venue, day, race = m.groups()
+    return {'year': int(year), 'kai': int(kai), 'venue_code': venue, 'day': int(day), 'race': int(race)}
+
+
+def parse_range(spec) -> list:
+    """"1-12" や "1,3,5-7" を整数のリストにする（int をそのまま渡してもよい）"""
+    if isinstance(spec, int):
+        return [spec]
+    numbers = []
+    for part in str(spec).split(','):
+        if '-' in part:
+            start, end = part.split('-', 1)
+            numbers.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            numbers.append(int(part))
+    return numbers
+
+
+def expand_race_ids(year, kai, venue, days='1-8', races='1-12', venue_codes=None):
+    """開催（年・回・場）の日目と R を展開してレース ID を順に返す"""
+    for day in parse_range(days):
+        for race in parse_range(races):
+            yield make_race_id(year, kai, venue, day, race, venue_codes)
+
+
+def race_settings(settings: dict, race_id: str) -> dict:
+    """1レース分の設定（race_id と出馬表/成績 URL を差し替えたもの）"""
+    base_url = '/'.join(settings['shutuba_url'].split('/')[:4])
+    return dict(
+        settings,
+        race_id=race_id,
+        shutuba_url=f"{base_url}/syutuba/{race_id}",
+        seiseki_url=f"{base_url}/seiseki/{race_id}",
+    )
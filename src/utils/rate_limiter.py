@@ -0,0 +1,71 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """1ホスト分のトークンバケット。rate=毎秒の補充数, burst=最大保持数, min_interval=連続アクセスの最小間隔(秒)"""
+
+    def __init__(self, rate: float, burst: int = 1, min_interval: float = 0.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.min_interval = max(0.0, min_interval)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._last_acquired = None
+        # asyncio.Lock は FIFO なので、待ち順 = 発行順が保証される
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait_time(self, now: float) -> float:
+        wait = 0.0
+        if self._tokens < 1:
+            wait = (1 - self._tokens) / self.rate
+        if self._last_acquired is not None:
+            wait = max(wait, self._last_acquired + self.min_interval - now)
+        return wait
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._tokens -= 1
+                    self._last_acquired = now
+                    return
+                await asyncio.sleep(wait)
+
+
+class HostRateLimiter:
+    """ホストごとに TokenBucket を持ち、URL 単位でアクセス許可を出す"""
+
+    def __init__(self, requests_per_second: float = 1.0, burst: int = 1, min_interval: float = 0.0):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.min_interval = min_interval
+        self._buckets = {}
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "HostRateLimiter":
+        cfg = settings.get('rate_limit') or {}
+        return cls(
+            requests_per_second=cfg.get('requests_per_second', 1.0),
+            burst=cfg.get('burst', 1),
+            min_interval=cfg.get('min_interval', 0.0),
+        )
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.requests_per_second, self.burst, self.min_interval)
+        return self._buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from src.jobs.batch import BatchRunner
+from src.jobs.queue import DONE, FAILED, PENDING, RUNNING, JobQueue
+from src.models.race import Race
+from src.utils.race_id import expand_race_ids, make_race_id, parse_race_id, race_settings
+
+
+def test_race_id_round_trip():
+    assert make_race_id(2025, 3, '福島', 2, 1) == '202503060201'
+    assert parse_race_id('202503060201') == {'year': 2025, 'kai': 3, 'venue_code': '06', 'day': 2, 'race': 1}
+    ids = list(expand_race_ids(2025, 3, '06', days='1-2', races='1,11-12'))
+    assert ids == ['202503060101', '202503060111', '202503060112',
+                   '202503060201', '202503060211', '202503060212']
+    with pytest.raises(ValueError):
+        make_race_id(2025, 3, '大井', 1, 1)
+
+
+def test_race_settings_rewrites_urls():
+    settings = {'race_id': 1, 'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/202503060201'}
+    assert race_settings(settings, '202503060212')['shutuba_url'] == 'https://s.keibabook.co.jp/cyuou/syutuba/202503060212'
+
+
+def test_job_queue_resumes_after_crash(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    queue = JobQueue(path, max_attempts=2)
+    assert queue.enqueue(['202503060101', '202503060102', '202503060103']) == 3
+    assert queue.enqueue(['202503060101']) == 0
+
+    first = queue.claim()
+    queue.complete(first, 'done.json')
+    queue.claim()  # running のまま「クラッシュ」
+    queue.close()
+
+    queue = JobQueue(path, max_attempts=2)
+    assert queue.counts() == {PENDING: 2, RUNNING: 0, DONE: 1, FAILED: 0}
+    assert queue.claim() != first
+
+
+def test_job_queue_gives_up_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2)
+    queue.enqueue(['202503060101'])
+    assert queue.fail(queue.claim(), 'boom') == PENDING
+    assert queue.fail(queue.claim(), 'boom') == FAILED
+    assert queue.claim() is None
+    assert queue.retry_failed() == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_runner_skips_completed_races(tmp_path):
+    settings = {
+        'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/202503060201',
+        'output_dir': str(tmp_path),
+        'cache': {'enabled': False},
+    }
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    queue.enqueue(['202503060101', '202503060102', '202503060103'])
+    queue.complete('202503060101', 'already.json')
+
+    scraped = []
+
+    class StubScraper:
+        changes = None
+
+        def __init__(self, race_id):
+            self.race_id = race_id
+
+        async def scrape_race(self, race_id):
+            scraped.append(race_id)
+            if race_id == '202503060103':
+                raise RuntimeError("timeout")
+            return Race(race_id=race_id, race_name=race_id)
+
+    runner = BatchRunner(settings, queue, concurrency=2)
+    runner.make_scraper = StubScraper
+    counts = await runner.run()
+
+    assert '202503060101' not in scraped
+    assert counts[DONE] == 2
+    with open(runner.sink.race_json_path('202503060102'), encoding='utf-8') as f:
+        assert json.load(f)['race_id'] == '202503060102'
+    assert queue.get('202503060103')['error'] == 'RuntimeError: timeout'
+    assert runner.metrics.stage('write').count >= 1
+    assert (tmp_path / 'metrics' / 'metrics.prom').exists()
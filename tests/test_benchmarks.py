@@ -0,0 +1,33 @@
+from benchmarks.parse_bench import find_regressions
+from benchmarks.synthetic import full_card
+from src.scrapers.keibabook import KeibaBookScraper
+
+
+def test_synthetic_full_card_parses_completely():
+    card = full_card(horses=18)
+    scraper = KeibaBookScraper({'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/1', 'cache': {'enabled': False}})
+
+    race_data = scraper._parse_race_data(card['syutuba'])
+    assert len(race_data['horses']) == 18
+    assert race_data['distance'] == '1150m'
+
+    training = scraper._parse_training_data(card['cyokyo'])
+    assert len(training) == 18
+    assert all(4 <= len(t['details']) <= 6 for t in training.values())
+
+    assert len(scraper._parse_pedigree_data(card['kettou'])) == 18
+    assert len(scraper._parse_stable_comment_data(card['danwa'])) == 18
+    assert len(scraper._parse_previous_race_comment_data(card['syoin'])) == 18
+    past_results = scraper._parse_horse_past_results_data(next(iter(card['horses'].values())))
+    assert len(past_results) == 20
+
+
+def test_find_regressions_scales_by_calibration():
+    baseline = {'calibration': 1000, 'benchmarks': {'lxml/race': {'pages_per_sec': 100, 'peak_kb': 100}}}
+    # 半分の速さのマシンなら 50 pages/sec でも退行ではない
+    slow_machine = {'calibration': 500, 'benchmarks': {'lxml/race': {'pages_per_sec': 50, 'peak_kb': 100}}}
+    assert find_regressions(slow_machine, baseline, 0.25) == []
+
+    regressed = {'calibration': 1000, 'benchmarks': {'lxml/race': {'pages_per_sec': 60, 'peak_kb': 200}}}
+    messages = find_regressions(regressed, baseline, 0.25)
+    assert len(messages) == 2
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.scrapers.browser_pool import BrowserPool
+
+
+def make_factory():
+    playwright = AsyncMock()
+    browser = AsyncMock()
+    playwright.chromium.launch.return_value = browser
+    # new_context を呼ぶたびに別の context / page を返す
+    browser.new_context.side_effect = lambda: AsyncMock(new_page=AsyncMock(return_value=MagicMock()))
+    factory = MagicMock()
+    factory.return_value.start = AsyncMock(return_value=playwright)
+    return factory, playwright, browser
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_launches_once_and_reuses_pages():
+    factory, playwright, browser = make_factory()
+    async with BrowserPool(size=1, playwright_factory=factory) as pool:
+        async with pool.page() as first:
+            pass
+        async with pool.page() as second:
+            pass
+        assert first is second
+    playwright.chromium.launch.assert_called_once()
+    browser.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_recycles_context_after_max_uses():
+    factory, _, browser = make_factory()
+    pool = BrowserPool(size=1, max_uses_per_context=2, playwright_factory=factory)
+    pages = []
+    for _ in range(3):
+        async with pool.page() as page:
+            pages.append(page)
+    assert pages[0] is pages[1]
+    assert pages[2] is not pages[0]
+    stats = pool.stats()
+    assert stats['contexts_created'] == 2
+    assert stats['contexts_recycled'] == 1
+    assert stats['acquisitions'] == 3
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_stats_report_utilisation():
+    factory, _, _ = make_factory()
+    pool = BrowserPool(size=2, playwright_factory=factory)
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.page():
+            await release.wait()
+
+    tasks = [asyncio.create_task(hold()) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    stats = pool.stats()
+    assert stats['in_use'] == 2
+    assert stats['utilisation'] == 1.0
+    assert stats['waiting'] == 1
+    release.set()
+    await asyncio.gather(*tasks)
+    assert pool.stats()['in_use'] == 0
+    await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_slot_survives_failed_open():
+    factory, _, browser = make_factory()
+    broken = AsyncMock(new_page=AsyncMock(side_effect=RuntimeError("page crashed")))
+    healthy = AsyncMock(new_page=AsyncMock(return_value=MagicMock()))
+    browser.new_context.side_effect = [broken, healthy]
+    pool = BrowserPool(size=1, max_uses_per_context=1, playwright_factory=factory)
+    with pytest.raises(RuntimeError):
+        async with pool.page():
+            pass
+    # 作りかけの context は閉じ、スロットは次の貸し出しで作り直す
+    broken.close.assert_called_once()
+    async with pool.page() as page:
+        assert page is healthy.new_page.return_value
+    assert pool.stats()['in_use'] == 0
+    await pool.stop()
@@ -0,0 +1,134 @@
+import random
+from contextlib import asynccontextmanager
+
+import pytest
+
+from benchmarks.synthetic import comment_block, full_card, page_chrome
+from src.models.race import Race
+from src.scrapers.keibabook import PARSE_REGIONS, KeibaBookScraper
+from src.storage.change_tracker import ChangeTracker, content_hash, diff_races
+from tests.test_exporter import RACE
+
+RACE_ID = '202503060201'
+
+
+class NullBrowserPool:
+    @asynccontextmanager
+    async def page(self, page_type=None):
+        yield None
+
+
+def offline_scraper(pages, tracker):
+    settings = {'race_id': RACE_ID, 'shutuba_url': f'https://s.keibabook.co.jp/cyuou/syutuba/{RACE_ID}',
+                'cache': {'enabled': False}, 'http': {'enabled': False},
+                'rate_limit': {'requests_per_second': 1e9, 'burst': 1000}}
+    scraper = KeibaBookScraper(settings, browser_pool=NullBrowserPool(), change_tracker=tracker)
+
+    async def fetch(page, url):
+        return pages[url]
+    scraper._fetch_page_content = fetch
+    return scraper
+
+
+def card_pages(card):
+    scraper = offline_scraper({}, None)
+    pages = {scraper._page_url(t): card[t] for t in ('syutuba', 'cyokyo', 'kettou', 'danwa', 'syoin')}
+    pages.update({f'https://s.keibabook.co.jp{link}': html for link, html in card['horses'].items()})
+    return pages
+
+
+def test_content_hash_ignores_chrome_outside_regions():
+    body = comment_block('StableCommentTable', 3, random.Random(1))
+    regions = PARSE_REGIONS['stable_comment']
+    # 広告（乱数で変わる）が違っても同じ
+    assert content_hash(page_chrome(body, random.Random(1)), regions) == \
+        content_hash(page_chrome(body, random.Random(2)), regions)
+    changed = comment_block('StableCommentTable', 3, random.Random(3))
+    assert content_hash(page_chrome(body), regions) != content_hash(page_chrome(changed), regions)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_pages_skip_parsing_and_writing(tmp_path, monkeypatch):
+    tracker = ChangeTracker(str(tmp_path / 'pages.sqlite3'))
+    card = full_card(horses=4)
+    pages = card_pages(card)
+
+    first = offline_scraper(pages, tracker)
+    race = await first.scrape_race()
+    assert first.changes[0]['field'] == 'new_race'
+    tracker.record(race, first.changes)
+
+    second = offline_scraper(pages, tracker)
+    monkeypatch.setattr(second, '_parse_stable_comment_data', lambda html: pytest.fail("parsed unchanged page"))
+    assert await second.scrape_race() == race
+    assert second.changes == []
+
+    # 厩舎の話が1頭分だけ変わった
+    danwa_url = second._page_url('danwa')
+    pages[danwa_url] = pages[danwa_url].replace('<p class="HorseNum">2</p><p class="Comment">',
+                                                '<p class="HorseNum">2</p><p class="Comment">追い切り後も順調。')
+    third = offline_scraper(pages, tracker)
+    await third.scrape_race()
+    assert [(c['section'], c['horse_num']) for c in third.changes] == [('stable_comment', 2)]
+    assert tracker.stats['unchanged_pages'] >= 9
+
+
+@pytest.mark.asyncio
+async def test_parser_change_invalidates_stored_parse_results(tmp_path, monkeypatch):
+    tracker = ChangeTracker(str(tmp_path / 'pages.sqlite3'))
+    pages = card_pages(full_card(horses=4))
+    race = await offline_scraper(pages, tracker).scrape_race()
+
+    # HTML が同じでもパーサーの版が変われば前回の結果は使わずにパースし直す
+    monkeypatch.setattr('src.scrapers.keibabook.PARSER_VERSION', 2)
+    second = offline_scraper(pages, tracker)
+    parsed = []
+    original = second._parse_stable_comment_data
+    monkeypatch.setattr(second, '_parse_stable_comment_data', lambda html: parsed.append(1) or original(html))
+    assert await second.scrape_race() == race
+    assert parsed == [1]
+
+
+@pytest.mark.asyncio
+async def test_failed_optional_page_does_not_drop_the_race():
+    pages = card_pages(full_card(horses=4))
+    scraper = offline_scraper(pages, None)
+    del pages[scraper._page_url('syoin')]
+    del pages[next(url for url in pages if '/db/uma/' in url)]
+
+    race = await scraper.scrape_race()
+    assert len(race.runners) == 4
+    assert all(r.previous_race_comment is None for r in race.runners)
+    assert sum(1 for r in race.runners if r.past_results) == 3
+    assert scraper.metrics.counter('page_errors_total', page_type='syoin', error='KeyError') == 1
+
+
+@pytest.mark.asyncio
+async def test_scrape_entries_fetches_only_the_card(tmp_path):
+    tracker = ChangeTracker(str(tmp_path / 'pages.sqlite3'))
+    pages = card_pages(full_card(horses=4))
+    race = await offline_scraper(pages, tracker).scrape_race()
+    tracker.record(race, [{'section': 'race', 'horse_num': None, 'field': 'new_race', 'old': None, 'new': RACE_ID}])
+
+    fetched = []
+    scraper = offline_scraper(pages, tracker)
+    fetch = scraper._fetch_page_content
+
+    async def recording_fetch(page, url):
+        fetched.append(url)
+        return await fetch(page, url)
+    scraper._fetch_page_content = recording_fetch
+    # 調教・血統・コメント・馬柱は前回のレースから引き継ぐ
+    assert await scraper.scrape_entries(tracker.last_race(RACE_ID)) == race
+    assert fetched == [scraper._page_url('syutuba')]
+    assert scraper.changes == []
+
+
+def test_diff_races_reports_scratched_horses():
+    old = Race.from_scraped(RACE)
+    new = Race.from_scraped(RACE)
+    new.runners = []
+    changes = diff_races(old, new)
+
+    assert changes == [{'section': 'entry', 'horse_num': 1, 'field': 'scratched', 'old': 'セイウンレガーメ',
+                        'new': None}]
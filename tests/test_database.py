@@ -0,0 +1,54 @@
+import copy
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.storage.database import CommentRow, RaceDatabase, ResultRow, RunnerRow, TrainingRow
+from tests.test_exporter import RACE
+
+
+def count(database, model):
+    with Session(database.engine) as session:
+        return session.scalar(select(func.count()).select_from(model))
+
+
+def test_save_races_is_idempotent(tmp_path):
+    database = RaceDatabase(f"sqlite:///{tmp_path / 'keibabook.sqlite3'}", batch_size=1)
+    race = dict(RACE, surface='ダート')
+    assert database.save_races([race, race]) == 2
+    database.save_races([race])
+
+    assert count(database, RunnerRow) == 1
+    assert count(database, TrainingRow) == 2
+    assert count(database, CommentRow) == 1
+    assert count(database, ResultRow) == 1
+
+
+def test_resaving_a_race_drops_rows_that_are_gone(tmp_path):
+    database = RaceDatabase(f"sqlite:///{tmp_path / 'keibabook.sqlite3'}")
+    race = copy.deepcopy(RACE)
+    second = copy.deepcopy(race['horses'][0])
+    second.update(horse_num='2', horse_name='馬名2', horse_name_link='/db/uma/0945959', previous_race_comment='出遅れ')
+    race['horses'].append(second)
+    database.save_races([race])
+    assert (count(database, RunnerRow), count(database, TrainingRow), count(database, CommentRow)) == (2, 4, 3)
+
+    # 2番が取消になり、1番の調教が1本減った
+    changed = copy.deepcopy(RACE)
+    del changed['horses'][0]['training_data']['details'][1]
+    database.save_races([changed])
+    assert (count(database, RunnerRow), count(database, TrainingRow), count(database, CommentRow)) == (1, 1, 1)
+
+
+def test_upsert_updates_changed_rows_and_queries_by_sire(tmp_path):
+    database = RaceDatabase(f"sqlite:///{tmp_path / 'keibabook.sqlite3'}")
+    race = dict(RACE, surface='ダート')
+    database.save_races([race])
+    changed = copy.deepcopy(race)
+    changed['horses'][0]['jockey'] = '騎手2'
+    database.save_races([changed])
+
+    runs = database.runs_by_sire('ドレフォン', surface='ダート', distance_m=1150)
+    assert len(runs) == 1
+    assert runs[0]['jockey'] == '騎手2'
+    assert database.runs_by_sire('ドレフォン', surface='芝') == []
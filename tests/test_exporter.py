@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+
+from src.storage.exporter import build_tables, export_from_jsonl, load_table
+
+RACE = {
+    'race_id': '202503060201',
+    'race_name': '2025年11月9日 3回福島2日目',
+    'race_grade': '1R ２歳未勝利',
+    'distance': '1150m',
+    'horses': [{
+        'horse_num': '1', 'horse_name': 'セイウンレガーメ', 'jockey': '騎手1', 'horse_name_link': '/db/uma/0945958',
+        'training_data': {'horse_name': 'セイウンレガーメ', 'tanpyo': '直線の伸びひと息', 'details': [
+            {'date_location': '8/6\xa0美Ｗ\xa0良', '追い切り方': '一杯に追う',
+             'times': ['84.5', '68.2', '52.7', '37.8', '11.9', '［５］'], 'awase': ''},
+            {'date_location': '10/29\xa0美Ｗ\xa0良', '追い切り方': '一杯に追う',
+             'times': ['67.0', '52.3', '37.9', '11.7', '［６］'], 'awase': 'リナクィーンアスク（新馬）馬なりの内0.5秒追走同入'},
+        ]},
+        'pedigree_data': {'father': 'ドレフォン', 'mother': 'セイウンアワード', 'mothers_father': 'タニノギムレット'},
+        'stable_comment': 'まだ素質だけで走っている感じ。',
+        'previous_race_comment': '',
+        'past_results': [{'date': '2025/10/20', 'venue': '東京', 'race_num': '1', 'finish_position': '1着',
+                          'time': '1:35.0', 'jockey': 'ルメール', 'weight': '55'}],
+    }],
+}
+
+
+def test_build_tables_normalizes_and_types_columns():
+    tables = build_tables([RACE])
+
+    race = tables['races'].iloc[0]
+    assert race['venue'] == '福島'
+    assert race['race_num'] == 1
+    assert race['distance_m'] == 1150
+    assert race['race_date'] == pd.Timestamp('2025-11-09')
+
+    trainings = tables['trainings']
+    assert list(trainings['session_no']) == [1, 2]
+    assert trainings.loc[0, 'time_6f'] == pd.Series([84.5], dtype='float32')[0]
+    assert pd.isna(trainings.loc[1, 'time_6f'])
+    assert trainings.loc[1, 'time_1f'] == pd.Series([11.7], dtype='float32')[0]
+    assert list(trainings['position']) == [5, 6]
+    assert trainings['course'].dtype == 'category'
+
+    assert len(tables['previous_race_comments']) == 0
+    past = tables['past_results'].iloc[0]
+    assert past['horse_id'] == '0945958'
+    assert past['finish_position'] == 1
+    assert past['time_s'] == 95.0
+
+
+def test_export_from_jsonl_is_idempotent(tmp_path):
+    jsonl = tmp_path / 'jsonl'
+    jsonl.mkdir()
+    # 同じレースが2回出力されていても1行にまとまる
+    with open(jsonl / 'races-20251109.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(RACE, ensure_ascii=False) + '\n')
+        f.write(json.dumps(RACE, ensure_ascii=False) + '\n')
+
+    export_from_jsonl(str(tmp_path))
+    export_from_jsonl(str(tmp_path))
+
+    runners = load_table(str(tmp_path / 'tables'), 'runners')
+    assert len(runners) == 1
+    assert runners.loc[0, 'horse_name'] == 'セイウンレガーメ'
+    assert (tmp_path / 'tables' / 'csv' / 'trainings.csv').exists()
@@ -0,0 +1,98 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from src.features.engine import FeatureEngine, HorseWindows
+from src.features.training import TrainingMatrix, decode_times
+from src.models.race import Race
+from src.utils import convert
+from tests.test_exporter import RACE
+
+
+def test_decode_times_matches_per_row_conversion():
+    cells = [
+        ['84.5', '68.2', '52.7', '37.8', '11.9', '［５］'],
+        ['67.0', '52.3', '37.9', '11.7', '［６］'],
+        ['12.4'],
+        [],
+        ['52.0', '-', '12.1'],
+    ]
+    times, position = decode_times(cells)
+
+    expected = np.array([list(convert.training_times(c)[0].values()) for c in cells], dtype=np.float32)
+    assert np.array_equal(times, expected, equal_nan=True)
+    assert np.array_equal(position, [5, 6, np.nan, np.nan, np.nan], equal_nan=True)
+
+
+def test_training_matrix_from_raw_and_models_agree():
+    raw = TrainingMatrix.from_races([RACE])
+    typed = TrainingMatrix.from_races([Race.from_scraped(RACE)])
+
+    assert np.array_equal(raw.times, typed.times, equal_nan=True)
+    assert list(raw.courses) == list(typed.courses) == ['美Ｗ']
+    assert list(raw.horse_num) == [1, 1]
+    assert list(raw.session_no) == [1, 2]
+
+
+def test_normalized_times_are_per_course():
+    race = Race.from_scraped(RACE)
+    matrix = TrainingMatrix.from_races([race])
+    z = matrix.normalized_times()
+    # 同じコースの2本なので 1F は速い方が負になる
+    assert z[1, -1] < 0 < z[0, -1]
+    assert np.isnan(matrix.normalized_times(min_sessions=3)).all()
+
+
+def _race_with_history(past_results, previous_race_comment=''):
+    race = copy.deepcopy(RACE)
+    horse = race['horses'][0]
+    horse['past_results'] = [
+        {'date': date, 'venue': '東京', 'race_num': '1', 'finish_position': f'{finish}着', 'time': '1:35.0',
+         'jockey': 'ルメール', 'weight': '55', 'body_weight': f'{body}(+2)'}
+        for date, finish, body in past_results
+    ]
+    horse['previous_race_comment'] = previous_race_comment
+    return race
+
+
+def test_horse_windows_match_pandas_rolling():
+    keys = np.array(['a', 'a', 'a', 'b', 'b', 'c', 'c', 'c', 'c'], dtype=object)
+    values = np.array([1, 12, np.nan, 4, 5, 2, 9, 3, 14], dtype=float)
+    windows = HorseWindows(keys, 3)
+    rolling = pd.Series(values).groupby(keys).rolling(3, min_periods=1)
+
+    assert np.allclose(windows.mean(values), rolling.mean().to_numpy(), equal_nan=True)
+    assert np.allclose(windows.std(values), rolling.std().to_numpy(), equal_nan=True)
+    assert np.array_equal(windows.position, [0, 1, 2, 0, 1, 0, 1, 2, 3])
+
+
+def test_feature_engine_applies_evaluation_rules():
+    race = _race_with_history(
+        [('2025/06/01', 2, 480), ('2025/09/20', 12, 470), ('2025/10/20', 9, 476), ('2025/11/09', 1, 476)],
+        previous_race_comment='スタートで後手を踏んだのが全て。',
+    )
+    features = FeatureEngine().build([race]).iloc[0]
+
+    # 当日の結果（11/9）は使わない
+    assert features['n_runs'] == 3
+    assert features['days_since_last'] == 20
+    # 休み明けの凡走は叩き、前走は後手を踏んだので理由のある凡走。残るのは 2 着だけ
+    assert features['tataki_runs'] == 1
+    assert features['excused_runs'] == 1
+    assert features['adjusted_finish_mean'] == 2
+    assert features['finish_mean'] == np.float32(23 / 3)
+    assert features['inconsistent']
+    assert features['last_weight_ratio'] == np.float32(55 / 476)
+    assert features['n_sessions'] == 2
+    assert features['prev_run_excused']
+
+
+def test_feature_engine_keeps_unexplained_poor_runs():
+    race = _race_with_history([('2025/09/20', 3, 480), ('2025/10/05', 9, 476)])
+    features = FeatureEngine().build([race]).iloc[0]
+
+    assert features['excused_runs'] == 0
+    assert features['tataki_runs'] == 0
+    assert features['adjusted_finish_mean'] == 6
+    assert not features['inconsistent']
@@ -0,0 +1,122 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from src.scrapers.browser_pool import PageLease
+from src.scrapers.fetcher import HybridFetcher, needs_js
+
+SERVER_RENDERED = '<html><body><table class="default cyokyo"><tbody></tbody></table></body></html>'
+JS_SHELL = '<html><body><div id="app"></div><script src="app.js"></script></body></html>'
+# 新馬戦の前走コメントのように、サーバー描画だがデータの表が無いページ
+NO_DATA = '<html><body><header></header><main><p>データがありません</p></main><footer></footer></body></html>'
+
+
+class StubHttpFetcher:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    async def fetch(self, url):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+    def import_cookies(self, cookies):
+        pass
+
+
+def test_needs_js():
+    assert not needs_js(SERVER_RENDERED, 'cyokyo')
+    assert needs_js(JS_SHELL, 'cyokyo')
+    assert not needs_js(JS_SHELL, None)
+    assert not needs_js(NO_DATA, 'syoin')
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fetcher_uses_http_when_server_rendered():
+    browser = AsyncMock()
+    fetcher = HybridFetcher(StubHttpFetcher([(200, SERVER_RENDERED)]), browser_fetcher=browser)
+    content = await fetcher.fetch(AsyncMock(), "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201", 'cyokyo')
+    assert content == SERVER_RENDERED
+    browser.fetch.assert_not_called()
+    assert fetcher.stats == {'requests': 1, 'http': 1, 'playwright': 0, 'escalations': 0}
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fetcher_escalates_page_type_to_playwright():
+    browser = AsyncMock()
+    browser.fetch.return_value = SERVER_RENDERED
+    http = StubHttpFetcher([(200, JS_SHELL)] * 3)
+    fetcher = HybridFetcher(http, browser_fetcher=browser, js_switch_after=3)
+    url = "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201"
+
+    for _ in range(3):
+        assert await fetcher.fetch(AsyncMock(), url, 'cyokyo') == SERVER_RENDERED
+    # 3回続けて JS 描画だったので、以後は HTTP を試さずにブラウザで取る
+    assert await fetcher.fetch(AsyncMock(), url, 'cyokyo') == SERVER_RENDERED
+    assert len(http.urls) == 3
+    assert fetcher.stats['escalations'] == 3
+    assert fetcher.metrics.counter('page_escalations_total', page_type='cyokyo', reason='js') == 3
+    assert fetcher.metrics.counter('page_retries_total', page_type='cyokyo', reason='js') == 0
+    assert fetcher.stats['playwright'] == 4
+    assert fetcher.stats['requests'] == 7  # 切り替える前の HTTP も送っている
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fetcher_passes_pages_without_data_to_the_parser():
+    browser = AsyncMock()
+    http = StubHttpFetcher([(200, NO_DATA), (200, JS_SHELL), (200, NO_DATA), (200, JS_SHELL)])
+    fetcher = HybridFetcher(http, browser_fetcher=browser, js_switch_after=2)
+    url = "https://s.keibabook.co.jp/cyuou/syoin/202503060201"
+
+    assert await fetcher.fetch(AsyncMock(), url, 'syoin') == NO_DATA
+    browser.fetch.assert_not_called()
+    # 間にサーバー描画のページがあれば、JS 描画が続いたとはみなさない（種別ごとは切り替えない）
+    for _ in range(3):
+        await fetcher.fetch(AsyncMock(), url, 'syoin')
+    assert len(http.urls) == 4
+    assert fetcher.js_page_types == set()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fetcher_retries_http_errors_in_browser_without_sticking():
+    browser = AsyncMock()
+    browser.fetch.return_value = SERVER_RENDERED
+    http = StubHttpFetcher([(403, ''), (200, SERVER_RENDERED)])
+    fetcher = HybridFetcher(http, browser_fetcher=browser)
+    url = "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201"
+
+    acquire = AsyncMock()
+    await fetcher.fetch(AsyncMock(), url, 'cyokyo', acquire=acquire)
+    await fetcher.fetch(AsyncMock(), url, 'cyokyo', acquire=acquire)
+    assert len(http.urls) == 2
+    assert 'cyokyo' not in fetcher.js_page_types
+    # ブラウザで取り直した1回分だけレート制御のトークンを追加で取る（最初の HTTP の分は呼び出し側）
+    assert acquire.await_count == 1
+
+
+class RecordingPool:
+    def __init__(self):
+        self.leases = 0
+
+    def page(self, page_type=None):
+        pool = self
+
+        class Lease:
+            async def __aenter__(self):
+                pool.leases += 1
+                return AsyncMock()
+
+            async def __aexit__(self, *exc):
+                return False
+        return Lease()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_fetcher_borrows_a_page_only_when_escalating():
+    browser = AsyncMock()
+    browser.fetch.return_value = SERVER_RENDERED
+    pool = RecordingPool()
+    fetcher = HybridFetcher(StubHttpFetcher([(200, SERVER_RENDERED), (200, JS_SHELL)]), browser_fetcher=browser)
+    await fetcher.fetch(PageLease(pool, 'cyokyo'), "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201", 'cyokyo')
+    assert pool.leases == 0
+    await fetcher.fetch(PageLease(pool, 'kettou'), "https://s.keibabook.co.jp/cyuou/kettou/202503060201", 'kettou')
+    assert pool.leases == 1
@@ -0,0 +1,50 @@
+import asyncio
+import datetime
+
+import pytest
+
+from src.storage.horse_store import HorseStore
+
+LINK = '/db/uma/0945958'
+SAT = datetime.date(2025, 11, 8)
+SUN = datetime.date(2025, 11, 9)
+RESULTS = [{'date': '2025/10/20', 'venue': '東京', 'finish_position': '1着'}]
+
+
+def test_horse_store_refetches_only_after_a_new_run(tmp_path):
+    store = HorseStore(str(tmp_path / 'horses.sqlite3'))
+    store.put(LINK, RESULTS, fetched_on=SAT)
+    store.record_run(LINK, SAT)
+    # 同じ日の別ページ（出馬表と成績など）では取り直さない
+    assert store.get(LINK, SAT) == RESULTS
+    # 土曜に走った馬は日曜には過去走が増えている
+    assert store.get(LINK, SUN) is None
+    assert store.stats['stale'] == 1
+
+    store.put(LINK, RESULTS, fetched_on=SUN)
+    assert store.get(LINK, SUN) == RESULTS
+
+
+def test_horse_store_expires_after_max_age(tmp_path):
+    store = HorseStore(str(tmp_path / 'horses.sqlite3'), max_age_days=7)
+    store.put(LINK, RESULTS, fetched_on=SAT)
+    assert store.get(LINK, SAT + datetime.timedelta(days=7)) == RESULTS
+    assert store.get(LINK, SAT + datetime.timedelta(days=8)) is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_fetch_coalesces_concurrent_requests(tmp_path):
+    store = HorseStore(str(tmp_path / 'horses.sqlite3'))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return RESULTS
+
+    results = await asyncio.gather(*(store.get_or_fetch(LINK, SUN, fetch) for _ in range(3)))
+    assert results == [RESULTS] * 3
+    assert len(calls) == 1
+    assert store.stats['coalesced'] == 2
+    assert await store.get_or_fetch(LINK, SUN, fetch) == RESULTS
+    assert len(calls) == 1
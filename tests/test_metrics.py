@@ -0,0 +1,88 @@
+import json
+import logging
+
+import pytest
+from unittest.mock import AsyncMock
+
+from src.scrapers.keibabook import KeibaBookScraper
+from src.utils.logger import JsonFormatter
+from src.utils.metrics import Metrics
+
+SETTINGS = {
+    'race_id': '202503060201',
+    'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/202503060201',
+    'cache': {'enabled': False},
+    'incremental': {'enabled': False},
+}
+
+PEDIGREE_HTML = """
+<table class="PedigreeTable"><tbody><tr>
+<td class="HorseNum">1</td><td class="Father">ドレフォン</td><td class="Mother">セイウンアワード</td>
+<td class="MothersFather">タニノギムレット</td>
+</tr></tbody></table>
+"""
+
+
+def test_prometheus_text_uses_cumulative_buckets():
+    metrics = Metrics(buckets=(0.01, 0.1))
+    metrics.observe('parse', 0.005, page_type='cyokyo')
+    metrics.observe('parse', 0.05, page_type='cyokyo')
+    metrics.observe('parse', 5.0, page_type='cyokyo')
+    metrics.inc('page_bytes_total', 1200, page_type='cyokyo')
+    metrics.inc('page_bytes_total', 800, page_type='cyokyo')
+
+    text = metrics.to_prometheus()
+    assert '# TYPE keibabook_stage_seconds histogram' in text
+    assert 'keibabook_stage_seconds_bucket{page_type="cyokyo",stage="parse",le="0.01"} 1' in text
+    assert 'keibabook_stage_seconds_bucket{page_type="cyokyo",stage="parse",le="0.1"} 2' in text
+    assert 'keibabook_stage_seconds_bucket{page_type="cyokyo",stage="parse",le="+Inf"} 3' in text
+    assert 'keibabook_stage_seconds_count{page_type="cyokyo",stage="parse"} 3' in text
+    assert '# TYPE keibabook_page_bytes_total counter' in text
+    assert 'keibabook_page_bytes_total{page_type="cyokyo"} 2000' in text
+
+
+def test_summary_puts_slowest_stage_first_and_export_writes_files(tmp_path):
+    metrics = Metrics(export_dir=str(tmp_path))
+    metrics.observe('parse', 0.01, page_type='kettou')
+    metrics.observe('network', 2.0, page_type='horse', transport='http')
+    metrics.inc('cache_hits_total', page_type=None)
+
+    summary = metrics.summary()
+    assert summary['stages'][0]['stage'] == 'network'
+    assert summary['stages'][0]['transport'] == 'http'
+    assert summary['counters'] == [{'name': 'cache_hits_total', 'page_type': 'other', 'value': 1}]
+
+    prom_path, json_path = metrics.export('test')
+    with open(prom_path, encoding='utf-8') as f:
+        assert 'keibabook_cache_hits_total{page_type="other"} 1' in f.read()
+    with open(json_path, encoding='utf-8') as f:
+        assert len(json.load(f)['stages']) == 2
+    assert Metrics().export() is None
+
+
+@pytest.mark.asyncio
+async def test_scraper_records_parse_time_and_errors_per_page_type():
+    metrics = Metrics()
+    scraper = KeibaBookScraper(SETTINGS, metrics=metrics)
+    scraper._fetch_with_pool = AsyncMock(side_effect=[PEDIGREE_HTML, RuntimeError("timeout")])
+
+    parsed = await scraper._fetch_and_parse(None, scraper._page_url('kettou'), 'kettou')
+    assert parsed['1']['father'] == 'ドレフォン'
+    assert metrics.stage('parse', page_type='kettou', parser='_parse_pedigree_data').count == 1
+
+    with pytest.raises(RuntimeError):
+        await scraper._fetch_and_parse(None, scraper._page_url('danwa'), 'danwa')
+    assert metrics.counter('page_errors_total', page_type='danwa', error='RuntimeError') == 1
+
+
+def test_json_formatter_includes_structured_fields():
+    record = logging.LogRecord('src.jobs.batch', logging.INFO, __file__, 1, "race %s done", ('202503060201',), None)
+    record.race_id = '202503060201'
+    record.page_type = 'cyokyo'
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == 'race 202503060201 done'
+    assert entry['race_id'] == '202503060201'
+    assert entry['page_type'] == 'cyokyo'
+    assert entry['level'] == 'INFO'
+    assert 'url' not in entry
@@ -0,0 +1,38 @@
+import json
+
+from src.models.race import Race, Runner
+from tests.test_exporter import RACE
+
+
+def test_from_scraped_converts_numbers_once():
+    race = Race.from_scraped(RACE)
+
+    assert race.race_id == '202503060201'
+    assert race.race_date == '2025-11-09'
+    assert race.distance_m == 1150
+    runner = race.runners[0]
+    assert runner.horse_num == 1
+    assert runner.horse_id == '0945958'
+    assert runner.tanpyo == '直線の伸びひと息'
+    assert runner.training[0].time('6f') == 84.5
+    assert runner.training[1].time('6f') is None
+    assert runner.training[1].position == 6
+    assert runner.training[0].awase is None
+    assert runner.pedigree.father == 'ドレフォン'
+    assert runner.previous_race_comment is None
+    assert runner.past_results[0].date == '2025-10-20'
+    assert runner.past_results[0].finish_position == 1
+    assert runner.past_results[0].time_s == 95.0
+
+
+def test_dict_round_trip_through_json():
+    race = Race.from_scraped(RACE)
+    restored = Race.from_dict(json.loads(json.dumps(race.to_dict(), ensure_ascii=False)))
+
+    assert restored == race
+    assert Race.coerce(race.to_dict()) == race
+    assert Race.coerce(RACE) == race
+
+
+def test_models_are_slotted():
+    assert not hasattr(Runner(), '__dict__')
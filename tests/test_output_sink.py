@@ -0,0 +1,55 @@
+import datetime
+import json
+
+import pytest
+
+from src.storage.output_sink import JsonlSink
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.asyncio
+async def test_sink_batches_and_flushes_on_close(tmp_path):
+    sink = JsonlSink(str(tmp_path), batch_size=3, flush_interval=60)
+    futures = [await sink.write({'race_id': f'20250306020{i}', 'horses': []}) for i in range(1, 5)]
+
+    # batch_size 件たまった分は flush_interval を待たずに書かれる
+    await futures[0]
+    assert futures[2].done()
+    assert not futures[3].done()
+
+    await sink.close()
+    assert futures[3].done()
+    path = sink.jsonl_path(datetime.date.today())
+    assert [r['race_id'] for r in read_lines(path)] == [f'20250306020{i}' for i in range(1, 5)]
+    assert sink.stats['batches'] == 2
+    with open(sink.race_json_path('202503060201'), encoding='utf-8') as f:
+        assert json.load(f)['race_id'] == '202503060201'
+
+
+@pytest.mark.asyncio
+async def test_sink_flushes_after_interval(tmp_path):
+    async with JsonlSink(str(tmp_path), batch_size=100, flush_interval=0.01, write_race_json=False) as sink:
+        future = await sink.write({'race_id': '202503060201'})
+        await future
+        assert len(read_lines(sink.jsonl_path(datetime.date.today()))) == 1
+    assert not (tmp_path / 'races').exists()
+
+
+@pytest.mark.asyncio
+async def test_sink_rotates_by_date(tmp_path, monkeypatch):
+    sink = JsonlSink(str(tmp_path), batch_size=1, write_race_json=False)
+    sink._write_batch([{'race_id': 'a'}])
+
+    class Tomorrow(datetime.date):
+        @classmethod
+        def today(cls):
+            return datetime.date(2099, 1, 1)
+
+    monkeypatch.setattr('src.storage.output_sink.datetime.date', Tomorrow)
+    sink._write_batch([{'race_id': 'b'}])
+    sink._close_file()
+    assert read_lines(sink.jsonl_path(datetime.date(2099, 1, 1))) == [{'race_id': 'b'}]
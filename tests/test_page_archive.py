@@ -0,0 +1,134 @@
+import os
+
+from src.storage.page_archive import INDEX_DTYPE, PageArchive
+from src.storage.page_cache import PageCache
+
+BASE = "https://s.keibabook.co.jp/cyuou"
+
+
+def page(text):
+    return f"<html><body><header>{'ナビ' * 200}</header><main>{text}</main></body></html>"
+
+
+def test_archive_keeps_versions_and_skips_duplicates(tmp_path):
+    archive = PageArchive(str(tmp_path / 'archive'))
+    url = f"{BASE}/danwa/0/202503060201"
+    assert archive.append(url, page('前日'), fetched_at=100)
+    assert not archive.append(url, page('前日'), fetched_at=200)  # 同じ内容
+    assert archive.append(url, page('当日'), fetched_at=300)
+
+    assert archive.get(url) == page('当日')
+    assert archive.get(url, at=250) == page('前日')
+    assert archive.versions(url) == [100, 300]
+    assert archive.get(f"{BASE}/danwa/0/202503060202") is None
+    # 圧縮されたままの本文をコピーせずに返す
+    assert isinstance(archive.raw(url), memoryview)
+    archive.close()
+
+    reopened = PageArchive(str(tmp_path / 'archive'), readonly=True)
+    assert reopened.get(url) == page('当日')
+    assert reopened.summary()['pages'] == 2
+    reopened.close()
+
+
+def test_archive_index_is_sorted_and_memory_mapped(tmp_path):
+    archive = PageArchive(str(tmp_path / 'archive'), index_every=10)
+    urls = [f"{BASE}/syutuba/2025030602{r:02d}" for r in range(1, 13)]
+    for url in urls:
+        archive.append(url, page(url))
+    archive.close()
+
+    archive = PageArchive(str(tmp_path / 'archive'))
+    with archive:
+        for _, index in archive._runs:
+            assert index.dtype == INDEX_DTYPE
+            assert hasattr(index, 'filename')  # np.memmap
+            assert (index['url_hash'][1:] >= index['url_hash'][:-1]).all()
+        assert all(archive.get(url) == page(url) for url in urls)
+
+
+def test_archive_flush_writes_deltas_and_merges_runs(tmp_path):
+    path = str(tmp_path / 'archive')
+    archive = PageArchive(path, index_every=4)
+    urls = [f"{BASE}/danwa/0/2025030602{r:02d}" for r in range(1, 65)]
+    for url in urls:
+        archive.append(url, page(url))
+    # 16 回の flush で書いた run は併合され、run の数は対数で収まる
+    assert archive.stats['runs_written'] > 16
+    assert len(archive._runs) <= 5
+    sizes = [len(rows) for _, rows in archive._runs]
+    assert sum(sizes) == 64 and sizes == sorted(sizes, reverse=True)
+    archive.close()
+
+    index_files = sorted(name for name in os.listdir(path) if name.startswith('index-'))
+    reopened = PageArchive(path, readonly=True)
+    assert [p.url for p in reopened.scan()] == urls
+    # 併合で使わなくなった run は消えている
+    assert index_files == sorted(name for name, _ in reopened._runs)
+    assert all(reopened.get(url) == page(url) for url in urls)
+    reopened.close()
+
+
+def test_archive_entries_keep_only_latest_version_before_any_flush(tmp_path):
+    path = str(tmp_path / 'archive')
+    archive = PageArchive(path, index_every=1000)
+    url = f"{BASE}/syutuba/202503060201"
+    archive.append(url, page('v1'), fetched_at=1.0)
+    archive.append(f"{BASE}/syutuba/202503060202", page('other'), fetched_at=2.0)
+    archive.append(url, page('v2'), fetched_at=3.0)
+    archive._writer.flush()
+
+    # スクレイパーが動いている（索引をまだ書いていない）間に読み取り専用で開く
+    reader = PageArchive(path, readonly=True)
+    entries = reader.entries()
+    assert len(entries) == 2
+    assert [reader.read(row).html for row in entries if reader.read(row).url == url] == [page('v2')]
+    reader.close()
+    archive.close()
+
+
+def test_archive_recovers_unindexed_tail_and_partial_record(tmp_path):
+    path = str(tmp_path / 'archive')
+    archive = PageArchive(path, index_every=1000)
+    archive.append(f"{BASE}/kettou/202503060201", page('血統1'))
+    archive.flush()
+    archive.append(f"{BASE}/kettou/202503060202", page('血統2'))
+    archive._writer.flush()
+    segment = archive._segment_path(1)
+    size = os.path.getsize(segment)
+    # 索引を書かずに落ち、最後のレコードも書きかけだった
+    with open(segment, 'ab') as f:
+        f.write(b'KBPA\x01')
+    archive._writer.close()
+    archive._writer = None
+
+    recovered = PageArchive(path)
+    assert recovered.get(f"{BASE}/kettou/202503060202") == page('血統2')
+    assert recovered.stats['recovered'] == 1
+    assert os.path.getsize(segment) == size
+    recovered.close()
+
+
+def test_archive_scans_by_page_type_in_disk_order_across_segments(tmp_path):
+    archive = PageArchive(str(tmp_path / 'archive'), segment_bytes=256)
+    for r in range(1, 6):
+        archive.append(f"{BASE}/cyokyo/0/2025030602{r:02d}", page(f"調教{r}"))
+        archive.append(f"https://s.keibabook.co.jp/db/uma/90000{r}", page(f"馬{r}"))
+    assert archive.summary()['segments'] > 1
+
+    pages = list(archive.scan(page_types=['cyokyo']))
+    assert [p.html for p in pages] == [page(f"調教{r}") for r in range(1, 6)]
+    assert pages[0].race_id == '202503060201' and pages[0].page_type == 'cyokyo'
+    assert [p.race_id for p in archive.scan(race_ids=['202503060203'])] == ['202503060203']
+    archive.close()
+
+
+def test_archive_imports_page_cache(tmp_path):
+    cache = PageCache(str(tmp_path / 'cache'))
+    cache.put(f"{BASE}/syoin/202503060201", page('前走'))
+    archive = PageArchive(str(tmp_path / 'archive'))
+    assert archive.import_page_cache(cache) == 1
+    assert archive.import_page_cache(cache) == 0
+    assert archive.get(f"{BASE}/syoin/202503060201") == page('前走')
+    archive.close()
+    cache.close()
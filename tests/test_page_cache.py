@@ -0,0 +1,68 @@
+import os
+import time
+
+from src.storage.page_cache import PageCache, classify_url
+
+SYUTUBA_URL = "https://s.keibabook.co.jp/cyuou/syutuba/202503060201"
+SEISEKI_URL = "https://s.keibabook.co.jp/cyuou/seiseki/202503060201"
+
+
+def test_classify_url():
+    assert classify_url(SYUTUBA_URL) == ('syutuba', '202503060201')
+    assert classify_url("https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201") == ('cyokyo', '202503060201')
+    assert classify_url("https://s.keibabook.co.jp/db/uma/0945958") == ('horse', None)
+    assert classify_url("http://mockurl.com") == (None, None)
+
+
+def test_page_cache_roundtrip_and_counters(tmp_path):
+    cache = PageCache(str(tmp_path))
+    assert cache.get(SYUTUBA_URL) is None
+    cache.put(SYUTUBA_URL, "<html>出馬表</html>")
+    assert cache.get(SYUTUBA_URL) == "<html>出馬表</html>"
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.stats['stores'] == 1
+
+
+def test_page_cache_expires_and_finished_race_is_pinned(tmp_path):
+    cache = PageCache(str(tmp_path), ttl={'syutuba': 0})
+    cache.put(SYUTUBA_URL, "<html>a</html>")
+    time.sleep(0.01)
+    assert cache.get(SYUTUBA_URL) is None
+    assert cache.stats['expired'] == 1
+
+    cache.put(SYUTUBA_URL, "<html>a</html>", expires_at=time.time() + 0.01)
+    cache.put(SEISEKI_URL, "<html>成績</html>")
+    time.sleep(0.02)
+    # 成績ページを保存したレースの出馬表は期限切れにならない
+    assert cache.get(SYUTUBA_URL) == "<html>a</html>"
+
+
+def test_page_cache_syutuba_expires_by_post_time(tmp_path):
+    cache = PageCache(str(tmp_path))
+    now = time.time()
+    cache.set_post_times({'202503060201': now + 60})
+    cache.put(SYUTUBA_URL, "<html>a</html>")
+    cache.put("https://s.keibabook.co.jp/cyuou/syutuba/202503060202", "<html>b</html>")
+    expires = dict(cache._db().execute("SELECT race_id, expires_at FROM entries"))
+    # 発走が TTL（30分）より近いレースは発走時刻まで、発走時刻が分からないレースは TTL まで
+    assert expires['202503060201'] <= now + 61
+    assert expires['202503060202'] >= now + 30 * 60
+
+
+def test_page_cache_dedups_identical_bodies(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put(SYUTUBA_URL, "<html>same</html>")
+    cache.put(SEISEKI_URL, "<html>same</html>")
+    blobs = [f for _, _, files in os.walk(tmp_path / 'blobs') for f in files]
+    assert len(blobs) == 1
+
+
+def test_page_cache_lru_eviction(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=1)
+    cache.put(SYUTUBA_URL, "<html>old</html>")
+    cache.put(SEISEKI_URL, "<html>new</html>")
+    assert cache.stats['evictions'] == 1
+    assert cache.get(SYUTUBA_URL) is None
+    # 直前に保存したページは残る
+    assert cache.get(SEISEKI_URL) == "<html>new</html>"
@@ -0,0 +1,51 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from benchmarks.synthetic import full_card
+from src.scrapers.keibabook import KeibaBookScraper
+from src.scrapers.parse_pool import ParsePool
+
+RACE_ID = '202503060201'
+SETTINGS = {
+    'race_id': RACE_ID,
+    'shutuba_url': f'https://s.keibabook.co.jp/cyuou/syutuba/{RACE_ID}',
+    'parser_backend': 'html.parser',
+    'cache': {'enabled': False},
+    'http': {'enabled': False},
+    'rate_limit': {'requests_per_second': 1000, 'burst': 100},
+    'max_concurrency': 4,
+}
+
+
+class NullBrowserPool:
+    @asynccontextmanager
+    async def page(self, page_type=None):
+        yield None
+
+
+def make_scraper(card, parse_pool=None):
+    scraper = KeibaBookScraper(SETTINGS, browser_pool=NullBrowserPool(), parse_pool=parse_pool)
+    pages = {scraper._page_url(t): card[t] for t in ('syutuba', 'cyokyo', 'kettou', 'danwa', 'syoin')}
+    pages.update({f'https://s.keibabook.co.jp{link}': html for link, html in card['horses'].items()})
+
+    async def fetch(page, url):
+        return pages[url]
+
+    scraper._fetch_page_content = fetch
+    return scraper
+
+
+@pytest.mark.asyncio
+async def test_scrape_with_parse_pool_matches_inline_parsing():
+    card = full_card(horses=6)
+    inline = await make_scraper(card).scrape()
+
+    with ParsePool(SETTINGS, workers=2, max_tasks_per_child=10, max_pending=2) as parse_pool:
+        pooled = await make_scraper(card, parse_pool).scrape()
+        assert parse_pool.stats['parsed'] == 5 + 6
+        # 同時にパース待ちにできるのは max_pending 件まで
+        assert parse_pool.stats['backpressure_waits'] > 0
+
+    assert pooled == inline
+    assert len(pooled['horses']) == 6
@@ -0,0 +1,70 @@
+import pytest
+
+from src.scrapers.parser_backend import available_backends, extract_regions, get_parser_backend
+
+PAGE = """
+<html><body>
+<div class="header"><p>ヘッダー</p></div>
+<table class="default cyokyo">
+  <tbody><tr><td colspan="5"><table class="default cyokyodata"><tr><td>1</td></tr></table></td></tr></tbody>
+</table>
+<div class='racemei'><p>1R</p></div>
+<div class="footer">フッター</div>
+</body></html>
+"""
+
+
+def test_extract_regions_keeps_nested_tags_balanced():
+    region = extract_regions(PAGE, (('default', 'cyokyo'),))
+    assert region.startswith('<table class="default cyokyo">')
+    assert region.endswith('</table>')
+    assert region.count('<table') == region.count('</table>') == 2
+    assert 'ヘッダー' not in region
+
+
+def test_extract_regions_joins_multiple_regions_in_document_order():
+    region = extract_regions(PAGE, (('racemei',), ('default', 'cyokyo')))
+    assert region.index('cyokyo') < region.index('racemei')
+    assert 'フッター' not in region
+
+
+def test_extract_regions_returns_none_when_missing():
+    assert extract_regions(PAGE, (('PedigreeTable',),)) is None
+    # cyokyodata は cyokyo とは別のクラス
+    assert extract_regions('<table class="cyokyodata"></table>', (('cyokyo',),)) is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_parser_backend('html5')
+    assert 'html.parser' in available_backends()
+
+
+def test_selectolax_find_all_excludes_the_node_itself():
+    if 'selectolax' not in available_backends():
+        pytest.skip('selectolax is not installed')
+    div = get_parser_backend('selectolax')('<div class="a"><div class="b"></div></div>').select_one('.a')
+    assert [d.get('class') for d in div.find_all('div')] == [['b']]
+    assert div.find('div').get('class') == ['b']
+
+
+def test_backends_agree_on_tables_without_tbody():
+    # html.parser / lxml は tbody を補わないが lexbor は補う。どちらでも同じ行を読むこと
+    from benchmarks.synthetic import full_card
+    from src.scrapers.keibabook import PAGE_PARSERS, KeibaBookScraper
+
+    card = full_card(horses=3)
+    pages = {t: card[t] for t in ('syutuba', 'cyokyo', 'kettou', 'danwa', 'syoin')}
+    pages['horse'] = next(iter(card['horses'].values()))
+    expected = None
+    for backend in available_backends():
+        scraper = KeibaBookScraper({'shutuba_url': '', 'parser_backend': backend, 'cache': {'enabled': False},
+                                    'http': {'enabled': False}})
+        outputs = {}
+        for page_type, html in pages.items():
+            parse = getattr(scraper, PAGE_PARSERS[page_type])
+            outputs[page_type] = parse(html.replace('<tbody>', '').replace('</tbody>', ''))
+            assert outputs[page_type], (backend, page_type)
+            assert outputs[page_type] == parse(html), (backend, page_type)
+        expected = expected or outputs
+        assert outputs == expected, backend
@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+from src.jobs.race_day import (ENTRIES, FULL, RESULTS, RaceDayDaemon, RaceDayScheduler, RequestBudget,
+                               estimate_post_times)
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def drain(scheduler):
+    jobs = []
+    while (job := scheduler.next_job()) is not None:
+        scheduler.done(job, 1)
+        jobs.append((job.kind, job.race_id))
+    return jobs
+
+
+def test_estimate_post_times_with_overrides():
+    card = estimate_post_times(['202503060201', '202503060211'], datetime.date(2025, 11, 9),
+                               overrides={'202503060211': '15:25'})
+    first = datetime.datetime.fromtimestamp(card['202503060201'])
+    last = datetime.datetime.fromtimestamp(card['202503060211'])
+    assert (first.hour, first.minute) == (10, 5)
+    assert (last.hour, last.minute) == (15, 25)
+
+
+def test_scheduler_runs_imminent_races_first_and_coalesces():
+    clock = Clock(0)
+    scheduler = RaceDayScheduler(RequestBudget(3600, burst=1000, clock=clock), clock=clock)
+    # 2R の方が先に発走する
+    scheduler.plan({'R1': 7200, 'R2': 3600}, full_before_min=180, entries_before_min=(30,), results_after_min=20)
+    assert not scheduler.add(FULL, 'R1', 100, 7200)  # 同じジョブはまとめる
+
+    assert drain(scheduler) == [(FULL, 'R2'), (FULL, 'R1')]
+    clock.now = 3600 - 30 * 60
+    assert drain(scheduler) == [(ENTRIES, 'R2')]
+    clock.now = 7200 - 30 * 60
+    assert drain(scheduler) == [(ENTRIES, 'R1'), (RESULTS, 'R2')]
+    clock.now = 7200 + 20 * 60
+    assert drain(scheduler) == [(RESULTS, 'R1')]
+    assert len(scheduler) == 0
+
+
+def test_scheduler_drops_stale_and_redundant_entries():
+    clock = Clock(0)
+    scheduler = RaceDayScheduler(RequestBudget(3600, burst=1000, clock=clock), clock=clock)
+    scheduler.add(ENTRIES, 'R1', 10, post_time=100)
+    scheduler.add(FULL, 'R1', 20, post_time=100)
+    scheduler.add(ENTRIES, 'R2', 10, post_time=50)
+    clock.now = 60
+    # R1 は全ページ取得でまとめて取る、R2 は発走済み
+    assert drain(scheduler) == [(FULL, 'R1')]
+    assert scheduler.stats['dropped'] == 1
+    assert scheduler.stats['coalesced'] == 1
+
+
+def test_scheduler_respects_request_budget():
+    clock = Clock(0)
+    budget = RequestBudget(per_hour=36, burst=23, clock=clock)  # 100 秒に1件
+    scheduler = RaceDayScheduler(budget, clock=clock)
+    scheduler.add(FULL, 'R1', 0, 10000)
+    scheduler.add(ENTRIES, 'R2', 0, 20000)
+
+    assert scheduler.next_job().kind == ENTRIES
+    job = scheduler.next_job()
+    assert job is None  # FULL は 23 件見込みで残りが足りない
+    clock.now = 100
+    job = scheduler.next_job()
+    assert job.kind == FULL
+    scheduler.done(job, requests=5)  # キャッシュで済んだ分は戻る
+    assert budget.available() == pytest.approx(23 - 5)
+
+
+@pytest.mark.asyncio
+async def test_daemon_runs_due_jobs_and_counts_requests(tmp_path, monkeypatch):
+    clock = Clock(0)
+    settings = {'shutuba_url': 'https://s.keibabook.co.jp/cyuou/syutuba/202503060201', 'output_dir': str(tmp_path),
+                'cache': {'enabled': False}, 'race_day': {'entries_before_min': [], 'requests_per_hour': 3600}}
+    daemon = RaceDayDaemon(settings, {'202503060201': 3600}, clock=clock)
+    executed = []
+
+    async def execute(job):
+        executed.append(job.kind)
+        daemon.runner.fetcher.stats['requests'] += 2
+    monkeypatch.setattr(daemon, 'execute', execute)
+
+    assert await daemon.run_once()
+    assert not await daemon.run_once()  # 成績は発走後
+    clock.now = 3600 + 20 * 60
+    assert await daemon.run_once()
+    assert executed == [FULL, RESULTS]
+    assert daemon.scheduler.budget.spent == 4
+    await daemon.runner.close()
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import pytest
+
+from src.utils.rate_limiter import HostRateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_throttles():
+    bucket = TokenBucket(rate=20.0, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - start < 0.03
+
+    await bucket.acquire()
+    # バーストを使い切った後は 1/rate 秒待たされる
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_min_interval():
+    bucket = TokenBucket(rate=1000.0, burst=10, min_interval=0.05)
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+    assert time.monotonic() - start >= 0.1
+
+
+def test_host_rate_limiter_separates_hosts():
+    limiter = HostRateLimiter.from_settings({'rate_limit': {'requests_per_second': 5, 'burst': 2}})
+    a = limiter.bucket("https://s.keibabook.co.jp/cyuou/syutuba/1")
+    b = limiter.bucket("https://s.keibabook.co.jp/cyuou/kettou/1")
+    c = limiter.bucket("https://example.com/")
+    assert a is b
+    assert a is not c
+    assert a.rate == 5 and a.burst == 2
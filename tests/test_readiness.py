@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import AsyncMock
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+
+from src.scrapers.readiness import PageNotReadyError, PageReadiness
+from src.utils.metrics import Histogram
+
+URL = "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201"
+
+
+@pytest.mark.asyncio
+async def test_readiness_waits_for_page_type_selector():
+    readiness = PageReadiness(timeout_ms=5000)
+    page = AsyncMock(spec=Page)
+    page.content.return_value = "<html>調教</html>"
+
+    content = await readiness.load(page, URL, 'cyokyo')
+
+    assert content == "<html>調教</html>"
+    page.goto.assert_called_once_with(URL, wait_until="commit", timeout=5000)
+    selector, = page.wait_for_selector.call_args[0]
+    assert selector == 'table.default.cyokyo'
+    assert page.wait_for_selector.call_args[1]['state'] == 'attached'
+    assert page.wait_for_selector.call_args[1]['timeout'] <= 5000
+    page.wait_for_load_state.assert_called_once()
+    assert page.wait_for_load_state.call_args[0] == ("domcontentloaded",)
+    assert readiness.stats()['cyokyo']['count'] == 1
+
+
+class StreamingPage:
+    """表の要素は届いたが、行はまだ受信中のページ"""
+
+    def __init__(self):
+        self.html = '<table class="default cyokyo"><tr><td>1</td></tr>'
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        pass
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        pass
+
+    async def wait_for_load_state(self, state, timeout=None):
+        # HTML を最後まで読み終えた
+        self.html += '<tr><td>2</td></tr><tr><td>3</td></tr></table>'
+
+    async def content(self):
+        return self.html
+
+
+@pytest.mark.asyncio
+async def test_readiness_does_not_cut_off_rows_still_streaming():
+    content = await PageReadiness(timeout_ms=5000).load(StreamingPage(), URL, 'cyokyo')
+    assert content.count('<tr>') == 3
+
+
+@pytest.mark.asyncio
+async def test_readiness_raises_typed_timeout():
+    readiness = PageReadiness(timeout_ms=100)
+    page = AsyncMock(spec=Page)
+    page.wait_for_selector.side_effect = PlaywrightTimeoutError("timeout")
+    page.evaluate.return_value = 'loading'
+
+    with pytest.raises(PageNotReadyError) as excinfo:
+        await readiness.load(page, URL, 'cyokyo')
+    assert excinfo.value.page_type == 'cyokyo'
+    assert excinfo.value.selector == 'table.default.cyokyo'
+    assert 'cyokyo' not in readiness.stats()
+
+
+@pytest.mark.asyncio
+async def test_readiness_returns_loaded_pages_without_data():
+    readiness = PageReadiness(timeout_ms=100)
+    page = AsyncMock(spec=Page)
+    page.wait_for_selector.side_effect = PlaywrightTimeoutError("timeout")
+    page.evaluate.return_value = 'complete'
+    page.content.return_value = "<html><p>データがありません</p></html>"
+
+    # 読み終えたページにデータの表が無いだけなら、再試行させずに空のページとして返す
+    assert await readiness.load(page, URL, 'syoin') == "<html><p>データがありません</p></html>"
+    assert readiness.metrics.counter('pages_without_data_total', page_type='syoin') == 1
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.2, 0.3, 0.7, 2.0):
+        histogram.observe(value)
+    assert histogram.count == 5
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(1.0) == 2.0
@@ -0,0 +1,122 @@
+import json
+import os
+
+from benchmarks.replay_server import synthetic_site
+from src.jobs.reparse import ParseDiff, Reparser
+from src.storage.page_archive import PageArchive
+from src.storage.page_cache import classify_url
+
+HOST = "https://s.keibabook.co.jp"
+RACE_IDS = ['202503060201', '202503060202']
+
+
+def make_archive(path):
+    archive = PageArchive(path)
+    for page_path, html in synthetic_site(RACE_IDS, horses=4).items():
+        url = HOST + page_path
+        page_type, race_id = classify_url(url)
+        archive.append(url, html, page_type, race_id, fetched_at=100)
+    archive.close()
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def make_reparser(tmp_path):
+    settings = {
+        'output_dir': str(tmp_path),
+        'shutuba_url': f"{HOST}/cyuou/syutuba/{RACE_IDS[0]}",
+        'incremental': {'enabled': False},
+        'reparse': {'workers': 2, 'chunk_size': 3},
+    }
+    return Reparser.from_settings(settings)
+
+
+def test_reparse_writes_outputs_and_diffs_against_previous_run(tmp_path):
+    make_archive(str(tmp_path / 'archive'))
+    reparser = make_reparser(tmp_path)
+    first = reparser.run(run_name='1')
+    assert first['baseline'] is None
+    assert first['pages']['syutuba']['pages'] == 2 and first['pages']['syutuba']['new_pages'] == 2
+    assert first['pages']['horse']['pages'] == 4  # 馬のページはレース間で共通
+    assert first['races']['races'] == 2 and first['races']['new'] == 2
+    races = sorted(read_jsonl(os.path.join(first['run'], 'races.jsonl')), key=lambda r: r['race_id'])
+    assert [r['race_id'] for r in races] == RACE_IDS
+    assert all(runner['past_results'] and runner['training'] for runner in races[0]['runners'])
+
+    # 中身が同じなら差分は出ない（比較対象は直前の実行）
+    second = reparser.run(run_name='2')
+    assert second['baseline'] == first['run']
+    assert all(s['changed_pages'] == 0 and s['new_pages'] == 0 for s in second['pages'].values())
+    assert second['races']['changed'] == 0
+    reparser.close()
+
+    # 出馬表の取り直しで馬がいなくなったレースは「空になった」に挙がる
+    archive = PageArchive(str(tmp_path / 'archive'))
+    archive.append(f"{HOST}/cyuou/syutuba/{RACE_IDS[1]}", "<html><body>メンテナンス中</body></html>", 'syutuba',
+                   RACE_IDS[1], fetched_at=200)
+    archive.close()
+    reparser = make_reparser(tmp_path)
+    third = reparser.run(page_types=['syutuba'], run_name='3')
+    reparser.close()
+    syutuba = third['pages']['syutuba']
+    assert syutuba['pages'] == 2 and syutuba['changed_pages'] == 1
+    assert syutuba['now_empty'] == [RACE_IDS[1]]
+    assert syutuba['rows_removed'] == 4
+    # 調教などは前回の結果を引き継いでレースを組み立て直す（変わるのは出馬表の分だけ）
+    assert third['races']['changed'] == 1
+    assert third['races']['changes']['entry.scratched'] == 4
+    assert all(key.split('.')[0] in ('race', 'entry') for key in third['races']['changes'])
+    assert len(read_jsonl(os.path.join(third['run'], 'pages-horse.jsonl'))) == 4
+    assert len(read_jsonl(os.path.join(third['run'], 'pages-cyokyo.jsonl'))) == 2
+
+
+def test_reparse_one_race_reparses_its_horses_and_carries_the_rest(tmp_path):
+    make_archive(str(tmp_path / 'archive'))
+    reparser = make_reparser(tmp_path)
+    reparser.run(run_name='1')
+    second = reparser.run(race_ids=[RACE_IDS[0]], run_name='2')
+    reparser.close()
+    assert second['pages']['syutuba']['pages'] == 1
+    assert second['pages']['horse']['pages'] == 4  # 出馬表から辿った馬柱だけを引いてパースする
+    assert second['races']['races'] == 1 and second['races']['changed'] == 0
+    races = read_jsonl(os.path.join(second['run'], 'races.jsonl'))
+    assert sorted(r['race_id'] for r in races) == RACE_IDS
+    assert len(read_jsonl(os.path.join(second['run'], 'pages-syutuba.jsonl'))) == 2
+
+
+def test_reparse_reads_only_the_latest_version_from_an_unindexed_tail(tmp_path):
+    # スクレイパーが索引を書く前（動いている最中や落ちた後）のアーカイブ
+    archive = PageArchive(str(tmp_path / 'archive'), index_every=1000)
+    pages = synthetic_site(RACE_IDS, horses=4)
+    for page_path, html in pages.items():
+        url = HOST + page_path
+        page_type, race_id = classify_url(url)
+        archive.append(url, html, page_type, race_id, fetched_at=100)
+    url = f"{HOST}/cyuou/syutuba/{RACE_IDS[0]}"
+    archive.append(url, pages[f"/cyuou/syutuba/{RACE_IDS[0]}"].replace('</body>', '<p>更新</p></body>'),
+                   'syutuba', RACE_IDS[0], fetched_at=200)
+    archive._writer.flush()
+
+    reparser = make_reparser(tmp_path)
+    summary = reparser.run(run_name='1')
+    reparser.close()
+    archive.close()
+    assert summary['pages']['syutuba']['pages'] == 2
+    records = read_jsonl(os.path.join(summary['run'], 'pages-syutuba.jsonl'))
+    assert sorted(r['race_id'] for r in records) == RACE_IDS
+    assert next(r for r in records if r['url'] == url)['fetched_at'] == 200
+
+
+def test_parse_diff_counts_fields():
+    diff = ParseDiff()
+    record = {'url': 'u', 'page_type': 'danwa', 'race_id': '202503060201', 'error': None,
+              'parsed': {'1': '好調', '2': '', '3': '息が持つ'}}
+    diff.add(record, {'1': '好調', '2': '仕上がり良好', '3': ''}, has_previous=True)
+    diff.add(dict(record, error='ValueError: x', parsed=None), has_previous=True)
+    stats = diff.summary()['danwa']
+    assert stats['pages'] == 2 and stats['errors'] == 1 and stats['changed_pages'] == 1
+    assert stats['rows_changed'] == 2
+    assert stats['fields']['comment'] == {'changed': 2, 'newly_populated': 1, 'newly_empty': 1}
@@ -0,0 +1,44 @@
+import pytest
+import requests
+
+from benchmarks.load_test import load_race_ids, run_load
+from benchmarks.replay_server import ReplayServer, recorded_site, synthetic_site
+from src.storage.page_cache import PageCache
+
+RACE_IDS = ['202503060201', '202503060202']
+
+
+def test_replay_server_serves_keibabook_layout_and_faults():
+    pages = synthetic_site(RACE_IDS, horses=3)
+    with ReplayServer(pages) as server:
+        response = requests.get(f"{server.base_url}/cyuou/cyokyo/0/202503060202")
+        assert response.status_code == 200
+        assert 'cyokyo' in response.text
+        assert requests.get(f"{server.base_url}/db/uma/900001").status_code == 200
+        assert requests.get(f"{server.base_url}/cyuou/syutuba/202503060299").status_code == 404
+
+    with ReplayServer(pages, throttle_rate=1.0, retry_after=7) as server:
+        response = requests.get(server.shutuba_url(RACE_IDS[0]))
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '7'
+        assert server.stats['status'] == {429: 1}
+
+
+def test_recorded_site_replays_page_cache(tmp_path):
+    cache = PageCache(str(tmp_path / 'cache'))
+    cache.put('https://s.keibabook.co.jp/cyuou/kettou/202503060201', '<html>血統</html>', expires_at=1)
+    assert recorded_site(cache) == {'/cyuou/kettou/202503060201': '<html>血統</html>'}
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_load_test_drives_full_pipeline_against_replay_server():
+    race_ids = load_race_ids(3)
+    with ReplayServer(synthetic_site(race_ids, horses=3)) as server:
+        result = await run_load(server, race_ids, concurrency=2)
+        # 出馬表・調教・血統・厩舎の話・前走コメント + 馬3頭
+        assert result['requests'] == 3 * (5 + 3)
+    assert result['done'] == 3
+    assert result['failed'] == 0
+    assert result['races_per_min'] > 0
+    assert result['race_p50'] <= result['race_p99']
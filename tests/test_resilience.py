@@ -0,0 +1,150 @@
+import random
+
+import pytest
+import requests
+
+from src.scrapers.fetcher import FetchError, HttpFetcher
+from src.scrapers.resilience import (CLOSED, HALF_OPEN, OPEN, AdaptiveConcurrency, CircuitBreaker,
+                                     FetchResilience, RetryBudget, RetryPolicy)
+
+URL = "https://s.keibabook.co.jp/cyuou/cyokyo/0/202503060201"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retry_policy_full_jitter_respects_cap_and_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0, rng=random.Random(0))
+    delays = [policy.delay(attempt) for attempt in range(8)]
+    assert all(0 <= d <= min(10.0, 2 ** n) for n, d in enumerate(delays))
+    assert policy.delay(0, retry_after=5) >= 5
+    assert policy.delay(0, retry_after=120) == 10.0
+
+
+def test_retry_budget_allows_ratio_of_requests():
+    budget = RetryBudget(ratio=0.1, min_retries=1)
+    for _ in range(20):
+        budget.record_request()
+    assert [budget.try_retry() for _ in range(4)] == [True, True, True, False]
+
+
+def test_circuit_breaker_opens_then_probes_once():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.try_acquire()
+    assert breaker.wait_time() == 10
+
+    clock.now = 10
+    assert breaker.try_acquire()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.try_acquire()  # 試すのは1件だけ
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.wait_time() == 20  # 失敗するたびに待ち時間を倍にする
+
+    clock.now = 30
+    assert breaker.try_acquire()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.try_acquire()
+
+
+def test_adaptive_concurrency_increases_while_healthy_and_halves_on_slowdown():
+    clock = Clock()
+    limiter = AdaptiveConcurrency(max_limit=8, initial=2, tolerance=2.0, smoothing=1.0, clock=clock)
+    for _ in range(10):
+        limiter.record(0.1)
+    assert 4 < limiter.limit <= 8
+    before = limiter.limit
+    clock.now = 1
+    limiter.record(0.5)  # 基準 (0.1) の 2 倍を超えた
+    assert limiter.limit == pytest.approx(before / 2)
+    limiter.record(0.0, ok=False)  # 同じ往復の間は重ねて減らさない
+    assert limiter.limit == pytest.approx(before / 2)
+    clock.now = 2
+    limiter.record(0.0, ok=False)
+    assert limiter.limit == pytest.approx(max(1, before / 4))
+
+
+@pytest.mark.asyncio
+async def test_fetch_resilience_retries_with_backoff_per_page_type():
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    settings = {'retry': {'max_attempts': 3, 'base_delay': 0.5, 'page_types': {'horse': {'max_attempts': 1}}}}
+    resilience = FetchResilience.from_settings(settings)
+    resilience.sleep = sleep
+
+    responses = [FetchError(URL, 503, retry_after=2), FetchError(URL, 500), '<html>ok</html>']
+
+    async def attempt():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert await resilience.call(URL, 'cyokyo', attempt) == '<html>ok</html>'
+    assert slept[0] >= 2 and len(slept) == 2
+    assert resilience.metrics.counter('page_retries_total', page_type='cyokyo', reason='http_503') == 1
+
+    # horse は1回だけ
+    responses = [FetchError(URL, 503), '<html>ok</html>']
+    with pytest.raises(FetchError):
+        await resilience.call("https://s.keibabook.co.jp/db/uma/900001", 'horse', attempt)
+
+    # 再試行しても同じ結果になる失敗はすぐに諦める
+    async def not_found():
+        raise FetchError(URL, 404)
+    slept.clear()
+    with pytest.raises(FetchError):
+        await resilience.call(URL, 'cyokyo', not_found)
+    assert slept == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_resilience_pauses_host_after_consecutive_failures():
+    clock = Clock()
+
+    async def sleep(seconds):
+        clock.now += seconds
+
+    resilience = FetchResilience(policies={None: RetryPolicy(max_attempts=5, base_delay=0.0)},
+                                 breaker_options={'failure_threshold': 2, 'reset_timeout': 30, 'clock': clock},
+                                 sleep=sleep)
+    calls = []
+
+    async def attempt():
+        calls.append(clock.now)
+        if len(calls) <= 2:
+            raise requests.ConnectionError("reset")
+        return 'ok'
+
+    assert await resilience.call(URL, 'cyokyo', attempt) == 'ok'
+    # 2回続けて失敗した後は reset_timeout 秒あけてから試す
+    assert calls[2] - calls[1] >= 30
+    assert resilience.breaker(URL).state == CLOSED
+
+
+def test_http_fetcher_raises_retryable_error_with_retry_after():
+    class Response:
+        status_code = 429
+        headers = {'Retry-After': '12'}
+
+    class Session(requests.Session):
+        def get(self, url, timeout=None):
+            return Response()
+
+    with pytest.raises(FetchError) as excinfo:
+        HttpFetcher(session=Session())._get(URL)
+    assert excinfo.value.retryable
+    assert excinfo.value.retry_after == 12
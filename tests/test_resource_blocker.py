@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.scrapers.resource_blocker import ResourceBlocker
+
+
+def make_request(resource_type, url):
+    request = MagicMock()
+    request.resource_type = resource_type
+    request.url = url
+    return request
+
+
+def test_should_block_rules():
+    blocker = ResourceBlocker(page_types={'horse': {'allowed_resource_types': ['document', 'xhr']}})
+    assert not blocker.should_block('cyokyo', 'document', "https://s.keibabook.co.jp/cyuou/cyokyo/0/1")
+    assert not blocker.should_block('cyokyo', 'script', "https://s.keibabook.co.jp/js/app.js")
+    assert blocker.should_block('cyokyo', 'image', "https://s.keibabook.co.jp/img/logo.png")
+    assert blocker.should_block('cyokyo', 'stylesheet', "https://s.keibabook.co.jp/css/sp.css")
+    # 許可された種類でも第三者や広告は落とす
+    assert blocker.should_block('cyokyo', 'script', "https://www.googletagmanager.com/gtm.js")
+    assert blocker.should_block('cyokyo', 'xhr', "https://cdn.example.com/data.json")
+    # ページ種別ごとの上書き
+    assert blocker.should_block('horse', 'script', "https://s.keibabook.co.jp/js/app.js")
+
+
+@pytest.mark.asyncio
+async def test_handle_aborts_and_counts():
+    blocker = ResourceBlocker()
+    blocked_route, allowed_route = AsyncMock(), AsyncMock()
+    await blocker.handle(blocked_route, make_request('image', "https://s.keibabook.co.jp/a.png"), 'syutuba')
+    await blocker.handle(allowed_route, make_request('document', "https://s.keibabook.co.jp/cyuou/syutuba/1"), 'syutuba')
+
+    blocked_route.abort.assert_awaited_once()
+    allowed_route.continue_.assert_awaited_once()
+    assert blocker.stats['blocked_requests'] == 1
+    assert blocker.stats['allowed_requests'] == 1
+    assert blocker.stats['blocked_by_type'] == {'image': 1}
+    assert blocker.stats['estimated_bytes_saved'] > 0
+
+
+@pytest.mark.asyncio
+async def test_install_uses_current_page_type():
+    blocker = ResourceBlocker(page_types={'horse': {'allowed_resource_types': ['document']}})
+    context = AsyncMock()
+    current = {'page_type': 'horse'}
+    await blocker.install(context, lambda: current['page_type'])
+    handler = context.route.call_args[0][1]
+
+    route = AsyncMock()
+    await handler(route, make_request('script', "https://s.keibabook.co.jp/js/app.js"))
+    route.abort.assert_awaited_once()
+
+    current['page_type'] = 'syutuba'
+    route = AsyncMock()
+    await handler(route, make_request('script', "https://s.keibabook.co.jp/js/app.js"))
+    route.continue_.assert_awaited_once()
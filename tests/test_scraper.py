@@ -3,9 +3,18 @@ from src.utils.config import load_settings
 from src.scrapers.keibabook import KeibaBookScraper
 
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch, call
+from unittest.mock import ANY, AsyncMock, MagicMock, patch, call
 from playwright.async_api import Page, Browser, BrowserContext, async_playwright
 from bs4 import BeautifulSoup # 追加
+from src.scrapers import parser_backend
+
+
+# パーサーのテストは利用可能な全バックエンドで同じ結果になることを確認する
+@pytest.fixture(autouse=True, params=parser_backend.available_backends())
+def backend(request, monkeypatch):
+    selected = parser_backend.get_parser_backend(request.param)
+    monkeypatch.setattr('src.scrapers.keibabook.get_parser_backend', lambda name=None: selected)
+    return request.param
 
 mock_training_html = """
 <html>
@@ -124,7 +133,7 @@ async def test_keibabook_scraper_fetch_page_content():
     # ここでは、直接_fetch_page_contentをテストするために、pageオブジェクトを渡す
     content = await scraper._fetch_page_content(mock_page, "http://mockurl.com")
     
-    mock_page.goto.assert_called_once_with("http://mockurl.com", wait_until="domcontentloaded")
+    mock_page.goto.assert_called_once_with("http://mockurl.com", wait_until="domcontentloaded", timeout=settings['playwright_timeout'])
     mock_page.content.assert_called_once()
     assert content == "<html><body>Mocked Page Content</body></html>"
 
@@ -178,6 +187,7 @@ def test_keibabook_scraper_parse_race_data():
     assert race_data['race_name'] == "2025年11月9日 3回福島2日目"
     assert race_data['race_grade'] == "1R ２歳未勝利"
     assert race_data['distance'] == "1150m"
+    assert race_data['surface'] == "ダート"
     assert len(race_data['horses']) == 2
     assert race_data['horses'][0]['horse_num'] == "1"
     assert race_data['horses'][0]['horse_name'] == "馬名1"
@@ -250,14 +260,16 @@ async def test_keibabook_scraper_scrape_method():
         {'date': '2025/10/20', 'venue': '東京', 'race_num': '1', 'finish_position': '1着', 'time': '1:35.0', 'jockey': 'ルメール', 'weight': '55'}
     ])
 
-    with patch('src.scrapers.keibabook.async_playwright') as mock_async_playwright:
+    with patch('src.scrapers.browser_pool.async_playwright') as mock_async_playwright:
         mock_playwright_context = AsyncMock()
         mock_browser = AsyncMock()
+        mock_browser_context = AsyncMock()
         mock_page = AsyncMock()
 
-        mock_async_playwright.return_value.__aenter__.return_value = mock_playwright_context
+        mock_async_playwright.return_value.start = AsyncMock(return_value=mock_playwright_context)
         mock_playwright_context.chromium.launch.return_value = mock_browser
-        mock_browser.new_page.return_value = mock_page
+        mock_browser.new_context.return_value = mock_browser_context
+        mock_browser_context.new_page.return_value = mock_page
 
         # scraper._fetch_page_content のモック設定を with ブロックの前に移動
         original_fetch = scraper._fetch_page_content
@@ -281,13 +293,15 @@ async def test_keibabook_scraper_scrape_method():
         expected_horse_detail_url = f"https://s.keibabook.co.jp/db/uma/dummy_link"
 
         scraper._fetch_page_content.assert_has_calls([
-            call(mock_page, expected_shutuba_url),
-            call(mock_page, expected_training_url),
-            call(mock_page, expected_pedigree_url),
-            call(mock_page, expected_stable_comment_url),
-            call(mock_page, expected_previous_race_comment_url),
-            call(mock_page, expected_horse_detail_url)
+            call(ANY, expected_shutuba_url),
+            call(ANY, expected_training_url),
+            call(ANY, expected_pedigree_url),
+            call(ANY, expected_stable_comment_url),
+            call(ANY, expected_previous_race_comment_url),
+            call(ANY, expected_horse_detail_url)
         ])
+        # page は Playwright が要る時にだけ借りるので、ここではブラウザを起動しない
+        mock_playwright_context.chromium.launch.assert_not_called()
         scraper._parse_race_data.assert_called_once_with(mock_html)
         scraper._parse_training_data.assert_called_once_with(mock_training_html)
         scraper._parse_pedigree_data.assert_called_once_with(mock_pedigree_html)